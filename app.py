@@ -1,12 +1,28 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+from flask import (Flask, render_template, request, jsonify, session, redirect, url_for, Response,
+                   stream_with_context, has_request_context)
 import mysql.connector
+from mysql.connector import pooling
 import psycopg2
-import sys
+import psycopg2.pool
+import psycopg2.errors
+from psycopg2.extras import execute_values
+import threading
 import traceback
 from dotenv import load_dotenv
 import os
 import re
-from datetime import datetime
+import io
+import sys
+import csv
+import html
+import time
+import json
+import uuid
+import queue
+import cProfile
+from datetime import datetime, timedelta, time as datetime_time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
 
 # Chargement des variables d'environnement
 load_dotenv()
@@ -33,36 +49,551 @@ TABLE_RELATIONS = {
     }
 }
 
+# Taille des pools de connexions (configurable dans .env)
+MYSQL_POOL_SIZE = int(os.getenv('MYSQL_POOL_SIZE', 10))
+PG_POOL_SIZE = int(os.getenv('PG_POOL_SIZE', 10))
+# Délai maximal d'attente d'une connexion libre (secondes)
+POOL_TIMEOUT = float(os.getenv('POOL_TIMEOUT', 10))
+# Une connexion PostgreSQL inactive depuis plus longtemps est vérifiée avant d'être rendue
+POOL_HEALTHCHECK_INTERVAL = float(os.getenv('POOL_HEALTHCHECK_INTERVAL', 30))
+
+_mysql_pool = None
+_pg_pool = None
+_pg_pool_slots = None
+_pg_last_used = {}
+_pool_lock = threading.Lock()
+
+# Erreur levée quand une connexion ne peut pas être obtenue (au lieu d'arrêter le processus)
+class DatabaseConnectionError(Exception):
+    pass
+
 # Configuration MySQL
+def get_mysql_pool():
+    global _mysql_pool
+    if _mysql_pool is None:
+        with _pool_lock:
+            if _mysql_pool is None:
+                _mysql_pool = pooling.MySQLConnectionPool(
+                    pool_name='migration_mysql',
+                    pool_size=MYSQL_POOL_SIZE,
+                    pool_reset_session=True,
+                    host=os.getenv('MYSQL_HOST', 'localhost'),
+                    user=os.getenv('MYSQL_USER', 'root'),
+                    password=os.getenv('MYSQL_PASSWORD', 'espcae'),
+                    port=int(os.getenv('MYSQL_PORT', 3306))
+                )
+                print(f"Pool MySQL créé ({MYSQL_POOL_SIZE} connexions)")
+    return _mysql_pool
+
+# Connexion MySQL empruntée au pool: "conn.database = ..." change bien la base de la connexion
+class PooledMySQLConnection:
+    def __init__(self, conn):
+        self._conn = conn
+        self._database = None
+        self._opened_at = time.perf_counter()
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def cursor(self, *args, **kwargs):
+        return InstrumentedCursor(self._conn.cursor(*args, **kwargs), 'mysql', self)
+
+    @property
+    def database(self):
+        return self._conn.database
+
+    @database.setter
+    def database(self, value):
+        self._conn.cmd_init_db(value)
+        self._database = value
+
+    def close(self):
+        if self._conn is None:
+            return
+        conn, self._conn = self._conn, None
+        metrics.observe('db_connection_open_seconds', time.perf_counter() - self._opened_at, (('db', 'mysql'),))
+        conn.close()
+
 def get_mysql_connection():
-    try:
-        conn = mysql.connector.connect(
-            host=os.getenv('MYSQL_HOST', 'localhost'),
-            user=os.getenv('MYSQL_USER', 'root'),
-            password=os.getenv('MYSQL_PASSWORD', 'espcae'),
-            port=int(os.getenv('MYSQL_PORT', 3306))
-        )
-        print("Connexion MySQL réussie!")
-        return conn
-    except Exception as e:
-        print(f"Erreur de connexion MySQL: {e}")
-        sys.exit(1)
+    deadline = time.time() + POOL_TIMEOUT
+    wait_started_at = time.perf_counter()
+    while True:
+        try:
+            conn = get_mysql_pool().get_connection()
+            # Vérification de santé: reconnecter si le serveur a fermé la connexion
+            if not conn.is_connected():
+                conn.reconnect(attempts=1, delay=0)
+            metrics.observe('db_connection_wait_seconds', time.perf_counter() - wait_started_at, (('db', 'mysql'),))
+            return PooledMySQLConnection(conn)
+        except mysql.connector.errors.PoolError as e:
+            # Pool épuisé: attendre qu'une connexion soit rendue
+            if time.time() >= deadline:
+                print(f"Erreur de connexion MySQL: {e}")
+                raise DatabaseConnectionError(f"Aucune connexion MySQL disponible: {e}")
+            time.sleep(0.05)
+        except Exception as e:
+            print(f"Erreur de connexion MySQL: {e}")
+            raise DatabaseConnectionError(f"Erreur de connexion MySQL: {e}")
+
+# Connexion PostgreSQL empruntée au pool: close() la rend au pool au lieu de la fermer
+class PooledPostgresConnection:
+    def __init__(self, pool, conn, slots):
+        self._pool = pool
+        self._conn = conn
+        self._slots = slots
+        self._opened_at = time.perf_counter()
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def cursor(self, *args, **kwargs):
+        return InstrumentedCursor(self._conn.cursor(*args, **kwargs), 'postgres')
+
+    def close(self):
+        if self._conn is None:
+            return
+        conn, self._conn = self._conn, None
+        discard = bool(conn.closed)
+        if not discard:
+            try:
+                # Ne jamais rendre une connexion avec une transaction ouverte
+                conn.rollback()
+            except Exception:
+                discard = True
+        metrics.observe('db_connection_open_seconds', time.perf_counter() - self._opened_at, (('db', 'postgres'),))
+        if discard:
+            _pg_last_used.pop(id(conn), None)
+        else:
+            _pg_last_used[id(conn)] = time.time()
+        try:
+            self._pool.putconn(conn, close=discard)
+        finally:
+            self._slots.release()
 
 # Configuration PostgreSQL
+def get_postgres_pool():
+    global _pg_pool, _pg_pool_slots
+    if _pg_pool is None:
+        with _pool_lock:
+            if _pg_pool is None:
+                _pg_pool = psycopg2.pool.ThreadedConnectionPool(
+                    1, PG_POOL_SIZE,
+                    host=os.getenv('POSTGRES_HOST', 'localhost'),
+                    user=os.getenv('POSTGRES_USER', 'postgres'),
+                    password=os.getenv('POSTGRES_PASSWORD', 'espace'),
+                    port=int(os.getenv('POSTGRES_PORT', 5432)),
+                    database=os.getenv('POSTGRES_DB', 'central_db')
+                )
+                _pg_pool_slots = threading.BoundedSemaphore(PG_POOL_SIZE)
+                print(f"Pool PostgreSQL créé ({PG_POOL_SIZE} connexions)")
+    return _pg_pool
+
 def get_postgres_connection():
     try:
-        conn = psycopg2.connect(
-            host=os.getenv('POSTGRES_HOST', 'localhost'),
-            user=os.getenv('POSTGRES_USER', 'postgres'),
-            password=os.getenv('POSTGRES_PASSWORD', 'espace'),
-            port=int(os.getenv('POSTGRES_PORT', 5432)),
-            database=os.getenv('POSTGRES_DB', 'central_db')
-        )
-        print("Connexion PostgreSQL réussie!")
-        return conn
+        pool = get_postgres_pool()
+    except Exception as e:
+        print(f"Erreur de connexion PostgreSQL: {e}")
+        raise DatabaseConnectionError(f"Erreur de connexion PostgreSQL: {e}")
+    
+    # Le pool psycopg2 ne bloque pas quand il est plein: on attend un emplacement libre
+    wait_started_at = time.perf_counter()
+    if not _pg_pool_slots.acquire(timeout=POOL_TIMEOUT):
+        raise DatabaseConnectionError("Aucune connexion PostgreSQL disponible")
+    
+    try:
+        conn = pool.getconn()
+        # Vérification de santé des connexions fermées ou restées inactives trop longtemps
+        if conn.closed or time.time() - _pg_last_used.get(id(conn), 0) > POOL_HEALTHCHECK_INTERVAL:
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                conn.rollback()
+            except Exception:
+                _pg_last_used.pop(id(conn), None)
+                pool.putconn(conn, close=True)
+                conn = pool.getconn()
+        metrics.observe('db_connection_wait_seconds', time.perf_counter() - wait_started_at, (('db', 'postgres'),))
+        return PooledPostgresConnection(pool, conn, _pg_pool_slots)
     except Exception as e:
+        _pg_pool_slots.release()
         print(f"Erreur de connexion PostgreSQL: {e}")
-        sys.exit(1)
+        raise DatabaseConnectionError(f"Erreur de connexion PostgreSQL: {e}")
+
+# Pool épuisé ou base injoignable: 503. Les routes laissent passer DatabaseConnectionError
+# (except DatabaseConnectionError: raise avant leur except Exception générique)
+@app.errorhandler(DatabaseConnectionError)
+def handle_database_connection_error(e):
+    return jsonify({"error": str(e)}), 503
+
+# Instrumentation: métriques agrégées (format texte Prometheus) et statistiques de la requête HTTP en cours
+REQUEST_LOG = os.getenv('REQUEST_LOG', '1') == '1'
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+# Profilage à la demande (en-tête X-Profile ou PROFILE_REQUESTS=1) et journal des requêtes SQL lentes
+PROFILE_REQUESTS = os.getenv('PROFILE_REQUESTS', '0') == '1'
+PROFILE_ALLOW_HEADER = os.getenv('PROFILE_ALLOW_HEADER', '1') == '1'
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+SLOW_QUERY_LOG = os.getenv('SLOW_QUERY_LOG', '0') == '1'
+SLOW_QUERY_SECONDS = float(os.getenv('SLOW_QUERY_MS', 500)) / 1000
+SLOW_QUERY_LOG_FILE = os.getenv('SLOW_QUERY_LOG_FILE', os.path.join('logs', 'slow_queries.log'))
+EXPLAINABLE_STATEMENTS = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+# Un même texte SQL n'est expliqué qu'une fois par intervalle (requêtes lentes répétées sous charge)
+SLOW_QUERY_EXPLAIN_INTERVAL = float(os.getenv('SLOW_QUERY_EXPLAIN_INTERVAL', 300))
+SLOW_QUERY_EXPLAIN_MAX_STATEMENTS = 1000
+
+_slow_query_log_lock = threading.Lock()
+# Dernier EXPLAIN par (base, texte SQL), du plus ancien au plus récent
+_explained_statements = OrderedDict()
+# Un seul profileur actif à la fois (cProfile refuse deux profileurs simultanés)
+_profile_lock = threading.Lock()
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._descriptions = OrderedDict()
+        self._counters = {}
+        self._histograms = {}
+    
+    def describe(self, name, kind, help_text, buckets=None):
+        self._descriptions[name] = (kind, help_text, buckets)
+    
+    def inc(self, name, labels=(), value=1):
+        with self._lock:
+            self._counters[(name, labels)] = self._counters.get((name, labels), 0) + value
+    
+    def observe(self, name, value, labels=()):
+        buckets = self._descriptions[name][2]
+        with self._lock:
+            histogram = self._histograms.get((name, labels))
+            if histogram is None:
+                histogram = self._histograms[(name, labels)] = [[0] * len(buckets), 0.0, 0]
+            for idx, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram[0][idx] += 1
+            histogram[1] += value
+            histogram[2] += 1
+    
+    def render(self):
+        def format_labels(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ''
+            escaped = [(key, str(value).replace('\\', '\\\\').replace('"', '\\"')) for key, value in pairs]
+            return '{' + ','.join(f'{key}="{value}"' for key, value in escaped) + '}'
+        
+        lines = []
+        with self._lock:
+            for name, (kind, help_text, buckets) in self._descriptions.items():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                if kind == 'counter':
+                    for (metric, labels), value in sorted(self._counters.items()):
+                        if metric == name:
+                            lines.append(f"{name}{format_labels(labels)} {value}")
+                    continue
+                for (metric, labels), (counts, total, count) in sorted(self._histograms.items()):
+                    if metric != name:
+                        continue
+                    for bound, bucket_count in zip(buckets, counts):
+                        lines.append(f"{name}_bucket{format_labels(labels, [('le', bound)])} {bucket_count}")
+                    lines.append(f"{name}_bucket{format_labels(labels, [('le', '+Inf')])} {count}")
+                    lines.append(f"{name}_sum{format_labels(labels)} {round(total, 6)}")
+                    lines.append(f"{name}_count{format_labels(labels)} {count}")
+        return '\n'.join(lines) + '\n'
+
+metrics = MetricsRegistry()
+metrics.describe('http_request_duration_seconds', 'histogram', "Durée des requêtes HTTP par route", DURATION_BUCKETS)
+metrics.describe('http_request_db_queries', 'histogram', "Nombre de requêtes SQL par requête HTTP", COUNT_BUCKETS)
+metrics.describe('db_queries_total', 'counter', "Requêtes SQL exécutées")
+metrics.describe('db_query_duration_seconds', 'histogram', "Durée d'exécution des requêtes SQL",
+                 DURATION_BUCKETS)
+metrics.describe('db_rows_total', 'counter', "Lignes lues ou écrites")
+metrics.describe('db_connection_wait_seconds', 'histogram', "Attente d'une connexion du pool", DURATION_BUCKETS)
+metrics.describe('db_connection_open_seconds', 'histogram', "Durée d'emprunt d'une connexion du pool",
+                 DURATION_BUCKETS)
+
+# Statistiques de la requête HTTP servie par le thread courant (None hors requête, ex: tâches de fond)
+_request_stats = threading.local()
+
+def record_db_activity(db, duration, queries=0, rows_read=0, rows_written=0):
+    labels = (('db', db),)
+    if queries:
+        metrics.inc('db_queries_total', labels, queries)
+        metrics.observe('db_query_duration_seconds', duration, labels)
+    if rows_read:
+        metrics.inc('db_rows_total', labels + (('direction', 'read'),), rows_read)
+    if rows_written:
+        metrics.inc('db_rows_total', labels + (('direction', 'write'),), rows_written)
+    
+    stats = getattr(_request_stats, 'value', None)
+    if stats is not None:
+        stats[f'{db}_queries'] += queries
+        stats[f'{db}_query_seconds'] += duration
+        stats['rows_read'] += rows_read
+        stats['rows_written'] += rows_written
+
+# Curseur instrumenté: chronomètre execute/fetch/COPY et compte les lignes, le reste est délégué
+class InstrumentedCursor:
+    def __init__(self, cursor, db, owner=None):
+        self._cursor = cursor
+        self._db = db
+        self._owner = owner
+    
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+    
+    def __iter__(self):
+        return iter(self._cursor)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self._cursor.close()
+        return False
+    
+    def _written_rows(self):
+        # Lignes modifiées pour les requêtes sans jeu de résultats (les lectures sont comptées au fetch)
+        if self._cursor.description is None and (self._cursor.rowcount or 0) > 0:
+            return self._cursor.rowcount
+        return 0
+    
+    def _timed(self, method, *args, **kwargs):
+        started_at = time.perf_counter()
+        try:
+            result = method(*args, **kwargs)
+        finally:
+            duration = time.perf_counter() - started_at
+            record_db_activity(self._db, duration, queries=1, rows_written=self._written_rows())
+        
+        if duration >= SLOW_QUERY_SECONDS and slow_query_log_enabled() and args:
+            params = args[1] if len(args) > 1 else kwargs.get('params', kwargs.get('vars'))
+            if method != self._cursor.execute:
+                # executemany / COPY: pas de plan d'exécution, seulement le texte et la durée
+                log_slow_query(self._db, args[0], None, duration, explain=False)
+            elif self._db == 'postgres':
+                log_slow_query(self._db, args[0], params, duration, pg_connection=self._cursor.connection)
+            else:
+                log_slow_query(self._db, args[0], params, duration,
+                               mysql_database=getattr(self._owner, '_database', None))
+        return result
+    
+    def execute(self, *args, **kwargs):
+        return self._timed(self._cursor.execute, *args, **kwargs)
+    
+    def executemany(self, *args, **kwargs):
+        return self._timed(self._cursor.executemany, *args, **kwargs)
+    
+    def copy_expert(self, *args, **kwargs):
+        return self._timed(self._cursor.copy_expert, *args, **kwargs)
+    
+    def _fetch(self, method, *args):
+        started_at = time.perf_counter()
+        result = method(*args)
+        if result is None:
+            rows = 0
+        elif method == self._cursor.fetchone:
+            rows = 1
+        else:
+            rows = len(result)
+        record_db_activity(self._db, time.perf_counter() - started_at, rows_read=rows)
+        return result
+    
+    def fetchone(self):
+        return self._fetch(self._cursor.fetchone)
+    
+    def fetchmany(self, *args):
+        return self._fetch(self._cursor.fetchmany, *args)
+    
+    def fetchall(self):
+        return self._fetch(self._cursor.fetchall)
+
+@app.before_request
+def start_request_stats():
+    _request_stats.value = {
+        'started_at': time.perf_counter(),
+        'mysql_queries': 0, 'mysql_query_seconds': 0.0,
+        'postgres_queries': 0, 'postgres_query_seconds': 0.0,
+        'rows_read': 0, 'rows_written': 0
+    }
+
+@app.after_request
+def record_request_stats(response):
+    stats = getattr(_request_stats, 'value', None)
+    if stats is None:
+        return response
+    
+    duration = time.perf_counter() - stats['started_at']
+    route = request.url_rule.rule if request.url_rule else 'non_trouvee'
+    metrics.observe('http_request_duration_seconds', duration,
+                    (('route', route), ('method', request.method), ('status', response.status_code)))
+    for db in ('mysql', 'postgres'):
+        metrics.observe('http_request_db_queries', stats[f'{db}_queries'], (('route', route), ('db', db)))
+    
+    if REQUEST_LOG:
+        # Une ligne JSON par requête: repérer les routes lentes et les boucles N+1
+        print(json.dumps({
+            "event": "request",
+            "method": request.method,
+            "route": route,
+            "path": request.path,
+            "status": response.status_code,
+            "duration_ms": round(duration * 1000, 2),
+            "mysql_queries": stats['mysql_queries'],
+            "mysql_query_ms": round(stats['mysql_query_seconds'] * 1000, 2),
+            "postgres_queries": stats['postgres_queries'],
+            "postgres_query_ms": round(stats['postgres_query_seconds'] * 1000, 2),
+            "rows_read": stats['rows_read'],
+            "rows_written": stats['rows_written']
+        }))
+    return response
+
+@app.teardown_request
+def clear_request_stats(exception=None):
+    _request_stats.value = None
+
+def slow_query_log_enabled():
+    return SLOW_QUERY_LOG or getattr(_request_stats, 'slow_query_log', False)
+
+# Forme des paramètres (types et tailles), sans les valeurs elles-mêmes
+def describe_query_params(params):
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {key: type(value).__name__ for key, value in params.items()}
+    if isinstance(params, (list, tuple)):
+        shape = [f"{type(value).__name__}[{len(value)}]" if isinstance(value, (list, tuple)) else type(value).__name__
+                 for value in params[:20]]
+        if len(params) > 20:
+            shape.append(f"... ({len(params)} paramètres)")
+        return shape
+    return type(params).__name__
+
+# Réserver l'EXPLAIN d'une requête: False si le même texte SQL a été expliqué il y a moins de
+# SLOW_QUERY_EXPLAIN_INTERVAL secondes
+def claim_explain(db, sql):
+    key = (db, sql)
+    now = time.time()
+    with _slow_query_log_lock:
+        explained_at = _explained_statements.get(key)
+        if explained_at is not None and now - explained_at < SLOW_QUERY_EXPLAIN_INTERVAL:
+            return False
+        _explained_statements[key] = now
+        _explained_statements.move_to_end(key)
+        while len(_explained_statements) > SLOW_QUERY_EXPLAIN_MAX_STATEMENTS:
+            _explained_statements.popitem(last=False)
+        return True
+
+# Plan d'exécution d'une requête lente: connexion de la requête pour PostgreSQL (même transaction),
+# connexion libre du pool pour MySQL (un curseur non bufferisé peut encore tenir celle de la requête).
+# Pool épuisé: pas d'attente ni de connexion supplémentaire, l'EXPLAIN est simplement omis
+def explain_statement(db, sql, params, pg_connection=None, mysql_database=None):
+    words = sql.split(None, 1)
+    if not words or words[0].upper() not in EXPLAINABLE_STATEMENTS:
+        return None
+    if not claim_explain(db, sql):
+        return ["EXPLAIN déjà journalisé récemment pour cette requête"]
+    try:
+        if db == 'postgres':
+            # Point de sauvegarde: un EXPLAIN en échec ne doit pas annuler la transaction en cours
+            cursor = pg_connection.cursor()
+            try:
+                cursor.execute("SAVEPOINT explain_slow_query")
+                try:
+                    cursor.execute("EXPLAIN " + sql, params)
+                    return [row[0] for row in cursor.fetchall()]
+                except Exception:
+                    cursor.execute("ROLLBACK TO SAVEPOINT explain_slow_query")
+                    raise
+                finally:
+                    cursor.execute("RELEASE SAVEPOINT explain_slow_query")
+            finally:
+                cursor.close()
+        
+        connection = get_mysql_pool().get_connection()
+        try:
+            if mysql_database:
+                connection.cmd_init_db(mysql_database)
+            cursor = connection.cursor(dictionary=True)
+            cursor.execute("EXPLAIN " + sql, params)
+            return [{key: value for key, value in row.items() if value is not None} for row in cursor.fetchall()]
+        finally:
+            connection.close()
+    except Exception as e:
+        return [f"EXPLAIN indisponible: {e}"]
+
+def log_slow_query(db, sql, params, duration, pg_connection=None, mysql_database=None, explain=True):
+    if isinstance(sql, bytes):
+        sql = sql.decode('utf-8', 'replace')
+    entry = {
+        "event": "slow_query",
+        "at": datetime.now().isoformat(),
+        "db": db,
+        "duration_ms": round(duration * 1000, 2),
+        "sql": sql[:4000],
+        "params": describe_query_params(params),
+        "route": request.path if has_request_context() else None,
+        "explain": explain_statement(db, sql, params, pg_connection, mysql_database) if explain else None
+    }
+    line = json.dumps(entry, default=str)
+    print(line)
+    with _slow_query_log_lock:
+        os.makedirs(os.path.dirname(SLOW_QUERY_LOG_FILE) or '.', exist_ok=True)
+        with open(SLOW_QUERY_LOG_FILE, 'a', encoding='utf-8') as log_file:
+            log_file.write(line + '\n')
+
+@app.before_request
+def start_request_profile():
+    requested = PROFILE_ALLOW_HEADER and request.headers.get('X-Profile', '').lower() in ('1', 'true', 'on')
+    _request_stats.slow_query_log = requested
+    _request_stats.profiler = None
+    if not (PROFILE_REQUESTS or requested):
+        return
+    if not _profile_lock.acquire(blocking=False):
+        print(f"[Profilage] déjà en cours, requête {request.path} non profilée")
+        return
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError as e:
+        _profile_lock.release()
+        print(f"[Profilage] impossible de démarrer: {e}")
+        return
+    _request_stats.profiler = profiler
+
+@app.after_request
+def save_request_profile(response):
+    profiler = getattr(_request_stats, 'profiler', None)
+    if profiler is None:
+        return response
+    
+    _request_stats.profiler = None
+    try:
+        profiler.disable()
+        route = request.url_rule.rule if request.url_rule else request.path
+        slug = re.sub(r'[^A-Za-z0-9]+', '_', route).strip('_') or 'index'
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        path = os.path.join(PROFILE_DIR, f"{datetime.now():%Y%m%d_%H%M%S_%f}_{request.method}_{slug}.prof")
+        profiler.dump_stats(path)
+        response.headers['X-Profile-File'] = path
+        print(f"[Profilage] {request.method} {request.path} -> {path}")
+    finally:
+        _profile_lock.release()
+    return response
+
+@app.teardown_request
+def clear_request_profile(exception=None):
+    # Requête interrompue avant after_request: libérer le profileur
+    profiler = getattr(_request_stats, 'profiler', None)
+    if profiler is not None:
+        _request_stats.profiler = None
+        profiler.disable()
+        _profile_lock.release()
+    _request_stats.slow_query_log = False
+
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
 
 # Récupérer la clé primaire automatiquement
 def get_primary_keys(cursor, table_name):
@@ -81,41 +612,377 @@ def get_primary_keys(cursor, table_name):
         return [row[column_name_idx] for row in results]
 
 
-# Vérifier si la table est vide et réinitialiser la séquence si nécessaire
-def check_and_reset_table(pg_cursor, table_name):
-    try:
-        pg_cursor.execute(f"""
-            SELECT a.attname
-            FROM pg_index i
-            JOIN pg_attribute a ON a.attrelid = i.indrelid
-                               AND a.attnum = ANY(i.indkey)
-            WHERE i.indrelid = '{table_name.lower()}'::regclass
-              AND i.indisprimary;
-        """)
-        result = pg_cursor.fetchone()
+# Durée de validité du cache des métadonnées de schéma (secondes, configurable dans .env)
+SCHEMA_CACHE_TTL = float(os.getenv('SCHEMA_CACHE_TTL', 300))
+
+# Cache des métadonnées de schéma MySQL et PostgreSQL, partagé par toutes les routes
+class SchemaMetadataCache:
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, loader):
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry and time.time() - entry[0] < self.ttl:
+            return entry[1]
         
-        if not result:
-            print(f"Aucune clé primaire trouvée pour {table_name}")
-            return False
+        value = loader()
+        # On ne mémorise pas l'absence d'un objet: il peut être créé entre deux requêtes
+        if value is not None:
+            with self._lock:
+                self._entries[key] = (time.time(), value)
+        return value
+
+    def invalidate(self, *prefix):
+        with self._lock:
+            if not prefix:
+                self._entries.clear()
+                return
+            for key in [key for key in self._entries if key[:len(prefix)] == prefix]:
+                del self._entries[key]
+
+schema_cache = SchemaMetadataCache(SCHEMA_CACHE_TTL)
+
+# Lire les résultats d'un curseur sous forme de dictionnaires (curseur dict ou tuple)
+def fetch_dicts(cursor):
+    rows = cursor.fetchall()
+    if rows and not isinstance(rows[0], dict):
+        names = [desc[0] for desc in cursor.description]
+        rows = [dict(zip(names, row)) for row in rows]
+    return rows
+
+# Métadonnées MySQL d'une table: colonnes, types, clés primaires, clés étrangères, positions
+def get_mysql_table_metadata(cursor, db_name, table_name):
+    def load():
+        # FULL: la collation sert aux convertisseurs de valeurs (collations binaires)
+        cursor.execute(f"SHOW FULL COLUMNS FROM `{table_name}`")
+        column_info = fetch_dicts(cursor)
+        columns = [column['Field'] for column in column_info]
+        
+        cursor.execute("""
+            SELECT COLUMN_NAME, REFERENCED_TABLE_NAME, REFERENCED_COLUMN_NAME
+            FROM information_schema.KEY_COLUMN_USAGE
+            WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s
+              AND REFERENCED_TABLE_NAME IS NOT NULL
+        """, (db_name, table_name))
+        foreign_keys = {
+            row['COLUMN_NAME']: {'table': row['REFERENCED_TABLE_NAME'], 'pk': row['REFERENCED_COLUMN_NAME']}
+            for row in fetch_dicts(cursor)
+        }
         
-        primary_key_column = result[0]
-        print(f"Colonne clé primaire détectée: {primary_key_column}")
+        return {
+            'columns': columns,
+            'column_info': column_info,
+            'types': {column['Field']: column['Type'] for column in column_info},
+            'positions': {column: idx for idx, column in enumerate(columns)},
+            'primary_keys': get_primary_keys(cursor, table_name),
+            'foreign_keys': foreign_keys
+        }
+    
+    return schema_cache.get(('mysql', db_name.lower(), table_name.lower()), load)
 
-        # Réinitialiser systématiquement la séquence à 1, peu importe l'état de la table
-        pg_cursor.execute(f"SELECT pg_get_serial_sequence('{table_name.lower()}', '{primary_key_column}')")
-        sequence_name = pg_cursor.fetchone()[0]
+# Métadonnées PostgreSQL d'une table: colonnes, types, positions, clé primaire, séquences
+# (None si la table n'existe pas)
+def get_pg_table_metadata(pg_cursor, table_name):
+    def load():
+        pg_cursor.execute("""
+            SELECT a.attname,
+                   a.atttypid::regtype::text,
+                   format_type(a.atttypid, a.atttypmod),
+                   COALESCE(i.indisprimary, false),
+                   pg_get_serial_sequence(c.oid::regclass::text, a.attname)
+            FROM pg_attribute a
+            JOIN pg_class c ON c.oid = a.attrelid
+            LEFT JOIN pg_index i ON i.indrelid = c.oid
+                                AND i.indisprimary
+                                AND a.attnum = ANY(i.indkey)
+            WHERE c.oid = to_regclass(%s)
+              AND a.attnum > 0
+              AND NOT a.attisdropped
+            ORDER BY a.attnum
+        """, (table_name.lower(),))
+        rows = pg_cursor.fetchall()
+        if not rows:
+            return None
         
-        if sequence_name:
-            pg_cursor.execute(f"ALTER SEQUENCE {sequence_name} RESTART WITH 1")
-            print(f"Séquence {sequence_name} réinitialisée à 1 pour {table_name}")
-            return True
-        else:
-            print(f"Aucune séquence trouvée pour {table_name}.{primary_key_column}")
-    except Exception as e:
-        print(f"Erreur dans check_and_reset_table: {e}")
-        raise
+        columns = [row[0] for row in rows]
+        return {
+            'columns': columns,
+            'types': {row[0]: row[1] for row in rows},
+            'full_types': {row[0]: row[2] for row in rows},
+            'positions': {column: idx for idx, column in enumerate(columns)},
+            'primary_keys': [row[0] for row in rows if row[3]],
+            'sequences': {row[0]: row[4] for row in rows if row[4]}
+        }
+    
+    return schema_cache.get(('postgres', table_name.lower()), load)
 
-    return False
+# Invalider le cache de schéma quand une erreur trahit un changement de structure (DDL)
+def invalidate_schema_cache_on_error(error):
+    schema_errors = (psycopg2.errors.UndefinedTable, psycopg2.errors.UndefinedColumn,
+                     psycopg2.errors.DatatypeMismatch)
+    # 1146: table inconnue, 1054: colonne inconnue (MySQL)
+    if isinstance(error, schema_errors) or getattr(error, 'errno', None) in (1146, 1054):
+        print(f"Erreur de schéma détectée, cache des métadonnées invalidé: {error}")
+        schema_cache.invalidate()
+
+# Forcer le rechargement des métadonnées de schéma (après une modification de structure)
+@app.route('/refresh-metadata', methods=['POST'])
+def refresh_metadata():
+    payload = request.get_json(silent=True) or request.form
+    db_name = payload.get('db_name')
+    table_name = payload.get('table_name')
+    
+    if db_name and table_name:
+        schema_cache.invalidate('mysql', db_name.lower(), table_name.lower())
+        schema_cache.invalidate('mysql_rows', db_name.lower(), table_name.lower())
+        schema_cache.invalidate('postgres', table_name.lower())
+        schema_cache.invalidate('converters', db_name.lower(), table_name.lower())
+        message = f"Métadonnées de {db_name}.{table_name} rechargées"
+    elif db_name:
+        schema_cache.invalidate('mysql', db_name.lower())
+        schema_cache.invalidate('mysql_rows', db_name.lower())
+        schema_cache.invalidate('converters', db_name.lower())
+        message = f"Métadonnées de {db_name} rechargées"
+    else:
+        schema_cache.invalidate()
+        message = "Toutes les métadonnées de schéma ont été rechargées"
+    
+    return jsonify({"success": True, "message": message})
+
+# Bornes des types entiers PostgreSQL (contrôle des UNSIGNED et des types MySQL plus larges)
+PG_INTEGER_RANGES = {
+    'smallint': (-2 ** 15, 2 ** 15 - 1),
+    'integer': (-2 ** 31, 2 ** 31 - 1),
+    'bigint': (-2 ** 63, 2 ** 63 - 1),
+}
+MYSQL_INTEGER_BITS = {'tinyint': 8, 'smallint': 16, 'mediumint': 24, 'int': 32, 'integer': 32, 'bigint': 64}
+PG_TEXT_TYPES = ('text', 'character varying', 'character', 'json', 'jsonb', 'xml')
+# Nombre maximal de lignes rejetées détaillées dans un rapport
+CONVERSION_MAX_REPORTED_ROWS = int(os.getenv('CONVERSION_MAX_REPORTED_ROWS', 100))
+
+# Valeur MySQL impossible à écrire dans sa colonne PostgreSQL (la ligne est rejetée, pas le lot)
+class ValueConversionError(ValueError):
+    pass
+
+def _decode_text(value):
+    if isinstance(value, (bytes, bytearray)):
+        return bytes(value).decode('utf-8', errors='replace')
+    return value
+
+def _is_zero_date(text):
+    # '0000-00-00', '2021-00-15', '2021-04-00' (avec ou sans heure)
+    return text[:4] == '0000' or text[5:7] == '00' or text[8:10] == '00'
+
+# Construire le convertisseur d'une colonne d'après son type MySQL (et sa collation) et son type PostgreSQL.
+# Retourne None quand la valeur lue par mysql.connector peut être transmise telle quelle à psycopg2.
+def build_value_converter(column, mysql_type, collation, pg_type):
+    if pg_type is None:
+        return None
+    mysql_type = mysql_type.lower()
+    base_type = re.split(r'[(\s]', mysql_type, 1)[0]
+    binary_source = (collation or '').endswith('_bin') or collation == 'binary' or 'binary' in base_type
+    
+    if pg_type == 'boolean':
+        if base_type == 'bit':
+            def convert(value):
+                if isinstance(value, (bytes, bytearray)):
+                    return any(value)
+                return None if value is None else bool(int(value))
+            return convert
+        
+        def convert(value):
+            if value is None or isinstance(value, bool):
+                return value
+            if isinstance(value, str):
+                return value.strip().lower() in ('1', 't', 'true', 'on', 'yes', 'oui')
+            return bool(value)
+        return convert
+    
+    if pg_type in PG_INTEGER_RANGES and (base_type in MYSQL_INTEGER_BITS or base_type == 'bit'):
+        low, high = PG_INTEGER_RANGES[pg_type]
+        if base_type != 'bit':
+            bits = MYSQL_INTEGER_BITS[base_type] + (1 if 'unsigned' in mysql_type else 0)
+            if bits <= high.bit_length() + 1:
+                return None
+        def convert(value):
+            if value is None:
+                return None
+            if isinstance(value, (bytes, bytearray)):
+                value = int.from_bytes(value, 'big')
+            elif not isinstance(value, int):
+                value = int(value)
+            if value < low or value > high:
+                raise ValueConversionError(f"{column}: {value} hors des bornes de {pg_type}")
+            return value
+        return convert
+    
+    if base_type in ('date', 'datetime', 'timestamp'):
+        def convert(value):
+            if isinstance(value, (str, bytes, bytearray)):
+                value = _decode_text(value).strip()
+                if not value or _is_zero_date(value):
+                    return None
+            return value
+        return convert
+    
+    if base_type == 'time' and pg_type.startswith('time'):
+        def convert(value):
+            if isinstance(value, timedelta):
+                seconds = value.total_seconds()
+                if seconds < 0 or seconds >= 86400:
+                    raise ValueConversionError(f"{column}: durée {value} hors d'une journée pour {pg_type}")
+                minutes, second = divmod(int(seconds), 60)
+                return datetime_time(minutes // 60, minutes % 60, second, value.microseconds)
+            return _decode_text(value)
+        return convert
+    
+    if base_type == 'set':
+        as_array = pg_type.endswith('[]')
+        def convert(value):
+            if value is None:
+                return None
+            if isinstance(value, (bytes, bytearray, str)):
+                value = [item for item in _decode_text(value).split(',') if item]
+            items = sorted(_decode_text(item) for item in value)
+            return items if as_array else ','.join(items)
+        return convert
+    
+    if pg_type in PG_TEXT_TYPES or pg_type.startswith(('character', 'text')):
+        decode = binary_source or base_type.endswith(('blob', 'binary')) or base_type in ('json', 'enum')
+        def convert(value):
+            if decode:
+                value = _decode_text(value)
+            if isinstance(value, str) and '\x00' in value:
+                # PostgreSQL refuse le caractère NUL dans les chaînes
+                value = value.replace('\x00', '')
+            return value
+        return convert
+    
+    if base_type == 'enum':
+        # Colonne ENUM côté PostgreSQL: la valeur vide (ENUM invalide dans MySQL) devient NULL
+        def convert(value):
+            value = _decode_text(value)
+            return None if value == '' else value
+        return convert
+    
+    if pg_type == 'bytea':
+        def convert(value):
+            if isinstance(value, str):
+                return value.encode('utf-8')
+            return bytes(value) if isinstance(value, bytearray) else value
+        return convert
+    
+    return None
+
+# Convertisseurs {colonne MySQL: fonction} d'une table, construits une fois et mis en cache avec le schéma
+def get_value_converters(mysql_cursor, pg_cursor, db_name, table_name):
+    def load():
+        mysql_meta = get_mysql_table_metadata(mysql_cursor, db_name, table_name)
+        pg_meta = get_pg_table_metadata(pg_cursor, table_name) or {'types': {}}
+        converters = {}
+        for column in mysql_meta['column_info']:
+            converter = build_value_converter(column['Field'], column['Type'], column.get('Collation'),
+                                              pg_meta['types'].get(column['Field'].lower()))
+            if converter:
+                converters[column['Field']] = converter
+        return converters
+    
+    return schema_cache.get(('converters', db_name.lower(), table_name.lower()), load)
+
+# Convertir un lot de lignes (tuples dans l'ordre de columns) colonne par colonne.
+# Retourne (lignes converties, [(position de la ligne, erreur)]); les lignes rejetées sont retirées.
+def convert_rows(converters, columns, rows):
+    active = [(idx, converters[col]) for idx, col in enumerate(columns) if col in converters]
+    if not active or not rows:
+        return rows, []
+    
+    try:
+        values = list(zip(*rows))
+        for idx, convert in active:
+            values[idx] = list(map(convert, values[idx]))
+        return list(zip(*values)), []
+    except (ValueError, TypeError, OverflowError):
+        pass
+    
+    # Au moins une valeur invalide: reprise ligne par ligne pour n'écarter que les lignes fautives
+    converted, rejected = [], []
+    for position, row in enumerate(rows):
+        try:
+            values = list(row)
+            for idx, convert in active:
+                values[idx] = convert(values[idx])
+            converted.append(tuple(values))
+        except (ValueError, TypeError, OverflowError) as e:
+            rejected.append((position, str(e)))
+    return converted, rejected
+
+# Même conversion pour des lignes dictionnaires (modifiées en place), colonne par colonne; seules les
+# colonnes présentes sont converties. Retourne [(position de la ligne, erreur)] sans retirer les lignes.
+def convert_records(converters, records):
+    if not records:
+        return []
+    active = [(column, converters[column]) for column in records[0] if column in converters]
+    try:
+        converted = {column: list(map(convert, (record[column] for record in records)))
+                     for column, convert in active}
+    except (ValueError, TypeError, OverflowError):
+        converted = None
+    
+    if converted is not None:
+        for column, values in converted.items():
+            for record, value in zip(records, values):
+                record[column] = value
+        return []
+    
+    # Au moins une valeur invalide: reprise ligne par ligne
+    rejected = []
+    for position, record in enumerate(records):
+        try:
+            values = {column: convert(record[column]) for column, convert in active if column in record}
+        except (ValueError, TypeError, OverflowError) as e:
+            rejected.append((position, str(e)))
+            continue
+        record.update(values)
+    return rejected
+
+# Compter les lignes rejetées d'un passage et en garder un échantillon [(ID, erreur)] dans le résumé
+def record_rejected_rows(summary, rejected):
+    summary["rows_rejected"] = summary.get("rows_rejected", 0) + len(rejected)
+    sample = summary.setdefault("rejected_rows", [])
+    for row_id, error in rejected[:max(0, CONVERSION_MAX_REPORTED_ROWS - len(sample))]:
+        sample.append({"row_id": row_id, "error": error})
+        print(f"[Conversion {summary.get('table_name')}] ligne {row_id} rejetée: {error}")
+
+# Remettre la séquence de la table à 1 si la table est vide. Le verrou consultatif (libéré au commit)
+# sérialise les premiers chargements concurrents: le second revoit la table non vide et ne touche à rien.
+# L'appelant ne doit valider qu'avec ses premières lignes, sinon un autre repart de 1 avec les mêmes ID
+def reset_sequence_if_empty(pg_cursor, table_name):
+    pg_meta = get_pg_table_metadata(pg_cursor, table_name)
+    if not pg_meta or not pg_meta['primary_keys']:
+        print(f"Aucune clé primaire trouvée pour {table_name}")
+        return False
+    
+    sequence_name = pg_meta['sequences'].get(pg_meta['primary_keys'][0])
+    if not sequence_name:
+        return False
+    
+    target_table = table_name.lower()
+    pg_cursor.execute(f"SELECT EXISTS (SELECT 1 FROM {target_table})")
+    if pg_cursor.fetchone()[0]:
+        return False
+    
+    pg_cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (f"sequence:{target_table}",))
+    pg_cursor.execute(f"SELECT EXISTS (SELECT 1 FROM {target_table})")
+    if pg_cursor.fetchone()[0]:
+        return False
+    
+    # setval ne prend pas de verrou DDL, contrairement à ALTER SEQUENCE ... RESTART
+    pg_cursor.execute("SELECT setval(%s, 1, false)", (sequence_name,))
+    print(f"Séquence {sequence_name} réinitialisée à 1 pour {table_name}")
+    return True
 
 # Fonction pour réinitialiser les compteurs de séquence pour toutes les tables
 def reset_all_sequences(pg_cursor):
@@ -141,27 +1008,22 @@ def reset_all_sequences(pg_cursor):
 
 # Vider la table de mapping pour une table donnée
 def clear_mapping_table(pg_cursor, db_name, table_name):
-    mapping_table = f"id_mapping_{db_name.lower()}_{table_name.lower()}"
+    mapping_table = get_mapping_table_name(db_name, table_name)
     
     try:
-        pg_cursor.execute(f"""
-            SELECT EXISTS (
-                SELECT FROM information_schema.tables
-                WHERE table_name = %s
-            )
-        """, (mapping_table,))
-        exists = pg_cursor.fetchone()[0]
-        
-        if exists:
-            pg_cursor.execute(f"TRUNCATE TABLE {mapping_table}")
-            print(f"Table de mapping {mapping_table} vidée")
+        if pg_table_exists(pg_cursor, mapping_table):
+            # Utiliser RESTART IDENTITY pour réinitialiser la séquence en même temps
+            pg_cursor.execute(f"TRUNCATE TABLE {mapping_table} RESTART IDENTITY")
+            reset_mapping_counters(pg_cursor, mapping_table)
+            print(f"Table de mapping {mapping_table} vidée et séquence réinitialisée")
+        clear_migration_checkpoints(pg_cursor, db_name, table_name)
+        fk_mapping_cache.invalidate_table(db_name, table_name)
         
         return True
     except Exception as e:
         print(f"Erreur lors du nettoyage de la table de mapping: {e}")
         raise
-        
-    return False
+
 @app.route('/reset-all-mappings', methods=['POST'])
 def reset_all_mappings():
     pg_conn = None
@@ -177,12 +1039,15 @@ def reset_all_mappings():
         
         return jsonify({"success": True, "message": "Toutes les tables de mapping ont été vidées et leurs séquences réinitialisées à 1"})
     
+    except DatabaseConnectionError:
+        raise
     except Exception as e:
         if pg_conn:
             try:
                 pg_conn.rollback()
             except:
                 pass
+        invalidate_schema_cache_on_error(e)
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
     
@@ -190,119 +1055,263 @@ def reset_all_mappings():
         if pg_cursor: pg_cursor.close()
         if pg_conn: pg_conn.close()
 
+# Compteurs de correspondances maintenus dans la transaction de transfert (évite les COUNT(*) du tableau de bord)
+def ensure_mapping_counters_table(pg_cursor):
+    if pg_table_exists(pg_cursor, 'mapping_counters'):
+        return
+    pg_cursor.execute("""
+        CREATE TABLE IF NOT EXISTS mapping_counters (
+            mapping_table VARCHAR(255) PRIMARY KEY,
+            row_count BIGINT NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+# Initialiser le compteur d'une table de mapping (comptage exact une seule fois, ou forcé avec exact=True)
+def init_mapping_counter(pg_cursor, mapping_table, exact=False):
+    ensure_mapping_counters_table(pg_cursor)
+    if exact:
+        pg_cursor.execute(f"""
+            INSERT INTO mapping_counters (mapping_table, row_count)
+            SELECT %s, COUNT(*) FROM {mapping_table}
+            ON CONFLICT (mapping_table) DO UPDATE
+            SET row_count = EXCLUDED.row_count, updated_at = CURRENT_TIMESTAMP
+        """, (mapping_table,))
+    else:
+        pg_cursor.execute(f"""
+            INSERT INTO mapping_counters (mapping_table, row_count)
+            SELECT %s, (SELECT COUNT(*) FROM {mapping_table})
+            WHERE NOT EXISTS (SELECT 1 FROM mapping_counters WHERE mapping_table = %s)
+            ON CONFLICT (mapping_table) DO NOTHING
+        """, (mapping_table, mapping_table))
+
+# Ajouter au compteur les correspondances insérées (même transaction que les insertions)
+def increment_mapping_counter(pg_cursor, mapping_table, delta):
+    if not delta:
+        return
+    pg_cursor.execute("""
+        UPDATE mapping_counters
+        SET row_count = row_count + %s, updated_at = CURRENT_TIMESTAMP
+        WHERE mapping_table = %s
+    """, (delta, mapping_table))
+
+# Remettre à zéro les compteurs (toutes les tables de mapping si aucune n'est précisée)
+def reset_mapping_counters(pg_cursor, mapping_table=None):
+    if not pg_table_exists(pg_cursor, 'mapping_counters'):
+        return
+    if mapping_table:
+        pg_cursor.execute("""
+            UPDATE mapping_counters SET row_count = 0, updated_at = CURRENT_TIMESTAMP
+            WHERE mapping_table = %s
+        """, (mapping_table,))
+    else:
+        pg_cursor.execute("UPDATE mapping_counters SET row_count = 0, updated_at = CURRENT_TIMESTAMP")
+
+# Retrouver la base et la table d'une table de mapping à partir de la liste des bases autorisées
+# (les noms de tables peuvent contenir des "_", comme ligne_commande)
+def parse_mapping_table_name(mapping_table):
+    for db_name in sorted(ALLOWED_DATABASES, key=len, reverse=True):
+        prefix = f"id_mapping_{db_name.lower()}_"
+        if mapping_table.startswith(prefix):
+            return db_name, mapping_table[len(prefix):]
+    return None, None
+
+# Type PostgreSQL d'une colonne de mapping: entier quand la clé cible est entière, texte sinon
+def get_mapping_column_type(pg_type):
+    if pg_type in ('smallint', 'integer', 'bigint'):
+        return 'BIGINT'
+    return 'TEXT'
+
+# Colonnes typées d'une table de mapping pour une table cible:
+# old_id/new_id pour une clé simple, old_<col>/new_<col> pour une clé composite
+def build_mapping_columns(pg_cursor, table_name):
+    pg_meta = get_pg_table_metadata(pg_cursor, table_name)
+    if not pg_meta:
+        raise ValueError(f"Table {table_name.lower()} absente de PostgreSQL")
+    
+    key_columns = get_row_key_columns(table_name, pg_meta['primary_keys'])
+    if not key_columns:
+        raise ValueError(f"Aucune clé primaire trouvée pour {table_name.lower()}")
+    
+    column_types = [get_mapping_column_type(pg_meta['types'].get(col.lower())) for col in key_columns]
+    if len(key_columns) == 1:
+        return ['old_id'], ['new_id'], column_types
+    return ([f"old_{col.lower()}" for col in key_columns],
+            [f"new_{col.lower()}" for col in key_columns],
+            column_types)
+
+# Index couvrants dans les deux sens: ancien ID -> nouvel ID (clé primaire) et nouvel ID -> ancien ID
+def create_mapping_indexes(pg_cursor, mapping_table, old_columns, new_columns):
+    pg_cursor.execute(f"""
+        ALTER TABLE {mapping_table}
+        ADD CONSTRAINT {mapping_table}_pkey PRIMARY KEY ({', '.join(old_columns)})
+        INCLUDE ({', '.join(new_columns)})
+    """)
+    pg_cursor.execute(f"""
+        CREATE INDEX {mapping_table}_new_idx ON {mapping_table} ({', '.join(new_columns)})
+        INCLUDE ({', '.join(old_columns)})
+    """)
+
+# Convertir une table de mapping VARCHAR (table_name, old_id "a_b", new_id "a_b") vers le format typé
+def upgrade_mapping_table(pg_cursor, mapping_table, table_name):
+    old_columns, new_columns, column_types = build_mapping_columns(pg_cursor, table_name)
+    upgraded_table = f"{mapping_table}_typed"
+    
+    definitions = [f"{col} {col_type} NOT NULL"
+                   for col, col_type in zip(old_columns + new_columns, column_types * 2)]
+    pg_cursor.execute(f"DROP TABLE IF EXISTS {upgraded_table}")
+    pg_cursor.execute(f"CREATE TABLE {upgraded_table} ({', '.join(definitions)})")
+    
+    def split_expr(source_column, parts):
+        if parts == 1:
+            return [source_column]
+        return [f"split_part({source_column}, '_', {idx})" for idx in range(1, parts + 1)]
+    
+    # Chargement sans index, puis création des index une fois les données en place
+    select_list = [f"({expr})::{col_type}" for expr, col_type
+                   in zip(split_expr('old_id', len(old_columns)) + split_expr('new_id', len(new_columns)),
+                          column_types * 2)]
+    pg_cursor.execute(f"""
+        INSERT INTO {upgraded_table} ({', '.join(old_columns + new_columns)})
+        SELECT DISTINCT ON (old_id) {', '.join(select_list)}
+        FROM {mapping_table}
+        ORDER BY old_id, id DESC
+    """)
+    migrated = pg_cursor.rowcount
+    
+    pg_cursor.execute(f"DROP TABLE {mapping_table}")
+    pg_cursor.execute(f"ALTER TABLE {upgraded_table} RENAME TO {mapping_table}")
+    create_mapping_indexes(pg_cursor, mapping_table, old_columns, new_columns)
+    schema_cache.invalidate('mapping_layout', mapping_table)
+    schema_cache.invalidate('postgres', mapping_table)
+    init_mapping_counter(pg_cursor, mapping_table, exact=True)
+    print(f"Table de mapping convertie au format typé: {mapping_table} ({migrated} correspondance(s))")
+    return migrated
+
 # Créer ou récupérer une table de mapping
 def ensure_mapping_table_exists(pg_cursor, db_name, table_name):
     # Nommer la table de mapping spécifiquement pour cette base de données et cette table
     mapping_table = f"id_mapping_{db_name.lower()}_{table_name.lower()}"
     
+    # Table déjà vérifiée par ce processus: aucune requête de catalogue
+    if schema_cache.get(('mapping_ready', mapping_table), lambda: None):
+        return mapping_table
+    
     try:
         # Vérifier si la table existe déjà
-        pg_cursor.execute(f"""
-            SELECT EXISTS (
-                SELECT FROM information_schema.tables
-                WHERE table_name = %s
-            )
-        """, (mapping_table,))
-        exists = pg_cursor.fetchone()[0]
+        exists = pg_table_exists(pg_cursor, mapping_table)
         
         if not exists:
             # Créer la table si elle n'existe pas
-            pg_cursor.execute(f"""
-                CREATE TABLE {mapping_table} (
-                    id SERIAL PRIMARY KEY,
-                    table_name VARCHAR(255) NOT NULL,
-                    old_id VARCHAR(255) NOT NULL,
-                    new_id VARCHAR(255) NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    UNIQUE(table_name, old_id)
-                )
-            """)
+            old_columns, new_columns, column_types = build_mapping_columns(pg_cursor, table_name)
+            definitions = [f"{col} {col_type} NOT NULL"
+                           for col, col_type in zip(old_columns + new_columns, column_types * 2)]
+            pg_cursor.execute(f"CREATE TABLE {mapping_table} ({', '.join(definitions)})")
+            create_mapping_indexes(pg_cursor, mapping_table, old_columns, new_columns)
+            schema_cache.invalidate('mapping_layout', mapping_table)
             print(f"Table de mapping créée: {mapping_table}")
-        else:
-            # La table existe, vérifions si elle est vide
-            pg_cursor.execute(f"SELECT COUNT(*) FROM {mapping_table}")
-            count = pg_cursor.fetchone()[0]
-            if count == 0:
-                # Si la table est vide, réinitialisons la séquence
-                pg_cursor.execute(f"ALTER SEQUENCE {mapping_table}_id_seq RESTART WITH 1")
-                print(f"Séquence réinitialisée pour la table de mapping vide: {mapping_table}")
+        elif get_mapping_layout(pg_cursor, mapping_table)['legacy']:
+            # Ancien format VARCHAR: conversion au premier accès en écriture
+            upgrade_mapping_table(pg_cursor, mapping_table, table_name)
+        init_mapping_counter(pg_cursor, mapping_table)
         
+        schema_cache.get(('mapping_ready', mapping_table), lambda: True)
         return mapping_table
     
     except Exception as e:
         print(f"Erreur lors de la création de la table de mapping: {e}")
         raise
 
-# Fonction pour gérer l'ordre de transfert des tables
-def get_table_dependency_order():
-    # Définir l'ordre de dépendance pour respecter les contraintes de clés étrangères
-    return [
-        'CLIENT',
-        'PRODUIT',
-        'VENDEUR',
-        'COMMANDE',
-        'LIGNE_COMMANDE',
-        'AVIS'
-    ]
+# Structure d'une table de mapping: colonnes des anciens et nouveaux ID et leurs types.
+# L'ancien format (old_id/new_id VARCHAR, clé composite "a_b") est lu avec la même interface.
+def get_mapping_layout(pg_cursor, mapping_table):
+    def load():
+        pg_cursor.execute("""
+            SELECT column_name, data_type
+            FROM information_schema.columns
+            WHERE table_schema = 'public' AND table_name = %s
+            ORDER BY ordinal_position
+        """, (mapping_table,))
+        columns = pg_cursor.fetchall()
+        if not columns:
+            return None
+        
+        types = {name: data_type for name, data_type in columns}
+        return {
+            'old': [name for name, _ in columns if name.startswith('old_')],
+            'new': [name for name, _ in columns if name.startswith('new_')],
+            'types': types,
+            'legacy': 'table_name' in types
+        }
+    
+    layout = schema_cache.get(('mapping_layout', mapping_table), load)
+    if layout is None:
+        raise ValueError(f"Table de mapping introuvable: {mapping_table}")
+    return layout
 
-# Mapper les ID pour les clés étrangères
-def map_foreign_key(pg_cursor, db_name, table_name, fk_column, old_id):
-    if old_id is None:
+# Découper un ID applicatif ("12" ou "12_7") en valeurs typées pour des colonnes de mapping
+def split_mapping_key(layout, columns, row_id):
+    parts = str(row_id).split('_', len(columns) - 1)
+    if len(parts) != len(columns):
         return None
     
-    # Déterminer la table référencée basée sur nos connaissances du schéma
-    referenced_table = None
-    referenced_column = None
-    
-    # Vérifier dans notre structure connue
-    if table_name.upper() in TABLE_RELATIONS and fk_column.lower() in [k.lower() for k in TABLE_RELATIONS[table_name.upper()]]:
-        relation_info = TABLE_RELATIONS[table_name.upper()][fk_column]
-        referenced_table = relation_info['table']
-        referenced_column = relation_info['pk']
-    else:
-        # Méthode heuristique pour deviner la table référencée
-        if fk_column.lower().startswith('id_'):
-            # Extraire le nom de table probable à partir du nom de colonne
-            potential_table = fk_column[3:].upper()  # Supprime 'id_' et met en majuscule
-            referenced_table = potential_table
-            referenced_column = fk_column
+    values = []
+    for column, part in zip(columns, parts):
+        if layout['types'][column] in ('bigint', 'integer', 'smallint'):
+            try:
+                part = int(part)
+            except ValueError:
+                return None
+        values.append(part)
+    return tuple(values)
+
+# Expression SQL qui reconstruit l'ID applicatif à partir de colonnes de mapping
+def mapping_key_expr(columns, alias=None):
+    prefix = f"{alias}." if alias else ""
+    return " || '_' || ".join(f"{prefix}{col}::text" for col in columns)
+
+# Jointure entre les colonnes new_* d'une table de mapping et les colonnes de la table cible
+def mapping_join_condition(layout, alias, target_columns):
+    if len(layout['new']) == len(target_columns):
+        conditions = []
+        for column, target in zip(layout['new'], target_columns):
+            if layout['types'][column] in ('bigint', 'integer', 'smallint'):
+                conditions.append(f"{alias}.{column} = {target}")
+            else:
+                conditions.append(f"{alias}.{column} = {target}::text")
+        return ' AND '.join(conditions)
+    # Ancien format: ID composite "a_b" dans une seule colonne texte
+    return f"{alias}.{layout['new'][0]} = " + " || '_' || ".join(f"{target}::text" for target in target_columns)
+
+# Valeurs source d'origine (en texte) relues dans les colonnes old_* d'une table de mapping
+def mapping_old_values(layout, alias, parts):
+    if len(layout['old']) == parts:
+        return [f"{alias}.{column}::text" for column in layout['old']]
+    return [f"split_part({alias}.{layout['old'][0]}, '_', {idx})" for idx in range(1, parts + 1)]
+
+# Condition "colonnes IN (valeurs)" indexable, avec un tableau typé par colonne
+def mapping_key_condition(layout, columns, keys, alias=None):
+    arrays = [[key[idx] for key in keys] for idx in range(len(columns))]
+    casts = ['bigint[]' if layout['types'][col] in ('bigint', 'integer', 'smallint') else 'text[]'
+             for col in columns]
+    prefix = f"{alias}." if alias else ""
+    if len(columns) == 1:
+        return f"{prefix}{columns[0]} = ANY(%s::{casts[0]})", arrays
     
-    if referenced_table:
-        # Construire le nom de la table de mapping
-        mapping_table = f"id_mapping_{db_name.lower()}_{referenced_table.lower()}"
-        
-        try:
-            # Vérifier si la table de mapping existe
-            pg_cursor.execute(f"""
-                SELECT EXISTS (
-                    SELECT FROM information_schema.tables
-                    WHERE table_name = %s
-                )
-            """, (mapping_table,))
-            exists = pg_cursor.fetchone()[0]
-            
-            if exists:
-                # Chercher le mapping
-                pg_cursor.execute(f"""
-                    SELECT new_id 
-                    FROM {mapping_table} 
-                    WHERE old_id = %s
-                """, (str(old_id),))
-                result = pg_cursor.fetchone()
-                
-                if result:
-                    return result[0]
-                else:
-                    print(f"[Avertissement] Aucun mapping trouvé pour {referenced_table}.{referenced_column} = {old_id}")
-        except Exception as e:
-            print(f"[Erreur mapping FK] {table_name}.{fk_column} -> {e}")
+    unnest_args = ', '.join(f"%s::{cast}" for cast in casts)
+    return f"({', '.join(prefix + col for col in columns)}) IN (SELECT * FROM unnest({unnest_args}))", arrays
+
+# Retrouver la table source d'une ancienne table de mapping (colonne table_name, sinon nom de la table)
+def get_legacy_mapping_source(pg_cursor, mapping_table):
+    pg_cursor.execute(f"SELECT table_name FROM {mapping_table} LIMIT 1")
+    row = pg_cursor.fetchone()
+    if row:
+        return row[0]
     
-    # Si aucun mapping n'est trouvé, retourner la valeur originale
-    return old_id
+    return parse_mapping_table_name(mapping_table)[1]
 
-# Nouveau point d'entrée pour réinitialiser les séquences
-@app.route('/reset-sequences', methods=['POST'])
-def reset_sequences():
+@app.route('/migrate-mapping-tables', methods=['POST'])
+def migrate_mapping_tables():
     pg_conn = None
     pg_cursor = None
     
@@ -310,10 +1319,317 @@ def reset_sequences():
         pg_conn = get_postgres_connection()
         pg_cursor = pg_conn.cursor()
         
-        # Réinitialiser toutes les séquences des tables principales
-        reset_all_sequences(pg_cursor)
-        
-        # Réinitialiser aussi les séquences des tables de mapping
+        # Tables de mapping encore au format VARCHAR (présence de la colonne table_name)
+        pg_cursor.execute("""
+            SELECT table_name
+            FROM information_schema.columns
+            WHERE table_schema = 'public' AND table_name LIKE 'id_mapping_%' AND column_name = 'table_name'
+            ORDER BY table_name
+        """)
+        legacy_tables = [row[0] for row in pg_cursor.fetchall()]
+        
+        migrated = {}
+        skipped = []
+        for mapping_table in legacy_tables:
+            source_table = get_legacy_mapping_source(pg_cursor, mapping_table)
+            if not source_table:
+                skipped.append(mapping_table)
+                continue
+            
+            # Une transaction par table: une conversion en échec n'annule pas les précédentes
+            migrated[mapping_table] = upgrade_mapping_table(pg_cursor, mapping_table, source_table)
+            pg_conn.commit()
+            schema_cache.invalidate('mapping_ready', mapping_table)
+        
+        return jsonify({
+            "success": True,
+            "message": f"{len(migrated)} table(s) de mapping converties au format typé",
+            "migrated": migrated,
+            "skipped": skipped
+        })
+    
+    except DatabaseConnectionError:
+        raise
+    except Exception as e:
+        if pg_conn:
+            try:
+                pg_conn.rollback()
+            except:
+                pass
+        invalidate_schema_cache_on_error(e)
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+    
+    finally:
+        if pg_cursor: pg_cursor.close()
+        if pg_conn: pg_conn.close()
+
+# Nombre maximal de correspondances d'ID gardées en mémoire (éviction LRU)
+FK_CACHE_SIZE = int(os.getenv('FK_CACHE_SIZE', 200000))
+
+# Cache mémoire des correspondances (base, table référencée, ancien ID) -> nouvel ID
+class ForeignKeyMappingCache:
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        # Le cache ne retient que des correspondances connues: un absent est toujours revérifié
+        # dans PostgreSQL (un autre worker ou migrate.py peut l'avoir écrit entre-temps)
+        # Tables dont le préchargement a déjà été tenté
+        self._preloaded_tables = set()
+        self._lock = threading.Lock()
+
+    def get_many(self, db_name, table_name, old_ids):
+        db_key, table_key = db_name.lower(), table_name.lower()
+        found = {}
+        missing = []
+        with self._lock:
+            for old_id in old_ids:
+                key = (db_key, table_key, old_id)
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    found[old_id] = self._entries[key]
+                else:
+                    missing.append(old_id)
+        return found, missing
+
+    def put_many(self, db_name, table_name, id_pairs):
+        db_key, table_key = db_name.lower(), table_name.lower()
+        with self._lock:
+            for old_id, new_id in id_pairs:
+                key = (db_key, table_key, str(old_id))
+                self._entries[key] = str(new_id)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def begin_preload(self, db_name, table_name):
+        # Retourne True une seule fois par table (jusqu'à la prochaine invalidation)
+        table_key = (db_name.lower(), table_name.lower())
+        with self._lock:
+            if table_key in self._preloaded_tables:
+                return False
+            self._preloaded_tables.add(table_key)
+            return True
+
+    def invalidate_keys(self, db_name, table_name, old_ids):
+        db_key, table_key = db_name.lower(), table_name.lower()
+        with self._lock:
+            for old_id in old_ids:
+                self._entries.pop((db_key, table_key, str(old_id)), None)
+
+    def invalidate_table(self, db_name, table_name):
+        db_key, table_key = db_name.lower(), table_name.lower()
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == db_key and key[1] == table_key]:
+                del self._entries[key]
+            self._preloaded_tables.discard((db_key, table_key))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._preloaded_tables.clear()
+
+fk_mapping_cache = ForeignKeyMappingCache(FK_CACHE_SIZE)
+
+# Charger en une fois les correspondances d'une table référencée (si elle tient dans le cache)
+def preload_mapping_cache(pg_cursor, db_name, referenced_table):
+    mapping_table = get_mapping_table_name(db_name, referenced_table)
+    if not pg_table_exists(pg_cursor, mapping_table):
+        return
+    
+    budget = fk_mapping_cache.max_size // 4
+    layout = get_mapping_layout(pg_cursor, mapping_table)
+    pg_cursor.execute(f"""
+        SELECT {mapping_key_expr(layout['old'])}, {mapping_key_expr(layout['new'])}
+        FROM {mapping_table}
+        LIMIT %s
+    """, (budget + 1,))
+    rows = pg_cursor.fetchall()
+    if len(rows) <= budget:
+        fk_mapping_cache.put_many(db_name, referenced_table, rows)
+
+# Résoudre des anciens ID via le cache, puis une seule requête pour les absents
+def lookup_mapped_ids_cached(pg_cursor, db_name, referenced_table, old_ids):
+    old_ids = {str(old_id) for old_id in old_ids if old_id is not None}
+    if not old_ids:
+        return {}
+    
+    if fk_mapping_cache.begin_preload(db_name, referenced_table):
+        preload_mapping_cache(pg_cursor, db_name, referenced_table)
+    
+    # Les absents du cache sont toujours recherchés en base, en une seule requête
+    found, missing = fk_mapping_cache.get_many(db_name, referenced_table, old_ids)
+    if missing:
+        mapping_table = get_mapping_table_name(db_name, referenced_table)
+        if pg_table_exists(pg_cursor, mapping_table):
+            fetched = get_mapped_ids(pg_cursor, mapping_table, missing)
+            fk_mapping_cache.put_many(db_name, referenced_table, fetched.items())
+            found.update(fetched)
+    return found
+
+# Déterminer la table (et la colonne) référencée par une clé étrangère
+def resolve_referenced_table(table_name, fk_column, db_name=None):
+    # Graphe réel des clés étrangères de la base quand elle est connue
+    if db_name:
+        try:
+            graph = get_foreign_key_graph(db_name)['foreign_keys']
+            table_fks = graph.get(table_name) or graph.get(table_name.upper()) or {}
+            reference = table_fks.get(fk_column)
+            if reference:
+                return reference['table'], reference['pk']
+            # Colonne absente du graphe: relations connues seulement (les colonnes id_<table> qui
+            # désignent une table existante sont déjà dans le graphe)
+            for column, relation in TABLE_RELATIONS.get(table_name.upper(), {}).items():
+                if column.lower() == fk_column.lower():
+                    return relation['table'], relation['pk']
+            return None, None
+        except DatabaseConnectionError:
+            raise
+        except Exception as e:
+            print(f"Graphe des clés étrangères indisponible pour {db_name}: {e}")
+    
+    # Vérifier dans notre structure connue
+    if table_name.upper() in TABLE_RELATIONS and fk_column.lower() in [k.lower() for k in TABLE_RELATIONS[table_name.upper()]]:
+        relation_info = TABLE_RELATIONS[table_name.upper()][fk_column]
+        return relation_info['table'], relation_info['pk']
+    
+    # Méthode heuristique pour deviner la table référencée
+    if fk_column.lower().startswith('id_'):
+        # Extraire le nom de table probable à partir du nom de colonne
+        potential_table = fk_column[3:].upper()  # Supprime 'id_' et met en majuscule
+        return potential_table, fk_column
+    
+    return None, None
+
+# Mapper les ID pour les clés étrangères
+def map_foreign_key(pg_cursor, db_name, table_name, fk_column, old_id):
+    if old_id is None:
+        return None
+    
+    # Déterminer la table référencée basée sur nos connaissances du schéma
+    referenced_table, referenced_column = resolve_referenced_table(table_name, fk_column, db_name)
+    
+    if referenced_table:
+        try:
+            # Chercher le mapping (cache mémoire, puis table de mapping)
+            mapped = lookup_mapped_ids_cached(pg_cursor, db_name, referenced_table, [old_id])
+            if str(old_id) in mapped:
+                return mapped[str(old_id)]
+            else:
+                print(f"[Avertissement] Aucun mapping trouvé pour {referenced_table}.{referenced_column} = {old_id}")
+        except Exception as e:
+            print(f"[Erreur mapping FK] {table_name}.{fk_column} -> {e}")
+    
+    # Si aucun mapping n'est trouvé, retourner la valeur originale
+    return old_id
+
+# Nom de la table de mapping pour une base de données et une table
+def get_mapping_table_name(db_name, table_name):
+    return f"id_mapping_{db_name.lower()}_{table_name.lower()}"
+
+# Vérifier l'existence d'une table dans PostgreSQL
+def pg_table_exists(pg_cursor, table_name):
+    def load():
+        pg_cursor.execute("""
+            SELECT EXISTS (
+                SELECT FROM information_schema.tables
+                WHERE table_name = %s
+            )
+        """, (table_name,))
+        # Seule l'existence est mise en cache (une table absente peut être créée plus tard)
+        return pg_cursor.fetchone()[0] or None
+    
+    return bool(schema_cache.get(('pg_table', table_name), load))
+
+# Colonnes qui identifient une ligne côté application (ID composite "a_b" pour LIGNE_COMMANDE)
+def get_row_key_columns(table_name, primary_keys):
+    if table_name.upper() == 'LIGNE_COMMANDE':
+        return ['id_commande', 'id_produit']
+    return primary_keys[:1]
+
+# Construire l'identifiant applicatif d'une ligne MySQL (noms de colonnes pour un dictionnaire, positions pour un tuple)
+def build_row_id(row, key_columns):
+    return '_'.join(str(row[col]) for col in key_columns)
+
+# Récupérer en une seule requête les nouveaux ID pour une liste d'anciens ID
+def get_mapped_ids(pg_cursor, mapping_table, old_ids):
+    layout = get_mapping_layout(pg_cursor, mapping_table)
+    keys = {}
+    for old_id in old_ids:
+        if old_id is not None:
+            key = split_mapping_key(layout, layout['old'], old_id)
+            if key is not None:
+                keys[key] = str(old_id)
+    if not keys:
+        return {}
+    
+    condition, params = mapping_key_condition(layout, layout['old'], list(keys))
+    pg_cursor.execute(f"""
+        SELECT {mapping_key_expr(layout['old'])}, {mapping_key_expr(layout['new'])}
+        FROM {mapping_table}
+        WHERE {condition}
+    """, params)
+    return {old_id: new_id for old_id, new_id in pg_cursor.fetchall()}
+
+# Mapper en une seule requête toutes les valeurs d'une colonne de clé étrangère
+def map_foreign_keys_bulk(pg_cursor, db_name, table_name, fk_column, old_ids):
+    referenced_table, _ = resolve_referenced_table(table_name, fk_column, db_name)
+    if not referenced_table:
+        return {}
+    
+    try:
+        return lookup_mapped_ids_cached(pg_cursor, db_name, referenced_table, old_ids)
+    except Exception as e:
+        print(f"[Erreur mapping FK] {table_name}.{fk_column} -> {e}")
+        raise
+
+# Découper des paires (ancien ID, nouvel ID) selon les colonnes typées de la table de mapping
+def build_mapping_rows(layout, id_pairs):
+    rows = []
+    for old_id, new_id in id_pairs:
+        old_key = split_mapping_key(layout, layout['old'], old_id)
+        new_key = split_mapping_key(layout, layout['new'], new_id)
+        if old_key is None or new_key is None:
+            raise ValueError(f"Correspondance d'ID invalide: {old_id} -> {new_id}")
+        rows.append(old_key + new_key)
+    return rows
+
+# Enregistrer plusieurs correspondances d'ID en une seule requête
+def save_id_mappings(pg_cursor, mapping_table, id_pairs):
+    if not id_pairs:
+        return
+    
+    layout = get_mapping_layout(pg_cursor, mapping_table)
+    updates = ', '.join(f"{col} = EXCLUDED.{col}" for col in layout['new'])
+    # xmax = 0 distingue les lignes insérées de celles mises à jour par ON CONFLICT
+    inserted = execute_values(pg_cursor, f"""
+        INSERT INTO {mapping_table} ({', '.join(layout['old'] + layout['new'])})
+        VALUES %s
+        ON CONFLICT ({', '.join(layout['old'])}) DO UPDATE SET {updates}
+        RETURNING (xmax = 0)
+    """, build_mapping_rows(layout, id_pairs), page_size=len(id_pairs), fetch=True)
+    increment_mapping_counter(pg_cursor, mapping_table, sum(1 for row in inserted if row[0]))
+
+# Enregistrer un gros lot de nouvelles correspondances par COPY (lignes absentes de la table de mapping)
+def copy_id_mappings(pg_cursor, mapping_table, id_pairs):
+    layout = get_mapping_layout(pg_cursor, mapping_table)
+    copy_rows(pg_cursor, mapping_table, layout['old'] + layout['new'], build_mapping_rows(layout, id_pairs))
+    increment_mapping_counter(pg_cursor, mapping_table, len(id_pairs))
+
+# Nouveau point d'entrée pour réinitialiser les séquences
+@app.route('/reset-sequences', methods=['POST'])
+def reset_sequences():
+    pg_conn = None
+    pg_cursor = None
+    
+    try:
+        pg_conn = get_postgres_connection()
+        pg_cursor = pg_conn.cursor()
+        
+        # Réinitialiser toutes les séquences des tables principales
+        reset_all_sequences(pg_cursor)
+        
+        # Réinitialiser aussi les séquences des tables de mapping
         pg_cursor.execute("""
             SELECT sequence_name
             FROM information_schema.sequences
@@ -332,12 +1648,15 @@ def reset_sequences():
             "message": "Toutes les séquences (tables principales et tables de mapping) ont été réinitialisées à 1"
         })
     
+    except DatabaseConnectionError:
+        raise
     except Exception as e:
         if pg_conn:
             try:
                 pg_conn.rollback()
             except:
                 pass
+        invalidate_schema_cache_on_error(e)
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
     
@@ -358,6 +1677,9 @@ def reset_all_mapping_tables(pg_cursor):
             # Vider la table
             pg_cursor.execute(f"TRUNCATE TABLE {table} RESTART IDENTITY")
             print(f"Table de mapping {table} vidée et séquence réinitialisée")
+        reset_mapping_counters(pg_cursor)
+        clear_migration_checkpoints(pg_cursor)
+        fk_mapping_cache.clear()
         
         return True
     except Exception as e:
@@ -365,32 +1687,6 @@ def reset_all_mapping_tables(pg_cursor):
         raise
         
     return False
-# Nouveau point d'entrée pour vider une table de mapping
-@app.route('/clear-mapping/<db_name>/<table_name>', methods=['POST'])
-def clear_mapping_table(pg_cursor, db_name, table_name):
-    mapping_table = f"id_mapping_{db_name.lower()}_{table_name.lower()}"
-    
-    try:
-        pg_cursor.execute(f"""
-            SELECT EXISTS (
-                SELECT FROM information_schema.tables
-                WHERE table_name = %s
-            )
-        """, (mapping_table,))
-        exists = pg_cursor.fetchone()[0]
-        
-        if exists:
-            # Utiliser RESTART IDENTITY pour réinitialiser la séquence en même temps
-            pg_cursor.execute(f"TRUNCATE TABLE {mapping_table} RESTART IDENTITY")
-            print(f"Table de mapping {mapping_table} vidée et séquence réinitialisée")
-        
-        return True
-    except Exception as e:
-        print(f"Erreur lors du nettoyage de la table de mapping: {e}")
-        raise
-        
-    return False
-
 @app.route('/')
 def index():
     connection = get_mysql_connection()
@@ -420,7 +1716,7 @@ def show_database(db_name):
     all_tables = [table[0] for table in cursor.fetchall()]
     
     # Obtenir l'ordre de dépendance des tables
-    ordered_tables = get_table_dependency_order()
+    ordered_tables = get_table_dependency_order(db_name)
     
     # Trier les tables selon l'ordre défini (les tables non définies viennent à la fin)
     tables = []
@@ -437,6 +1733,73 @@ def show_database(db_name):
     
     return render_template('database.html', db_name=db_name, tables=tables)
 
+# Taille de page par défaut du navigateur de table (configurable dans .env)
+TABLE_PAGE_SIZE = int(os.getenv('TABLE_PAGE_SIZE', 100))
+TABLE_MAX_PAGE_SIZE = 1000
+
+# Condition de pagination par clé: (a > %s) OR (a = %s AND b > %s) ...
+def build_keyset_condition(key_columns, last_values):
+    clauses = []
+    params = []
+    for i, column in enumerate(key_columns):
+        parts = [f"`{col}` = %s" for col in key_columns[:i]] + [f"`{column}` > %s"]
+        clauses.append(f"({' AND '.join(parts)})")
+        params.extend(last_values[:i + 1])
+    return f"({' OR '.join(clauses)})", params
+
+# Filtres simples (égalité, ou LIKE si la valeur contient %) limités aux colonnes connues
+def build_filter_conditions(filters, allowed_columns):
+    clauses = []
+    params = []
+    for column, value in filters.items():
+        if column not in allowed_columns or value == '':
+            continue
+        if '%' in value:
+            clauses.append(f"`{column}` LIKE %s")
+        else:
+            clauses.append(f"`{column}` = %s")
+        params.append(value)
+    return clauses, params
+
+# Nombre approximatif de lignes (statistiques InnoDB, sans COUNT(*))
+def get_approximate_row_count(cursor, db_name, table_name):
+    def load():
+        cursor.execute("""
+            SELECT TABLE_ROWS FROM information_schema.TABLES
+            WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s
+        """, (db_name, table_name))
+        result = cursor.fetchone()
+        if not result:
+            return None
+        return result['TABLE_ROWS'] if isinstance(result, dict) else result[0]
+    
+    # Estimation gardée dans le cache de schéma (déjà approximative par nature)
+    return schema_cache.get(('mysql_rows', db_name.lower(), table_name.lower()), load)
+
+# Lire une page de la table: pagination par clé primaire, projection et filtres côté MySQL
+def fetch_table_page(cursor, table_name, key_columns, select_columns, filters, after, page_size, offset=0):
+    where_clauses, params = build_filter_conditions(filters, select_columns)
+    
+    if key_columns and after:
+        keyset_clause, keyset_params = build_keyset_condition(key_columns, after)
+        where_clauses.append(keyset_clause)
+        params.extend(keyset_params)
+    
+    sql = f"SELECT {', '.join(f'`{col}`' for col in select_columns)} FROM `{table_name}`"
+    if where_clauses:
+        sql += f" WHERE {' AND '.join(where_clauses)}"
+    if key_columns:
+        sql += f" ORDER BY {', '.join(f'`{col}`' for col in key_columns)} LIMIT %s"
+        params.append(page_size + 1)
+    else:
+        # Sans clé primaire, on se rabat sur LIMIT/OFFSET
+        sql += " LIMIT %s OFFSET %s"
+        params.extend([page_size + 1, offset])
+    
+    cursor.execute(sql, params)
+    rows = cursor.fetchall()
+    return rows[:page_size], len(rows) > page_size
+
 @app.route('/database/<db_name>/table/<table_name>')
 def show_table(db_name, table_name):
     # Mémoriser la table actuelle dans la session
@@ -445,81 +1808,261 @@ def show_table(db_name, table_name):
     
     connection = get_mysql_connection()
     connection.database = db_name
-    cursor = connection.cursor(dictionary=True)
+    # Lignes en tuples: un seul index colonne -> position partagé par toute la page
+    cursor = connection.cursor()
     
-    cursor.execute(f"SHOW COLUMNS FROM `{table_name}`")
-    columns = [column['Field'] for column in cursor.fetchall()]
+    # Colonnes et clés depuis le cache de schéma
+    table_meta = get_mysql_table_metadata(cursor, db_name, table_name)
+    all_columns = table_meta['columns']
     
     # Obtenir les informations sur les clés primaires
-    primary_keys = get_primary_keys(cursor, table_name)
+    primary_keys = table_meta['primary_keys']
+    key_columns = get_row_key_columns(table_name, primary_keys) if primary_keys else []
     
     # Obtenir les informations sur les clés étrangères si possible
-    foreign_keys = {}
-    if table_name.upper() in TABLE_RELATIONS:
+    foreign_keys = table_meta['foreign_keys']
+    if not foreign_keys and table_name.upper() in TABLE_RELATIONS:
         foreign_keys = TABLE_RELATIONS[table_name.upper()]
     
-    cursor.execute(f"SELECT * FROM `{table_name}`")
-    rows = cursor.fetchall()
+    # Paramètres de navigation: taille de page, projection, filtres et position
+    try:
+        page_size = int(request.args.get('page_size', TABLE_PAGE_SIZE))
+    except ValueError:
+        page_size = TABLE_PAGE_SIZE
+    page_size = max(1, min(page_size, TABLE_MAX_PAGE_SIZE))
+    
+    requested_columns = [col for col in request.args.getlist('cols') if col in all_columns]
+    columns = requested_columns or all_columns
+    # Les colonnes de la clé sont toujours lues (identifiant de ligne et pagination)
+    select_columns = columns + [col for col in key_columns if col not in columns]
+    column_positions = {col: idx for idx, col in enumerate(select_columns)}
+    key_indexes = [column_positions[col] for col in key_columns]
+    
+    filters = {key[2:]: value for key, value in request.args.items() if key.startswith('f_')}
+    after = request.args.getlist('after')
+    if len(after) != len(key_columns):
+        after = []
+    try:
+        offset = max(0, int(request.args.get('offset', 0)))
+    except ValueError:
+        offset = 0
+    
+    rows, has_next = fetch_table_page(cursor, table_name, key_columns, select_columns,
+                                      filters, after, page_size, offset)
+    approximate_total = get_approximate_row_count(cursor, db_name, table_name)
+    
+    # Lien vers la page suivante (dernière clé de la page courante)
+    next_url = None
+    if has_next and rows:
+        next_args = {'page_size': page_size, 'cols': requested_columns}
+        next_args.update({f"f_{col}": value for col, value in filters.items()})
+        if key_columns:
+            next_args['after'] = [rows[-1][idx] for idx in key_indexes]
+        else:
+            next_args['offset'] = offset + page_size
+        next_url = url_for('show_table', db_name=db_name, table_name=table_name, **next_args)
     
     # Vérifier également quelles lignes ont déjà été transférées
-    mapped_rows = []
+    mapped_rows = set()
+    pg_conn = None
+    pg_cursor = None
     
     try:
         pg_conn = get_postgres_connection() 
         pg_cursor = pg_conn.cursor()
         
-        mapping_table = f"id_mapping_{db_name.lower()}_{table_name.lower()}"
-        pg_cursor.execute(f"""
-            SELECT EXISTS (
-                SELECT FROM information_schema.tables
-                WHERE table_name = %s
-            )
-        """, (mapping_table,))
-        
-        if pg_cursor.fetchone()[0]:
-            # Pour les tables à clé composite (LIGNE_COMMANDE)
-            if table_name.upper() == 'LIGNE_COMMANDE':
-                for row in rows:
-                    # Créer l'ID composite pour la recherche
-                    composite_id = f"{row['id_commande']}_{row['id_produit']}"
-                    
-                    pg_cursor.execute(f"""
-                        SELECT COUNT(*) FROM {mapping_table}
-                        WHERE old_id = %s
-                    """, (composite_id,))
-                    
-                    if pg_cursor.fetchone()[0] > 0:
-                        mapped_rows.append(composite_id)
-            else:
-                # Pour les tables à clé simple
-                for row in rows:
-                    if primary_keys and primary_keys[0] in row:
-                        pk_value = str(row[primary_keys[0]])
-                        
-                        pg_cursor.execute(f"""
-                            SELECT COUNT(*) FROM {mapping_table}
-                            WHERE old_id = %s
-                        """, (pk_value,))
-                        
-                        if pg_cursor.fetchone()[0] > 0:
-                            mapped_rows.append(pk_value)
+        mapping_table = get_mapping_table_name(db_name, table_name)
         
-        pg_cursor.close()
-        pg_conn.close()
+        if pg_table_exists(pg_cursor, mapping_table):
+            # Une seule requête ensembliste (old_id = ANY(...)) pour toutes les lignes affichées
+            # (ID composite "id_commande_id_produit" pour LIGNE_COMMANDE)
+            if key_columns:
+                row_ids = [build_row_id(row, key_indexes) for row in rows]
+                mapped_rows = set(get_mapped_ids(pg_cursor, mapping_table, row_ids))
     except Exception as e:
         print(f"Erreur lors de la vérification des lignes transférées: {e}")
+    finally:
+        # Toujours rendre la connexion au pool, même en cas d'erreur
+        if pg_cursor: pg_cursor.close()
+        if pg_conn: pg_conn.close()
     
     cursor.close()
     connection.close()
     
+    # Associer à chaque ligne son identifiant applicatif
+    identified_rows = [(build_row_id(row, key_indexes) if key_columns else None, row) for row in rows]
+    
     return render_template('table.html', 
                           db_name=db_name, 
                           table_name=table_name, 
                           columns=columns, 
-                          rows=rows, 
+                          column_positions=column_positions,
+                          all_columns=all_columns,
+                          rows=identified_rows, 
                           foreign_keys=foreign_keys,
                           mapped_rows=mapped_rows,
-                          primary_keys=primary_keys)
+                          primary_keys=primary_keys,
+                          id_column=primary_keys[0] if primary_keys else all_columns[0],
+                          page_size=page_size,
+                          filters=filters,
+                          filters_args={f"f_{col}": value for col, value in filters.items()},
+                          selected_columns=requested_columns,
+                          approximate_total=approximate_total,
+                          next_url=next_url)
+
+# Export en flux: lignes lues par lots sur un curseur MySQL non bufferisé et envoyées au fil de l'eau
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', 1000))
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'json': 'application/json',
+    'csv': 'text/csv',
+    'html': 'text/html'
+}
+
+# Générateur de lots (colonnes, [(row_id, transféré, valeurs)]) avec le statut de transfert
+# résolu par une requête de mapping par lot; les connexions sont rendues à la fin du flux
+def stream_table_rows(db_name, table_name, key_columns, select_columns, filters, chunk_size):
+    mysql_conn = None
+    mysql_cursor = None
+    pg_conn = None
+    pg_cursor = None
+    
+    try:
+        mysql_conn = get_mysql_connection()
+        mysql_conn.database = db_name
+        pg_conn = get_postgres_connection()
+        pg_cursor = pg_conn.cursor()
+        mapping_table = get_mapping_table_name(db_name, table_name)
+        has_mapping = bool(key_columns) and pg_table_exists(pg_cursor, mapping_table)
+        
+        where_clauses, params = build_filter_conditions(filters, select_columns)
+        sql = f"SELECT {', '.join(f'`{col}`' for col in select_columns)} FROM `{table_name}`"
+        if where_clauses:
+            sql += f" WHERE {' AND '.join(where_clauses)}"
+        if key_columns:
+            sql += f" ORDER BY {', '.join(f'`{col}`' for col in key_columns)}"
+        
+        mysql_cursor = mysql_conn.cursor(buffered=False)
+        mysql_cursor.execute(sql, params)
+        key_indexes = [select_columns.index(col) for col in key_columns]
+        
+        for rows in iter_row_chunks(mysql_cursor, chunk_size):
+            row_ids = ['_'.join(str(row[idx]) for idx in key_indexes) if key_indexes else None for row in rows]
+            mapped = set(get_mapped_ids(pg_cursor, mapping_table, row_ids)) if has_mapping else set()
+            yield [(row_id, row_id in mapped, row) for row_id, row in zip(row_ids, rows)]
+    
+    finally:
+        if mysql_cursor:
+            try:
+                mysql_cursor.close()
+            except:
+                pass
+        if mysql_conn: mysql_conn.close()
+        if pg_cursor: pg_cursor.close()
+        if pg_conn: pg_conn.close()
+
+def format_export_value(value):
+    if value is None or isinstance(value, (int, float, str, bool)):
+        return value
+    if isinstance(value, (bytes, bytearray)):
+        return value.hex()
+    return str(value)
+
+# Mise en forme des lots selon le format demandé (une chaîne par lot, en-tête et fin à part)
+def render_export_stream(export_format, db_name, table_name, columns, chunks):
+    if export_format == 'ndjson':
+        for chunk in chunks:
+            yield ''.join(json.dumps({"_row_id": row_id, "_transferred": transferred,
+                                      **{col: format_export_value(value) for col, value in zip(columns, row)}},
+                                     default=str) + '\n'
+                          for row_id, transferred, row in chunk)
+    
+    elif export_format == 'json':
+        yield '['
+        first = True
+        for chunk in chunks:
+            parts = []
+            for row_id, transferred, row in chunk:
+                item = {"_row_id": row_id, "_transferred": transferred,
+                        **{col: format_export_value(value) for col, value in zip(columns, row)}}
+                parts.append(('' if first else ',') + '\n' + json.dumps(item, default=str))
+                first = False
+            yield ''.join(parts)
+        yield '\n]\n'
+    
+    elif export_format == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns + ['transferred'])
+        yield buffer.getvalue()
+        for chunk in chunks:
+            buffer.seek(0)
+            buffer.truncate()
+            for _, transferred, row in chunk:
+                writer.writerow([format_export_value(value) for value in row] + ['1' if transferred else '0'])
+            yield buffer.getvalue()
+    
+    else:
+        # Page HTML envoyée par morceaux: l'en-tête s'affiche avant la première ligne lue
+        yield ('<!DOCTYPE html><html lang="fr"><head><meta charset="UTF-8">'
+               f'<title>{html.escape(db_name)}.{html.escape(table_name)}</title>'
+               '<link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css" rel="stylesheet">'
+               '</head><body><div class="container-fluid mt-3">'
+               f'<h1 class="h4">{html.escape(table_name)} <small class="text-muted">({html.escape(db_name)})</small></h1>'
+               '<table class="table table-sm table-striped"><thead><tr><th>Transférée</th>'
+               + ''.join(f'<th>{html.escape(col)}</th>' for col in columns)
+               + '</tr></thead><tbody>\n')
+        for chunk in chunks:
+            yield ''.join(
+                f'<tr class="{"table-success" if transferred else ""}"><td>{"oui" if transferred else "non"}</td>'
+                + ''.join(f'<td>{"" if value is None else html.escape(str(format_export_value(value)))}</td>'
+                          for value in row)
+                + '</tr>\n'
+                for _, transferred, row in chunk)
+        yield '</tbody></table></div></body></html>\n'
+
+@app.route('/database/<db_name>/table/<table_name>/export')
+def export_table(db_name, table_name):
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({"error": f"Format inconnu: {export_format} ({', '.join(EXPORT_FORMATS)})"}), 400
+    if db_name not in ALLOWED_DATABASES:
+        return jsonify({"error": "Base non autorisée"}), 403
+    
+    # Colonnes et clés validées avant d'ouvrir le flux (les erreurs restent des réponses HTTP normales)
+    connection = get_mysql_connection()
+    try:
+        connection.database = db_name
+        cursor = connection.cursor(dictionary=True)
+        table_meta = get_mysql_table_metadata(cursor, db_name, table_name)
+        cursor.close()
+    except DatabaseConnectionError:
+        raise
+    except Exception as e:
+        invalidate_schema_cache_on_error(e)
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+    finally:
+        connection.close()
+    
+    all_columns = table_meta['columns']
+    primary_keys = table_meta['primary_keys']
+    key_columns = get_row_key_columns(table_name, primary_keys) if primary_keys else []
+    columns = [col for col in request.args.getlist('cols') if col in all_columns] or all_columns
+    select_columns = columns + [col for col in key_columns if col not in columns]
+    filters = {key[2:]: value for key, value in request.args.items() if key.startswith('f_')}
+    try:
+        chunk_size = max(1, min(int(request.args.get('chunk_size', EXPORT_CHUNK_SIZE)), 50000))
+    except ValueError:
+        chunk_size = EXPORT_CHUNK_SIZE
+    
+    chunks = stream_table_rows(db_name, table_name, key_columns, select_columns, filters, chunk_size)
+    body = render_export_stream(export_format, db_name, table_name, select_columns, chunks)
+    
+    headers = {'X-Accel-Buffering': 'no'}
+    if export_format != 'html':
+        headers['Content-Disposition'] = f'attachment; filename="{db_name}_{table_name}.{export_format}"'
+    return Response(stream_with_context(body), mimetype=EXPORT_FORMATS[export_format], headers=headers)
 
 @app.route('/transfer', methods=['POST'])
 def transfer_row():
@@ -552,17 +2095,13 @@ def transfer_row():
             clear_mapping_table(pg_cursor, db_name, table_name)
             
             # Réinitialiser les séquences
-            check_and_reset_table(pg_cursor, table_name)
+            reset_sequence_if_empty(pg_cursor, table_name)
         else:
-            # Toujours vérifier et réinitialiser la table si elle est vide
-            pg_cursor.execute(f"SELECT COUNT(*) FROM {table_name.lower()}")
-            row_count = pg_cursor.fetchone()[0]
-            if row_count == 0:
-                # Si la table est vide, on réinitialise la séquence à 1
-                check_and_reset_table(pg_cursor, table_name)
-
-        # Récupération des clés primaires
-        primary_keys = get_primary_keys(mysql_cursor, table_name)
+            # Si la table est vide, on réinitialise la séquence à 1
+            reset_sequence_if_empty(pg_cursor, table_name)
+
+        # Récupération des clés primaires (cache de schéma)
+        primary_keys = get_mysql_table_metadata(mysql_cursor, db_name, table_name)['primary_keys']
         is_composite_key_table = len(primary_keys) > 1
 
         # Cas spécial pour LIGNE_COMMANDE
@@ -591,6 +2130,11 @@ def transfer_row():
         if not row_data:
             return jsonify({"error": "Ligne non trouvée"}), 404
         
+        # Adapter les valeurs MySQL aux types PostgreSQL avant l'INSERT
+        rejected = convert_records(get_value_converters(mysql_cursor, pg_cursor, db_name, table_name), [row_data])
+        if rejected:
+            return jsonify({"error": f"Valeur non convertible: {rejected[0][1]}"}), 400
+        
         # S'assurer que la table de mapping existe
         mapping_table = ensure_mapping_table_exists(pg_cursor, db_name, table_name)
 
@@ -630,105 +2174,2445 @@ def transfer_row():
             RETURNING *
         """
         
-        pg_cursor.execute(insert_sql, values)
-        new_row = pg_cursor.fetchone()
+        pg_cursor.execute(insert_sql, values)
+        new_row = pg_cursor.fetchone()
+        
+        # Gestion de l'enregistrement du mapping selon le type de table
+        if table_name.upper() == 'LIGNE_COMMANDE':
+            # Pour LIGNE_COMMANDE, créer un ID composite pour le mapping
+            old_composite_id = f"{row_data['id_commande']}_{row_data['id_produit']}"
+            
+            # Trouver les indices des colonnes id_commande et id_produit dans le résultat
+            try:
+                pg_positions = get_pg_table_metadata(pg_cursor, table_name)['positions']
+                id_commande_idx = pg_positions['id_commande']
+                id_produit_idx = pg_positions['id_produit']
+                new_composite_id = f"{new_row[id_commande_idx]}_{new_row[id_produit_idx]}"
+            except (KeyError, IndexError, TypeError):
+                # Fallback si on ne peut pas déterminer les indices
+                new_composite_id = f"{new_row[0]}_{new_row[1]}"
+            
+            mapping_pair = (old_composite_id, new_composite_id)
+        else:
+            # Déterminer l'index de la colonne clé primaire dans le résultat
+            pg_positions = get_pg_table_metadata(pg_cursor, table_name)['positions']
+            
+            # Si la clé primaire est id_client, chercher sa position dans le résultat
+            pk_column = primary_keys[0].lower()
+            pk_index = pg_positions.get(pk_column, 0)
+            mapping_pair = (str(row_id), str(new_row[pk_index]))
+        
+        save_id_mappings(pg_cursor, mapping_table, [mapping_pair])
+        
+        # Le nouvel ID vient de la séquence (DEFAULT): pas de réalignement ligne par ligne
+        pg_conn.commit()
+        
+        # Garder le cache des correspondances en phase avec la table de mapping
+        fk_mapping_cache.put_many(db_name, table_name, [mapping_pair])
+
+        return jsonify({"success": True, "message": "Données transférées avec succès"})
+
+    except DatabaseConnectionError:
+        raise
+    except Exception as e:
+        if pg_conn:
+            try:
+                pg_conn.rollback()
+            except:
+                pass
+        invalidate_schema_cache_on_error(e)
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+    finally:
+        if mysql_cursor: mysql_cursor.close()
+        if mysql_conn: mysql_conn.close()
+        if pg_cursor: pg_cursor.close()
+        if pg_conn: pg_conn.close()
+
+# Nombre maximal d'ID par requête IN (...) côté MySQL
+TRANSFER_BATCH_FETCH_SIZE = 1000
+
+# Récupérer plusieurs lignes MySQL en une seule requête WHERE pk IN (...)
+def fetch_rows_by_ids(mysql_cursor, table_name, key_columns, row_ids):
+    rows = []
+    for start in range(0, len(row_ids), TRANSFER_BATCH_FETCH_SIZE):
+        chunk = row_ids[start:start + TRANSFER_BATCH_FETCH_SIZE]
+        if len(key_columns) > 1:
+            # Clé composite: WHERE (a, b) IN ((%s, %s), ...)
+            row_placeholder = f"({', '.join(['%s'] * len(key_columns))})"
+            params = [part for row_id in chunk for part in row_id.split('_', len(key_columns) - 1)]
+            mysql_cursor.execute(f"""
+                SELECT * FROM `{table_name}`
+                WHERE ({', '.join(f'`{col}`' for col in key_columns)})
+                      IN ({', '.join([row_placeholder] * len(chunk))})
+            """, params)
+        else:
+            mysql_cursor.execute(f"""
+                SELECT * FROM `{table_name}`
+                WHERE `{key_columns[0]}` IN ({', '.join(['%s'] * len(chunk))})
+            """, chunk)
+        rows.extend(mysql_cursor.fetchall())
+    return rows
+
+# Convertir un lot de lignes MySQL (dictionnaires) et les indexer par ID; les lignes non convertibles
+# sont écartées et signalées dans results au lieu de faire échouer tout le lot
+def reject_unconvertible_rows(mysql_cursor, pg_cursor, db_name, table_name, key_columns, rows, results):
+    row_ids = [build_row_id(row, key_columns) for row in rows]
+    rejected = convert_records(get_value_converters(mysql_cursor, pg_cursor, db_name, table_name), rows)
+    for position, error in rejected:
+        results[row_ids[position]] = {"success": False, "status": "rejected",
+                                      "error": f"Valeur non convertible: {error}"}
+    rejected_positions = {position for position, _ in rejected}
+    return {row_id: row for position, (row_id, row) in enumerate(zip(row_ids, rows))
+            if position not in rejected_positions}
+
+# Insérer un lot de lignes MySQL (dictionnaires) en un seul INSERT multi-lignes et enregistrer
+# leurs correspondances d'ID; retourne {ancien ID: nouvel ID} (sans commit)
+def insert_rows_with_mapping(pg_cursor, db_name, table_name, primary_keys, identified_rows, mapping_table):
+    if not identified_rows:
+        return {}
+    
+    key_columns = get_row_key_columns(table_name, primary_keys)
+    first_row = identified_rows[0][1]
+    omit_primary_key = table_name.upper() != 'LIGNE_COMMANDE'
+    insert_columns = [col for col in first_row.keys()
+                      if not (omit_primary_key and col in primary_keys)]
+    if not insert_columns:
+        raise ValueError("Aucune colonne valide à insérer")
+
+    # Mapper les clés étrangères colonne par colonne (une requête par colonne)
+    fk_maps = {}
+    for col_name in insert_columns:
+        if resolve_referenced_table(table_name, col_name, db_name)[0]:
+            fk_maps[col_name] = map_foreign_keys_bulk(
+                pg_cursor, db_name, table_name, col_name,
+                [row[col_name] for _, row in identified_rows])
+
+    values = []
+    for _, row in identified_rows:
+        row_values = []
+        for col_name in insert_columns:
+            value = row[col_name]
+            if col_name in fk_maps and value is not None:
+                value = fk_maps[col_name].get(str(value), value)
+            row_values.append(value)
+        values.append(tuple(row_values))
+
+    # Insertion multi-lignes dans PostgreSQL, les ID générés sont retournés dans l'ordre
+    returning = ', '.join(f'"{col.lower()}"' for col in key_columns)
+    new_keys = execute_values(pg_cursor, f"""
+        INSERT INTO {table_name.lower()} ({', '.join(f'"{col.lower()}"' for col in insert_columns)})
+        VALUES %s
+        RETURNING {returning}
+    """, values, page_size=len(values), fetch=True)
+
+    id_pairs = [(row_id, '_'.join(str(part) for part in new_key))
+                for (row_id, _), new_key in zip(identified_rows, new_keys)]
+
+    # Enregistrer toutes les correspondances en une seule requête
+    save_id_mappings(pg_cursor, mapping_table, id_pairs)
+    return dict(id_pairs)
+
+@app.route('/transfer-batch', methods=['POST'])
+def transfer_batch():
+    mysql_conn = None
+    pg_conn = None
+    mysql_cursor = None
+    pg_cursor = None
+
+    try:
+        payload = request.get_json(silent=True) or {}
+        db_name = payload.get('db_name') or request.form.get('db_name')
+        table_name = payload.get('table_name') or request.form.get('table_name')
+        row_ids = payload.get('row_ids') or request.form.getlist('row_ids')
+        row_ids = list(dict.fromkeys(str(row_id) for row_id in row_ids))
+
+        if not db_name or not table_name or not row_ids:
+            return jsonify({"error": "Paramètres db_name, table_name et row_ids requis"}), 400
+
+        # Connexions
+        mysql_conn = get_mysql_connection()
+        mysql_conn.database = db_name
+        mysql_cursor = mysql_conn.cursor(dictionary=True)
+
+        pg_conn = get_postgres_connection()
+        pg_cursor = pg_conn.cursor()
+
+        # Si la table de destination est vide, on réinitialise la séquence à 1 (une seule fois par lot)
+        reset_sequence_if_empty(pg_cursor, table_name)
+
+        # Récupération des clés primaires (cache de schéma)
+        primary_keys = get_mysql_table_metadata(mysql_cursor, db_name, table_name)['primary_keys']
+        key_columns = get_row_key_columns(table_name, primary_keys)
+        if not key_columns:
+            return jsonify({"error": f"Aucune clé primaire trouvée pour {table_name}"}), 400
+
+        results = {}
+        valid_ids = []
+        for row_id in row_ids:
+            if len(key_columns) > 1 and row_id.count('_') < len(key_columns) - 1:
+                results[row_id] = {"success": False, "error": "ID composite invalide"}
+            else:
+                valid_ids.append(row_id)
+
+        # S'assurer que la table de mapping existe et écarter les lignes déjà transférées
+        mapping_table = ensure_mapping_table_exists(pg_cursor, db_name, table_name)
+        already_mapped = get_mapped_ids(pg_cursor, mapping_table, valid_ids)
+        for row_id in already_mapped:
+            results[row_id] = {"success": True, "skipped": True, "new_id": already_mapped[row_id],
+                               "message": "Ligne déjà transférée"}
+        pending_ids = [row_id for row_id in valid_ids if row_id not in already_mapped]
+
+        # Une seule requête MySQL pour tout le lot
+        rows = fetch_rows_by_ids(mysql_cursor, table_name, key_columns, pending_ids) if pending_ids else []
+        rows_by_id = reject_unconvertible_rows(mysql_cursor, pg_cursor, db_name, table_name,
+                                               key_columns, rows, results)
+        for row_id in pending_ids:
+            if row_id not in rows_by_id and row_id not in results:
+                results[row_id] = {"success": False, "error": "Ligne non trouvée"}
+
+        ordered_ids = [row_id for row_id in pending_ids if row_id in rows_by_id]
+        if ordered_ids:
+            new_ids = insert_rows_with_mapping(pg_cursor, db_name, table_name, primary_keys,
+                                               [(row_id, rows_by_id[row_id]) for row_id in ordered_ids],
+                                               mapping_table)
+            for row_id, new_id in new_ids.items():
+                results[row_id] = {"success": True, "new_id": new_id}
+
+            # S'assurer que la séquence est correctement mise à jour (une seule fois par lot)
+            align_sequences(pg_cursor, [table_name])
+
+        pg_conn.commit()
+
+        # Garder le cache des correspondances en phase avec la table de mapping
+        fk_mapping_cache.put_many(db_name, table_name,
+                                  [(row_id, r["new_id"]) for row_id, r in results.items() if r.get("success")])
+
+        transferred = sum(1 for r in results.values() if r.get("success") and not r.get("skipped"))
+        skipped = sum(1 for r in results.values() if r.get("skipped"))
+        failed = sum(1 for r in results.values() if not r.get("success"))
+        return jsonify({
+            "success": True,
+            "message": f"{transferred} ligne(s) transférée(s), {skipped} déjà transférée(s), {failed} échec(s)",
+            "transferred": transferred,
+            "skipped": skipped,
+            "failed": failed,
+            "results": results
+        })
+
+    except DatabaseConnectionError:
+        raise
+    except Exception as e:
+        if pg_conn:
+            try:
+                pg_conn.rollback()
+            except:
+                pass
+        invalidate_schema_cache_on_error(e)
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+    finally:
+        if mysql_cursor: mysql_cursor.close()
+        if mysql_conn: mysql_conn.close()
+        if pg_cursor: pg_cursor.close()
+        if pg_conn: pg_conn.close()
+
+# Taille des lots lus côté MySQL pour la migration complète d'une table
+MIGRATION_CHUNK_SIZE = int(os.getenv('MIGRATION_CHUNK_SIZE', 5000))
+
+# Formater une valeur Python pour COPY ... FROM STDIN (format texte)
+def format_copy_value(value):
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (bytes, bytearray)):
+        return '\\\\x' + bytes(value).hex()
+    if isinstance(value, timedelta):
+        # Les colonnes TIME de MySQL sont retournées sous forme de timedelta
+        total_seconds = int(value.total_seconds())
+        sign = '-' if total_seconds < 0 else ''
+        hours, remainder = divmod(abs(total_seconds), 3600)
+        minutes, seconds = divmod(remainder, 60)
+        return f"{sign}{hours:02d}:{minutes:02d}:{seconds:02d}"
+    if isinstance(value, (set, frozenset)):
+        value = ','.join(sorted(value))
+    text = str(value)
+    return (text.replace('\\', '\\\\')
+                .replace('\t', '\\t')
+                .replace('\n', '\\n')
+                .replace('\r', '\\r'))
+
+# Écrire un lot de lignes avec COPY ... FROM STDIN
+def copy_rows(pg_cursor, table_name, columns, rows):
+    if not rows:
+        return
+    
+    column_list = ', '.join(f'"{col}"' for col in columns)
+    pg_cursor.copy_expert(f"COPY {table_name} ({column_list}) FROM STDIN", CopyRowReader(rows))
+
+# Flux COPY produit à la demande: les lignes (séquence ou générateur) sont formatées au fil des
+# read() de psycopg2 au lieu d'être toutes écrites dans un tampon texte en mémoire
+class CopyRowReader(io.TextIOBase):
+    def __init__(self, rows):
+        self._rows = iter(rows)
+        self._pending = ''
+    
+    def readable(self):
+        return True
+    
+    def read(self, size=-1):
+        parts = [self._pending]
+        length = len(self._pending)
+        while size is None or size < 0 or length < size:
+            row = next(self._rows, None)
+            if row is None:
+                break
+            line = '\t'.join(format_copy_value(value) for value in row) + '\n'
+            parts.append(line)
+            length += len(line)
+        
+        data = ''.join(parts)
+        if size is None or size < 0 or len(data) <= size:
+            self._pending = ''
+            return data
+        self._pending = data[size:]
+        return data[:size]
+
+# Mémoire réservée aux lignes en cours de traitement par chaque worker (migration, synchronisation, export)
+WORKER_MEMORY_LIMIT_MB = int(os.getenv('WORKER_MEMORY_LIMIT_MB', 64))
+ROW_MEMORY_SAMPLE_SIZE = 100
+# Un lot coexiste en deux exemplaires au plus: lignes lues et lignes converties
+ROW_MEMORY_COPIES = 2
+
+# Taille moyenne en mémoire d'une ligne (tuple ou dictionnaire), estimée sur un échantillon
+def estimate_row_bytes(rows):
+    sample = rows[:ROW_MEMORY_SAMPLE_SIZE]
+    total = 0
+    for row in sample:
+        values = row.values() if isinstance(row, dict) else row
+        total += sys.getsizeof(row) + sum(sys.getsizeof(value) for value in values)
+    return max(1, total // max(1, len(sample)))
+
+# Lire un curseur par lots d'au plus chunk_size lignes, réduits pour que chaque lot tienne dans
+# WORKER_MEMORY_LIMIT_MB; la taille est réévaluée à chaque lot (lignes de largeur variable)
+def iter_row_chunks(cursor, chunk_size, label=None, copies=ROW_MEMORY_COPIES):
+    budget = WORKER_MEMORY_LIMIT_MB * 1024 * 1024
+    rows = cursor.fetchmany(min(chunk_size, ROW_MEMORY_SAMPLE_SIZE))
+    fetch_size = chunk_size
+    while rows:
+        limit = max(1, min(chunk_size, budget // (estimate_row_bytes(rows) * copies)))
+        if limit < fetch_size and label:
+            print(f"[Mémoire {label}] lots limités à {limit} ligne(s) ({WORKER_MEMORY_LIMIT_MB} Mo par worker)")
+        fetch_size = limit
+        if len(rows) < fetch_size:
+            # Premier lot: compléter l'échantillon jusqu'à la taille autorisée
+            rows += cursor.fetchmany(fetch_size - len(rows))
+        yield rows
+        rows = cursor.fetchmany(fetch_size)
+
+# Réserver un bloc de nouveaux ID dans une séquence (sans verrou, sûr en concurrence)
+def reserve_sequence_ids(pg_cursor, sequence_name, count):
+    pg_cursor.execute("SELECT nextval(%s) FROM generate_series(1, %s)", (sequence_name, count))
+    return [row[0] for row in pg_cursor.fetchall()]
+
+# Points de reprise des migrations: dernière clé source et numéro du dernier lot validé
+def ensure_migration_checkpoints_table(pg_cursor):
+    if pg_table_exists(pg_cursor, 'migration_checkpoints'):
+        return
+    pg_cursor.execute("""
+        CREATE TABLE IF NOT EXISTS migration_checkpoints (
+            db_name VARCHAR(255) NOT NULL,
+            table_name VARCHAR(255) NOT NULL,
+            last_key TEXT,
+            chunk_seq INTEGER NOT NULL DEFAULT 0,
+            rows_transferred BIGINT NOT NULL DEFAULT 0,
+            status VARCHAR(20) NOT NULL DEFAULT 'running',
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (db_name, table_name)
+        )
+    """)
+
+# Lire le point de reprise d'une table (None si aucune migration commencée)
+def get_migration_checkpoint(pg_cursor, db_name, table_name):
+    pg_cursor.execute("""
+        SELECT last_key, chunk_seq, rows_transferred, status
+        FROM migration_checkpoints
+        WHERE db_name = %s AND table_name = %s
+    """, (db_name, table_name))
+    row = pg_cursor.fetchone()
+    if not row:
+        return None
+    return {
+        "last_key": json.loads(row[0]) if row[0] else None,
+        "chunk_seq": row[1],
+        "rows_transferred": row[2],
+        "status": row[3]
+    }
+
+# Enregistrer le point de reprise dans la transaction du lot (pas de commit ici)
+def save_migration_checkpoint(pg_cursor, db_name, table_name, last_key, chunk_seq, rows_transferred,
+                              status='running'):
+    pg_cursor.execute("""
+        INSERT INTO migration_checkpoints (db_name, table_name, last_key, chunk_seq, rows_transferred, status)
+        VALUES (%s, %s, %s, %s, %s, %s)
+        ON CONFLICT (db_name, table_name) DO UPDATE
+        SET last_key = EXCLUDED.last_key, chunk_seq = EXCLUDED.chunk_seq,
+            rows_transferred = EXCLUDED.rows_transferred, status = EXCLUDED.status,
+            updated_at = CURRENT_TIMESTAMP
+    """, (db_name, table_name, json.dumps(last_key, default=str) if last_key is not None else None,
+          chunk_seq, rows_transferred, status))
+
+# Supprimer les points de reprise (d'une table, d'une base ou de toutes) quand les mappings sont vidés
+def clear_migration_checkpoints(pg_cursor, db_name=None, table_name=None):
+    if not pg_table_exists(pg_cursor, 'migration_checkpoints'):
+        return
+    if db_name and table_name:
+        pg_cursor.execute("DELETE FROM migration_checkpoints WHERE db_name = %s AND table_name = %s",
+                          (db_name, table_name))
+    else:
+        pg_cursor.execute("DELETE FROM migration_checkpoints")
+
+# Migration en pipeline: lecture MySQL, préparation (conversion, clés étrangères, ID) et écriture
+# PostgreSQL se recouvrent au lieu de s'enchaîner. Les files bornées entre étapes assurent la
+# contre-pression: une étape rapide attend la plus lente sans accumuler de lots en mémoire.
+MIGRATION_PIPELINE = os.getenv('MIGRATION_PIPELINE', '1') == '1'
+MIGRATION_PIPELINE_DEPTH = int(os.getenv('MIGRATION_PIPELINE_DEPTH', 2))
+PIPELINE_POLL_SECONDS = 0.5
+_PIPELINE_END = object()
+
+# Lire une file d'étape jusqu'à sa fin (ou jusqu'à l'arrêt du pipeline après une erreur)
+def iter_pipeline_queue(source, stop):
+    while True:
+        try:
+            item = source.get(timeout=PIPELINE_POLL_SECONDS)
+        except queue.Empty:
+            if stop.is_set():
+                return
+            continue
+        if item is _PIPELINE_END or stop.is_set():
+            return
+        yield item
+
+# Déposer un élément dans une file bornée; False si le pipeline a été arrêté entre-temps
+def put_pipeline_item(target, item, stop):
+    while not stop.is_set():
+        try:
+            target.put(item, timeout=PIPELINE_POLL_SECONDS)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+# Thread d'étape: pousse chaque élément produit dans la file suivante, puis la marque terminée
+def run_pipeline_stage(items, target, stop, errors):
+    try:
+        for item in items:
+            if not put_pipeline_item(target, item, stop):
+                return
+        put_pipeline_item(target, _PIPELINE_END, stop)
+    except Exception as e:
+        traceback.print_exc()
+        errors.append(e)
+        stop.set()
+
+# Exécuter lecture -> préparation -> écriture. La préparation utilise sa propre connexion PostgreSQL
+# (lectures des tables de mapping, nextval) pour ne pas partager la transaction d'écriture;
+# l'écriture reste sur le thread appelant, dans l'ordre des lots (points de reprise)
+def run_migration_pipeline(mysql_cursor, chunk_size, label, prepare_chunk, write_chunk):
+    stop = threading.Event()
+    errors = []
+    read_queue = queue.Queue(maxsize=MIGRATION_PIPELINE_DEPTH)
+    prepared_queue = queue.Queue(maxsize=MIGRATION_PIPELINE_DEPTH)
+    lookup_conn = get_postgres_connection()
+    lookup_cursor = lookup_conn.cursor()
+    
+    def prepared_chunks():
+        for rows in iter_pipeline_queue(read_queue, stop):
+            chunk = prepare_chunk(rows, lookup_cursor)
+            # Pas de transaction ouverte entre deux lots (les ID réservés par nextval() restent acquis)
+            lookup_conn.commit()
+            yield chunk
+    
+    # Chaque lot en vol compte dans le budget mémoire du worker
+    copies = ROW_MEMORY_COPIES + 2 * MIGRATION_PIPELINE_DEPTH
+    stages = [
+        threading.Thread(target=run_pipeline_stage, name=f"lecture {label}", daemon=True,
+                         args=(iter_row_chunks(mysql_cursor, chunk_size, label, copies), read_queue, stop, errors)),
+        threading.Thread(target=run_pipeline_stage, name=f"préparation {label}", daemon=True,
+                         args=(prepared_chunks(), prepared_queue, stop, errors)),
+    ]
+    started = []
+    try:
+        for stage in stages:
+            stage.start()
+            started.append(stage)
+        for chunk in iter_pipeline_queue(prepared_queue, stop):
+            write_chunk(chunk)
+    except Exception:
+        stop.set()
+        raise
+    finally:
+        if errors or sys.exc_info()[0]:
+            stop.set()
+        # Les étapes sont arrêtées avant que l'appelant ne ferme le curseur MySQL qu'elles lisent
+        for stage in started:
+            stage.join()
+        try:
+            lookup_conn.rollback()
+            lookup_cursor.close()
+            lookup_conn.close()
+        except Exception as e:
+            print(f"Fermeture de la connexion de préparation {label}: {e}")
+    
+    if errors:
+        raise errors[0]
+
+# Migrer une table complète en flux: curseur MySQL non bufferisé + COPY PostgreSQL
+# manage_sequences=False quand plusieurs migrations écrivent en parallèle dans la même table cible:
+# les ID sont alors uniquement réservés par nextval(), jamais réinitialisés
+# deferred_columns: clés étrangères d'un cycle, chargées à NULL puis corrigées par fixup_deferred_foreign_keys()
+# resume=True: reprise après la dernière clé du dernier lot validé (migration_checkpoints)
+# key_range=(début, fin): seulement les lignes dont la première colonne de clé est dans l'intervalle
+# (bornes incluses, None = non borné); une plage ne lit ni ne modifie le point de reprise de la table
+# pipelined: lecture MySQL, préparation et écriture PostgreSQL sur trois threads (run_migration_pipeline)
+def migrate_table(db_name, table_name, chunk_size=None, manage_sequences=True, deferred_columns=None,
+                  progress=None, resume=True, key_range=None, pipelined=None):
+    chunk_size = chunk_size or MIGRATION_CHUNK_SIZE
+    pipelined = MIGRATION_PIPELINE if pipelined is None else pipelined
+    started_at = time.time()
+    summary = {
+        "db_name": db_name,
+        "table_name": table_name,
+        "rows_read": 0,
+        "rows_transferred": 0,
+        "rows_skipped": 0,
+        "rows_rejected": 0,
+        "chunks": 0,
+        "pipelined": pipelined
+    }
+    
+    mysql_conn = None
+    pg_conn = None
+    mysql_cursor = None
+    pg_cursor = None
+    
+    try:
+        mysql_conn = get_mysql_connection()
+        mysql_conn.database = db_name
+        
+        pg_conn = get_postgres_connection()
+        pg_cursor = pg_conn.cursor()
+        
+        # Métadonnées lues avant d'ouvrir le flux (un curseur non bufferisé bloque la connexion)
+        meta_cursor = mysql_conn.cursor(dictionary=True)
+        primary_keys = get_mysql_table_metadata(meta_cursor, db_name, table_name)['primary_keys']
+        converters = get_value_converters(meta_cursor, pg_cursor, db_name, table_name)
+        meta_cursor.close()
+        key_columns = get_row_key_columns(table_name, primary_keys)
+        if not key_columns:
+            raise ValueError(f"Aucune clé primaire trouvée pour {table_name}")
+        
+        keep_primary_key = table_name.upper() == 'LIGNE_COMMANDE'
+        target_table = table_name.lower()
+        # Les colonnes remplacées (clé primaire régénérée, clés différées chargées à NULL) ne sont pas converties
+        converters = {col: convert for col, convert in converters.items()
+                      if (keep_primary_key or col not in primary_keys) and col not in (deferred_columns or ())}
+        
+        # Si la table de destination est vide, on réinitialise la séquence à 1. Le verrou de la
+        # réinitialisation est gardé jusqu'au premier lot de lignes validé: une autre migration ou un
+        # /transfer-batch concurrent ne voit pas la table vide pendant que nos ID sont réservés
+        sequence_locked = manage_sequences and reset_sequence_if_empty(pg_cursor, table_name)
+        
+        sequence_name = None
+        if not keep_primary_key:
+            pg_meta = get_pg_table_metadata(pg_cursor, table_name) or {'sequences': {}}
+            sequence_name = pg_meta['sequences'].get(key_columns[0].lower())
+            if not sequence_name:
+                raise ValueError(f"Aucune séquence trouvée pour {table_name}.{key_columns[0]}, "
+                                 f"utilisez /transfer-batch pour cette table")
+        
+        mapping_table = ensure_mapping_table_exists(pg_cursor, db_name, table_name)
+        checkpointed = key_range is None
+        ensure_migration_checkpoints_table(pg_cursor)
+        checkpoint = get_migration_checkpoint(pg_cursor, db_name, table_name) if resume and checkpointed else None
+        if not resume and checkpointed:
+            clear_migration_checkpoints(pg_cursor, db_name, table_name)
+        if not sequence_locked:
+            pg_conn.commit()
+        
+        # Lecture dans l'ordre de la clé: chaque lot validé fait avancer le point de reprise
+        key_list = ', '.join(f'`{col}`' for col in key_columns)
+        conditions = []
+        select_params = []
+        chunk_seq = 0
+        rows_transferred_before = 0
+        if key_range:
+            low, high = key_range
+            if low is not None:
+                conditions.append(f"`{key_columns[0]}` >= %s")
+                select_params.append(low)
+            if high is not None:
+                conditions.append(f"`{key_columns[0]}` <= %s")
+                select_params.append(high)
+            summary["key_range"] = [low, high]
+        if checkpoint and checkpoint["last_key"] is not None:
+            placeholders = ', '.join(['%s'] * len(key_columns))
+            conditions.append(f"({key_list}) > ({placeholders})")
+            select_params.extend(checkpoint["last_key"])
+            chunk_seq = checkpoint["chunk_seq"]
+            rows_transferred_before = checkpoint["rows_transferred"]
+            summary["resumed_after"] = checkpoint["last_key"]
+            print(f"[Migration {db_name}.{table_name}] reprise après la clé {checkpoint['last_key']} "
+                  f"(lot {chunk_seq})")
+        select_sql = f"SELECT * FROM `{table_name}`"
+        if conditions:
+            select_sql += f" WHERE {' AND '.join(conditions)}"
+        select_sql += f" ORDER BY {key_list}"
+        
+        # Curseur côté serveur: les lignes arrivent au fil des fetchmany()
+        mysql_cursor = mysql_conn.cursor(buffered=False)
+        mysql_cursor.execute(select_sql, tuple(select_params))
+        source_columns = list(mysql_cursor.column_names)
+        key_indexes = [source_columns.index(col) for col in key_columns]
+        deferred_columns = set(deferred_columns or ())
+        deferred_indexes = [idx for idx, col in enumerate(source_columns) if col in deferred_columns]
+        fk_indexes = {idx: col for idx, col in enumerate(source_columns)
+                      if col not in deferred_columns
+                      and (keep_primary_key or col not in primary_keys)
+                      and resolve_referenced_table(table_name, col, db_name)[0]}
+        
+        if keep_primary_key:
+            target_columns = [col.lower() for col in source_columns]
+            copied_indexes = list(range(len(source_columns)))
+        else:
+            # La clé primaire est remplacée par un ID réservé dans la séquence PostgreSQL
+            copied_indexes = [idx for idx, col in enumerate(source_columns) if col not in primary_keys]
+            target_columns = [key_columns[0].lower()] + [source_columns[idx].lower() for idx in copied_indexes]
+        
+        # Étape de préparation: lignes déjà transférées, conversion, clés étrangères et ID réservés.
+        # Ne touche pas à summary ni à la transaction d'écriture (peut tourner sur son propre thread)
+        def prepare_chunk(rows, lookup_cursor):
+            chunk = {"rows_read": len(rows), "last_key": [rows[-1][idx] for idx in key_indexes]}
+            
+            # Écarter les lignes déjà transférées
+            row_ids = ['_'.join(str(row[idx]) for idx in key_indexes) for row in rows]
+            already_mapped = get_mapped_ids(lookup_cursor, mapping_table, row_ids)
+            pending = [(row_id, row) for row_id, row in zip(row_ids, rows) if row_id not in already_mapped]
+            chunk["skipped"] = len(rows) - len(pending)
+            
+            # Conversion des valeurs colonne par colonne sur tout le lot; une valeur invalide écarte sa ligne
+            converted, rejected = convert_rows(converters, source_columns, [row for _, row in pending])
+            chunk["rejected"] = [(pending[position][0], error) for position, error in rejected]
+            if rejected:
+                rejected_positions = {position for position, _ in rejected}
+                pending = [item for position, item in enumerate(pending) if position not in rejected_positions]
+            chunk["pending"] = [(row_id, row) for (row_id, _), row in zip(pending, converted)]
+            if not chunk["pending"]:
+                return chunk
+            
+            # Mapper les clés étrangères en mémoire, une requête par colonne et par lot
+            chunk["fk_maps"] = {
+                idx: map_foreign_keys_bulk(lookup_cursor, db_name, table_name, col,
+                                           [row[idx] for _, row in chunk["pending"]])
+                for idx, col in fk_indexes.items()
+            }
+            
+            if keep_primary_key:
+                chunk["new_ids"] = [None] * len(chunk["pending"])
+            else:
+                chunk["new_ids"] = reserve_sequence_ids(lookup_cursor, sequence_name, len(chunk["pending"]))
+            return chunk
+        
+        # Étape d'écriture: COPY, correspondances d'ID et point de reprise dans une transaction par lot
+        def write_chunk(chunk):
+            nonlocal chunk_seq, sequence_locked
+            summary["rows_read"] += chunk["rows_read"]
+            summary["rows_skipped"] += chunk["skipped"]
+            summary["chunks"] += 1
+            chunk_seq += 1
+            if chunk["rejected"]:
+                record_rejected_rows(summary, chunk["rejected"])
+            
+            pending = chunk["pending"]
+            if not pending:
+                if checkpointed:
+                    save_migration_checkpoint(pg_cursor, db_name, table_name, chunk["last_key"], chunk_seq,
+                                              rows_transferred_before + summary["rows_transferred"])
+                    if not sequence_locked:
+                        pg_conn.commit()
+                if progress:
+                    progress(db_name, table_name, chunk["rows_read"])
+                return
+            
+            # Lignes cibles produites une à une pendant le COPY (pas de tampon du lot entier);
+            # id_pairs se remplit au fil de la lecture et est complet au retour de copy_rows
+            fk_maps = chunk["fk_maps"]
+            id_pairs = []
+            def target_rows():
+                for (row_id, row), new_id in zip(pending, chunk["new_ids"]):
+                    values = list(row)
+                    for idx, fk_map in fk_maps.items():
+                        if values[idx] is not None:
+                            values[idx] = fk_map.get(str(values[idx]), values[idx])
+                    for idx in deferred_indexes:
+                        values[idx] = None
+                    
+                    if keep_primary_key:
+                        new_id = '_'.join(str(values[idx]) for idx in key_indexes)
+                        id_pairs.append((row_id, new_id))
+                        yield values
+                    else:
+                        id_pairs.append((row_id, new_id))
+                        yield [new_id] + [values[idx] for idx in copied_indexes]
+            
+            copy_rows(pg_cursor, target_table, target_columns, target_rows())
+            copy_id_mappings(pg_cursor, mapping_table, id_pairs)
+            summary["rows_transferred"] += len(pending)
+            # Point de reprise validé avec le lot: un redémarrage ne relit pas les lots terminés
+            if checkpointed:
+                save_migration_checkpoint(pg_cursor, db_name, table_name, chunk["last_key"], chunk_seq,
+                                          rows_transferred_before + summary["rows_transferred"])
+            pg_conn.commit()
+            sequence_locked = False
+            fk_mapping_cache.put_many(db_name, table_name, id_pairs)
+            
+            print(f"[Migration {db_name}.{table_name}] lot {summary['chunks']}: "
+                  f"{summary['rows_transferred']} ligne(s) transférée(s)")
+            if progress:
+                progress(db_name, table_name, chunk["rows_read"])
+        
+        label = f"{db_name}.{table_name}"
+        if pipelined:
+            run_migration_pipeline(mysql_cursor, chunk_size, label, prepare_chunk, write_chunk)
+        else:
+            for rows in iter_row_chunks(mysql_cursor, chunk_size, label):
+                write_chunk(prepare_chunk(rows, pg_cursor))
+        
+        # Fin de lecture: le point de reprise garde la dernière clé pour ne lire que les nouvelles lignes
+        if checkpointed:
+            checkpoint = get_migration_checkpoint(pg_cursor, db_name, table_name)
+            save_migration_checkpoint(pg_cursor, db_name, table_name,
+                                      checkpoint["last_key"] if checkpoint else None, chunk_seq,
+                                      rows_transferred_before + summary["rows_transferred"], 'completed')
+        
+        # S'assurer que la séquence est correctement mise à jour (une seule fois en fin de migration)
+        if manage_sequences:
+            align_sequences(pg_cursor, [table_name])
+        pg_conn.commit()
+        
+        summary["duration_seconds"] = round(time.time() - started_at, 3)
+        return summary
+    
+    except Exception as e:
+        if pg_conn:
+            try:
+                pg_conn.rollback()
+            except:
+                pass
+        invalidate_schema_cache_on_error(e)
+        raise
+    
+    finally:
+        # Après un échec en cours de lecture, le curseur non bufferisé a encore des lignes non lues:
+        # la fermeture peut échouer et ne doit pas remplacer l'erreur d'origine
+        if mysql_cursor:
+            try:
+                mysql_cursor.close()
+            except:
+                pass
+        if mysql_conn:
+            try:
+                mysql_conn.close()
+            except Exception as e:
+                print(f"Fermeture de la connexion MySQL ({db_name}.{table_name}): {e}")
+        if pg_cursor: pg_cursor.close()
+        if pg_conn: pg_conn.close()
+
+@app.route('/migrate-table', methods=['POST'])
+def migrate_table_route():
+    try:
+        payload = request.get_json(silent=True) or request.form
+        db_name = payload.get('db_name')
+        table_name = payload.get('table_name')
+        chunk_size = int(payload.get('chunk_size') or MIGRATION_CHUNK_SIZE)
+        # restart=true ignore le point de reprise et relit toute la table (les lignes déjà mappées restent ignorées)
+        restart = str(payload.get('restart', '')).lower() in ('1', 'true', 'on')
+        
+        if not db_name or not table_name:
+            return jsonify({"error": "Paramètres db_name et table_name requis"}), 400
+        
+        summary = migrate_table(db_name, table_name, chunk_size, resume=not restart)
+        return jsonify({
+            "success": True,
+            "message": f"{summary['rows_transferred']} ligne(s) transférée(s) pour {table_name}",
+            "summary": summary
+        })
+    
+    except DatabaseConnectionError:
+        raise
+    except Exception as e:
+        invalidate_schema_cache_on_error(e)
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+# Ordre par défaut (utilisé pour l'affichage et quand le schéma ne peut pas être lu)
+DEFAULT_TABLE_ORDER = [
+    'CLIENT',
+    'PRODUIT',
+    'VENDEUR',
+    'COMMANDE',
+    'LIGNE_COMMANDE',
+    'AVIS'
+]
+
+# Graphe des clés étrangères d'une base MySQL, lu dans information_schema
+# {'tables': [...], 'foreign_keys': {table: {colonne: {'table': ..., 'pk': ...}}}}
+def get_foreign_key_graph(db_name):
+    def load():
+        connection = get_mysql_connection()
+        try:
+            cursor = connection.cursor(dictionary=True)
+            cursor.execute("""
+                SELECT TABLE_NAME FROM information_schema.TABLES
+                WHERE TABLE_SCHEMA = %s AND TABLE_TYPE = 'BASE TABLE'
+            """, (db_name,))
+            tables = [row['TABLE_NAME'] for row in cursor.fetchall()]
+            
+            cursor.execute("""
+                SELECT TABLE_NAME, COLUMN_NAME, REFERENCED_TABLE_NAME, REFERENCED_COLUMN_NAME
+                FROM information_schema.KEY_COLUMN_USAGE
+                WHERE TABLE_SCHEMA = %s AND REFERENCED_TABLE_NAME IS NOT NULL
+            """, (db_name,))
+            declared = cursor.fetchall()
+            
+            cursor.execute("""
+                SELECT TABLE_NAME, COLUMN_NAME, COLUMN_KEY
+                FROM information_schema.COLUMNS
+                WHERE TABLE_SCHEMA = %s AND COLUMN_NAME LIKE 'id\\_%%'
+            """, (db_name,))
+            id_columns = cursor.fetchall()
+            cursor.close()
+        finally:
+            connection.close()
+        
+        graph = {table: {} for table in tables}
+        for row in declared:
+            graph.setdefault(row['TABLE_NAME'], {})[row['COLUMN_NAME']] = {
+                'table': row['REFERENCED_TABLE_NAME'], 'pk': row['REFERENCED_COLUMN_NAME']
+            }
+        
+        # Colonnes sans contrainte déclarée (tables MyISAM, schémas partiellement contraints):
+        # relations connues, puis colonnes id_<table>
+        tables_by_upper = {table.upper(): table for table in tables}
+        primary_counts = {}
+        for row in id_columns:
+            if row['COLUMN_KEY'] == 'PRI':
+                primary_counts[row['TABLE_NAME']] = primary_counts.get(row['TABLE_NAME'], 0) + 1
+        for row in id_columns:
+            table, column = row['TABLE_NAME'], row['COLUMN_NAME']
+            if table not in graph or column in graph[table]:
+                continue
+            known = TABLE_RELATIONS.get(table.upper(), {}).get(column)
+            referenced = tables_by_upper.get(known['table'].upper() if known else column[3:].upper())
+            if not referenced:
+                continue
+            # La clé primaire simple d'une table (CLIENT.id_client) n'est pas une clé étrangère
+            if referenced == table and row['COLUMN_KEY'] == 'PRI' and primary_counts.get(table) == 1:
+                continue
+            graph[table][column] = {'table': referenced, 'pk': known['pk'] if known else column}
+        
+        return {'tables': tables, 'foreign_keys': graph}
+    
+    return schema_cache.get(('mysql_fk_graph', db_name.lower()), load)
+
+# Clé de tri stable: ordre par défaut connu, puis ordre alphabétique
+def _table_sort_key(table_name):
+    upper = table_name.upper()
+    if upper in DEFAULT_TABLE_ORDER:
+        return (0, DEFAULT_TABLE_ORDER.index(upper), upper)
+    return (1, 0, upper)
+
+# Construire le plan de migration depuis le graphe: ordre topologique, dépendances,
+# et colonnes dont le mapping est différé pour casser les cycles (auto-références comprises)
+def build_dependency_plan(graph):
+    foreign_keys = graph['foreign_keys']
+    tables = sorted(graph['tables'], key=_table_sort_key)
+    dependencies = {table: set() for table in tables}
+    deferred_columns = {table: set() for table in tables}
+    
+    for table in tables:
+        for column, reference in foreign_keys.get(table, {}).items():
+            parent = reference['table']
+            if parent not in dependencies:
+                continue
+            if parent == table:
+                deferred_columns[table].add(column)
+            else:
+                dependencies[table].add(parent)
+    
+    order = []
+    remaining = {table: set(parents) for table, parents in dependencies.items()}
+    while remaining:
+        ready = [table for table in sorted(remaining, key=_table_sort_key)
+                 if not remaining[table] & remaining.keys()]
+        if not ready:
+            # Cycle: la première table du cycle est chargée sans ses clés vers les tables restantes
+            table = min(remaining, key=_table_sort_key)
+            cyclic_parents = remaining[table] & remaining.keys()
+            for column, reference in foreign_keys.get(table, {}).items():
+                if reference['table'] in cyclic_parents:
+                    deferred_columns[table].add(column)
+            remaining[table] -= cyclic_parents
+            dependencies[table] -= cyclic_parents
+            print(f"[Cycle de clés étrangères] {table}: mapping différé pour {sorted(deferred_columns[table])}")
+            continue
+        for table in ready:
+            order.append(table)
+            del remaining[table]
+    
+    return order, dependencies, deferred_columns
+
+# Fonction pour gérer l'ordre de transfert des tables
+def get_table_dependency_order(db_name=None):
+    if not db_name:
+        return list(DEFAULT_TABLE_ORDER)
+    
+    # Ordre déduit des clés étrangères réelles de la base
+    try:
+        order, _, _ = build_dependency_plan(get_foreign_key_graph(db_name))
+        return order
+    except DatabaseConnectionError:
+        raise
+    except Exception as e:
+        print(f"Erreur lors de la lecture du graphe de dépendances de {db_name}: {e}")
+        return list(DEFAULT_TABLE_ORDER)
+
+# Exécuter une tâche par table dès que toutes ses tables parentes ont réussi
+def run_dependency_dag(tables, dependencies, task, max_workers):
+    results = {}
+    pending = list(tables)
+    running = {}
+    
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        while pending or running:
+            for table in list(pending):
+                parents = dependencies.get(table, set())
+                if any(parent in results and results[parent].get("error") for parent in parents):
+                    results[table] = {"table_name": table, "error": "Table parente en échec, table ignorée"}
+                    pending.remove(table)
+                elif all(parent in results for parent in parents):
+                    running[executor.submit(task, table)] = table
+                    pending.remove(table)
+            
+            if not running:
+                break
+            
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                table = running.pop(future)
+                try:
+                    results[table] = future.result()
+                except Exception as e:
+                    traceback.print_exc()
+                    results[table] = {"table_name": table, "error": str(e)}
+    
+    return results
+
+# Nombre de bases migrées en parallèle vers central_db (configurable dans .env)
+MIGRATION_WORKERS = int(os.getenv('MIGRATION_WORKERS', len(ALLOWED_DATABASES)))
+
+# Nombre de tables d'une même base migrées en parallèle (configurable dans .env)
+MIGRATION_TABLE_WORKERS = int(os.getenv('MIGRATION_TABLE_WORKERS', 3))
+
+# Renseigner après coup les clés étrangères différées (cycles): relecture de la clé et des
+# colonnes concernées dans MySQL, puis un UPDATE ... FROM (VALUES ...) par lot
+def fixup_deferred_foreign_keys(db_name, table_name, columns, chunk_size=None):
+    chunk_size = chunk_size or MIGRATION_CHUNK_SIZE
+    columns = sorted(columns)
+    updated = 0
+    
+    mysql_conn = None
+    pg_conn = None
+    mysql_cursor = None
+    pg_cursor = None
+    
+    try:
+        mysql_conn = get_mysql_connection()
+        mysql_conn.database = db_name
+        pg_conn = get_postgres_connection()
+        pg_cursor = pg_conn.cursor()
+        
+        meta_cursor = mysql_conn.cursor(dictionary=True)
+        primary_keys = get_mysql_table_metadata(meta_cursor, db_name, table_name)['primary_keys']
+        meta_cursor.close()
+        if len(primary_keys) != 1:
+            print(f"[Clés différées] {table_name}: clé composite, correction ignorée")
+            return 0
+        
+        pg_meta = get_pg_table_metadata(pg_cursor, table_name)
+        pk_column = primary_keys[0].lower()
+        mapping_table = get_mapping_table_name(db_name, table_name)
+        value_columns = [pk_column] + [col.lower() for col in columns]
+        casts = [pg_meta['full_types'].get(col, 'text') for col in value_columns]
+        
+        mysql_cursor = mysql_conn.cursor(buffered=False)
+        column_list = ', '.join(f'`{col}`' for col in [primary_keys[0]] + columns)
+        mysql_cursor.execute(f"SELECT {column_list} FROM `{table_name}`")
+        
+        while True:
+            rows = mysql_cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            
+            new_pks = get_mapped_ids(pg_cursor, mapping_table, [row[0] for row in rows])
+            fk_maps = [map_foreign_keys_bulk(pg_cursor, db_name, table_name, col, [row[i + 1] for row in rows])
+                       for i, col in enumerate(columns)]
+            
+            values = []
+            for row in rows:
+                new_pk = new_pks.get(str(row[0]))
+                if new_pk is None:
+                    continue
+                mapped = [None if row[i + 1] is None else fk_maps[i].get(str(row[i + 1]))
+                          for i in range(len(columns))]
+                values.append(tuple([new_pk] + mapped))
+            if not values:
+                continue
+            
+            set_clause = ', '.join(f'"{col}" = v."{col}"::{cast}'
+                                   for col, cast in zip(value_columns[1:], casts[1:]))
+            execute_values(pg_cursor, f"""
+                UPDATE {table_name.lower()} AS t
+                SET {set_clause}
+                FROM (VALUES %s) AS v({', '.join(f'"{col}"' for col in value_columns)})
+                WHERE t."{pk_column}" = v."{pk_column}"::{casts[0]}
+            """, values, page_size=len(values))
+            pg_conn.commit()
+            updated += len(values)
+        
+        print(f"[Clés différées] {table_name}: {updated} ligne(s) corrigée(s) pour {columns}")
+        return updated
+    
+    except Exception as e:
+        if pg_conn:
+            try:
+                pg_conn.rollback()
+            except:
+                pass
+        invalidate_schema_cache_on_error(e)
+        raise
+    
+    finally:
+        if mysql_cursor:
+            try:
+                mysql_cursor.close()
+            except:
+                pass
+        if mysql_conn: mysql_conn.close()
+        if pg_cursor: pg_cursor.close()
+        if pg_conn: pg_conn.close()
+
+# Traduction du schéma MySQL en DDL PostgreSQL: tables créées avec leur seule clé primaire en mode
+# chargement en masse, index secondaires et clés étrangères construits après le chargement
+SCHEMA_BUILD_WORKERS = int(os.getenv('SCHEMA_BUILD_WORKERS', 4))
+PG_IDENTIFIER_MAX_LENGTH = 63
+MYSQL_TEXT_TYPES = ('tinytext', 'text', 'mediumtext', 'longtext', 'enum', 'set')
+MYSQL_BINARY_TYPES = ('binary', 'varbinary', 'tinyblob', 'blob', 'mediumblob', 'longblob')
+FOREIGN_KEY_RULES = ('CASCADE', 'SET NULL', 'SET DEFAULT', 'RESTRICT', 'NO ACTION')
+
+def pg_identifier(*parts):
+    return '_'.join(str(part).lower() for part in parts if part)[:PG_IDENTIFIER_MAX_LENGTH]
+
+# Type PostgreSQL d'une colonne d'information_schema.COLUMNS
+def translate_mysql_type(column):
+    data_type = _decode_text(column['DATA_TYPE']).lower()
+    column_type = _decode_text(column['COLUMN_TYPE']).lower()
+    unsigned = 'unsigned' in column_type
+    
+    if data_type == 'tinyint':
+        return 'boolean' if column_type.startswith('tinyint(1)') else 'smallint'
+    if data_type in ('smallint', 'year'):
+        return 'integer' if unsigned else 'smallint'
+    if data_type in ('mediumint', 'int', 'integer'):
+        return 'bigint' if unsigned and data_type != 'mediumint' else 'integer'
+    if data_type == 'bigint':
+        return 'numeric(20)' if unsigned else 'bigint'
+    if data_type in ('decimal', 'numeric'):
+        return f"numeric({column['NUMERIC_PRECISION']},{column['NUMERIC_SCALE']})"
+    if data_type == 'float':
+        return 'real'
+    if data_type in ('double', 'real'):
+        return 'double precision'
+    if data_type == 'bit':
+        return 'boolean' if column['NUMERIC_PRECISION'] == 1 else 'bigint'
+    if data_type == 'char':
+        return f"char({column['CHARACTER_MAXIMUM_LENGTH']})"
+    if data_type == 'varchar':
+        return f"varchar({column['CHARACTER_MAXIMUM_LENGTH']})"
+    if data_type in MYSQL_TEXT_TYPES:
+        return 'text'
+    if data_type == 'json':
+        return 'jsonb'
+    if data_type in MYSQL_BINARY_TYPES:
+        return 'bytea'
+    if data_type in ('datetime', 'timestamp'):
+        precision = column.get('DATETIME_PRECISION')
+        return f"timestamp({precision})" if precision else 'timestamp'
+    if data_type in ('date', 'time'):
+        return data_type
+    return 'text'
+
+# Valeur par défaut PostgreSQL d'une colonne (None si absente ou non traduisible)
+def translate_mysql_default(column, pg_type):
+    default = _decode_text(column['COLUMN_DEFAULT'])
+    if default is None or default.upper() == 'NULL':
+        return None
+    if default.upper().startswith('CURRENT_TIMESTAMP') or default.lower().startswith('now('):
+        return 'CURRENT_TIMESTAMP'
+    if 'default_generated' in _decode_text(column['EXTRA'] or '').lower():
+        # Expression MySQL 8 autre que CURRENT_TIMESTAMP: pas d'équivalent générique
+        return None
+    if len(default) >= 2 and default[0] == default[-1] == "'":
+        # MariaDB renvoie les littéraux entre apostrophes
+        default = default[1:-1].replace("''", "'")
+    
+    if pg_type == 'boolean':
+        return 'true' if default in ('1', "b'1'") else 'false'
+    if pg_type.startswith(('timestamp', 'date')) and _is_zero_date(default):
+        return None
+    if pg_type.startswith(('smallint', 'integer', 'bigint', 'numeric', 'real', 'double')):
+        try:
+            float(default)
+        except ValueError:
+            return None
+        return default
+    return "'" + default.replace("'", "''") + "'"
+
+# Définition complète d'une base MySQL en trois requêtes information_schema (mise en cache)
+def get_mysql_schema_definition(db_name):
+    def load():
+        connection = get_mysql_connection()
+        try:
+            cursor = connection.cursor(dictionary=True)
+            cursor.execute("""
+                SELECT TABLE_NAME, COLUMN_NAME, DATA_TYPE, COLUMN_TYPE, IS_NULLABLE, COLUMN_DEFAULT, EXTRA,
+                       CHARACTER_MAXIMUM_LENGTH, NUMERIC_PRECISION, NUMERIC_SCALE, DATETIME_PRECISION
+                FROM information_schema.COLUMNS
+                WHERE TABLE_SCHEMA = %s
+                ORDER BY TABLE_NAME, ORDINAL_POSITION
+            """, (db_name,))
+            columns = cursor.fetchall()
+            
+            cursor.execute("""
+                SELECT TABLE_NAME, INDEX_NAME, NON_UNIQUE, COLUMN_NAME, INDEX_TYPE
+                FROM information_schema.STATISTICS
+                WHERE TABLE_SCHEMA = %s
+                ORDER BY TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX
+            """, (db_name,))
+            index_columns = cursor.fetchall()
+            
+            cursor.execute("""
+                SELECT k.TABLE_NAME, k.CONSTRAINT_NAME, k.COLUMN_NAME, k.REFERENCED_TABLE_NAME,
+                       k.REFERENCED_COLUMN_NAME, r.UPDATE_RULE, r.DELETE_RULE
+                FROM information_schema.KEY_COLUMN_USAGE k
+                JOIN information_schema.REFERENTIAL_CONSTRAINTS r
+                  ON r.CONSTRAINT_SCHEMA = k.CONSTRAINT_SCHEMA
+                 AND r.TABLE_NAME = k.TABLE_NAME
+                 AND r.CONSTRAINT_NAME = k.CONSTRAINT_NAME
+                WHERE k.TABLE_SCHEMA = %s AND k.REFERENCED_TABLE_NAME IS NOT NULL
+                ORDER BY k.TABLE_NAME, k.CONSTRAINT_NAME, k.ORDINAL_POSITION
+            """, (db_name,))
+            foreign_key_columns = cursor.fetchall()
+            cursor.close()
+        finally:
+            connection.close()
+        
+        tables = {}
+        for column in columns:
+            tables.setdefault(column['TABLE_NAME'], {'columns': [], 'indexes': {}, 'foreign_keys': {}})
+            tables[column['TABLE_NAME']]['columns'].append(column)
+        for row in index_columns:
+            if row['TABLE_NAME'] in tables:
+                index = tables[row['TABLE_NAME']]['indexes'].setdefault(
+                    row['INDEX_NAME'], {'unique': not int(row['NON_UNIQUE']), 'type': row['INDEX_TYPE'],
+                                        'columns': []})
+                index['columns'].append(row['COLUMN_NAME'])
+        for row in foreign_key_columns:
+            if row['TABLE_NAME'] in tables:
+                foreign_key = tables[row['TABLE_NAME']]['foreign_keys'].setdefault(
+                    row['CONSTRAINT_NAME'], {'table': row['REFERENCED_TABLE_NAME'], 'columns': [],
+                                             'referenced_columns': [], 'on_update': row['UPDATE_RULE'],
+                                             'on_delete': row['DELETE_RULE']})
+                foreign_key['columns'].append(row['COLUMN_NAME'])
+                foreign_key['referenced_columns'].append(row['REFERENCED_COLUMN_NAME'])
+        return tables
+    
+    return schema_cache.get(('mysql_schema', db_name.lower()), load)
+
+# DDL PostgreSQL d'une table: CREATE TABLE (avec sa clé primaire), index secondaires et clés étrangères.
+# deferred_columns: colonnes chargées à NULL puis corrigées (cycles), jamais NOT NULL
+def build_table_ddl(table_name, definition, deferred_columns=()):
+    target_table = table_name.lower()
+    lines = []
+    for column in definition['columns']:
+        pg_type = translate_mysql_type(column)
+        auto_increment = 'auto_increment' in _decode_text(column['EXTRA'] or '').lower()
+        if auto_increment and pg_type.startswith('numeric'):
+            # Une colonne d'identité PostgreSQL doit être entière (BIGINT UNSIGNED AUTO_INCREMENT)
+            pg_type = 'bigint'
+        line = f'"{column["COLUMN_NAME"].lower()}" {pg_type}'
+        if auto_increment:
+            line += ' GENERATED BY DEFAULT AS IDENTITY'
+        else:
+            default = translate_mysql_default(column, pg_type)
+            if default is not None:
+                line += f' DEFAULT {default}'
+        # Les dates « zéro » de MySQL deviennent NULL: une colonne de date reste nullable
+        if (column['IS_NULLABLE'] == 'NO' and column['COLUMN_NAME'] not in deferred_columns
+                and not pg_type.startswith(('date', 'timestamp'))):
+            line += ' NOT NULL'
+        lines.append(line)
+    
+    primary = definition['indexes'].get('PRIMARY')
+    if primary:
+        key_columns = ', '.join(f'"{col.lower()}"' for col in primary['columns'])
+        lines.append(f'CONSTRAINT "{pg_identifier(target_table, "pkey")}" PRIMARY KEY ({key_columns})')
+    create = f'CREATE TABLE IF NOT EXISTS "{target_table}" (\n    ' + ',\n    '.join(lines) + '\n)'
+    
+    indexes = []
+    for index_name, index in sorted(definition['indexes'].items()):
+        if index_name == 'PRIMARY' or index['type'] in ('FULLTEXT', 'SPATIAL'):
+            continue
+        name = pg_identifier('idx', target_table, index_name)
+        columns = ', '.join(f'"{col.lower()}"' for col in index['columns'])
+        unique = 'UNIQUE ' if index['unique'] else ''
+        indexes.append({'name': name, 'table': target_table,
+                        'sql': f'CREATE {unique}INDEX IF NOT EXISTS "{name}" ON "{target_table}" ({columns})'})
+    
+    foreign_keys = []
+    for constraint_name, foreign_key in sorted(definition['foreign_keys'].items()):
+        name = pg_identifier(constraint_name)
+        columns = ', '.join(f'"{col.lower()}"' for col in foreign_key['columns'])
+        referenced = ', '.join(f'"{col.lower()}"' for col in foreign_key['referenced_columns'])
+        rules = ''
+        if foreign_key['on_update'] in FOREIGN_KEY_RULES:
+            rules += f" ON UPDATE {foreign_key['on_update']}"
+        if foreign_key['on_delete'] in FOREIGN_KEY_RULES:
+            rules += f" ON DELETE {foreign_key['on_delete']}"
+        add = (f'ALTER TABLE "{target_table}" ADD CONSTRAINT "{name}" FOREIGN KEY ({columns}) '
+               f'REFERENCES "{foreign_key["table"].lower()}" ({referenced}){rules}')
+        foreign_keys.append({'name': name, 'table': target_table, 'add': add,
+                             'validate': f'ALTER TABLE "{target_table}" VALIDATE CONSTRAINT "{name}"'})
+    
+    return {'table': target_table, 'create': create, 'indexes': indexes, 'foreign_keys': foreign_keys}
+
+# DDL de toutes les tables d'une base (ou d'une sélection), dans l'ordre de get_table_dependency_order
+def generate_schema_ddl(db_name, tables=None):
+    definitions = get_mysql_schema_definition(db_name)
+    _, _, deferred_columns = build_dependency_plan(get_foreign_key_graph(db_name))
+    order = [table for table in get_table_dependency_order(db_name) if table in definitions]
+    order += sorted(table for table in definitions if table not in order)
+    if tables is not None:
+        wanted = {table.upper() for table in tables}
+        order = [table for table in order if table.upper() in wanted]
+    return [build_table_ddl(table, definitions[table], deferred_columns.get(table, ())) for table in order]
+
+# Script SQL complet: tables, puis (après chargement) index et clés étrangères NOT VALID + VALIDATE
+def render_ddl_script(plan):
+    statements = [f"{table['create']};" for table in plan]
+    statements.append("-- Après le chargement des données: index secondaires")
+    statements += [f"{index['sql']};" for table in plan for index in table['indexes']]
+    statements.append("-- Après le chargement des données: clés étrangères, vérifiées sans bloquer les écritures")
+    statements += [f"{foreign_key['add']} NOT VALID;" for table in plan for foreign_key in table['foreign_keys']]
+    statements += [f"{foreign_key['validate']};" for table in plan for foreign_key in table['foreign_keys']]
+    return '\n\n'.join(statements) + '\n'
+
+# Créer dans central_db les tables absentes. bulk_load=True: clé primaire seulement, index et clés
+# étrangères laissés à build_post_load_objects(); sinon tout est créé immédiatement (tables vides)
+def create_target_tables(db_name, tables=None, bulk_load=True):
+    plan = generate_schema_ddl(db_name, tables)
+    report = {"db_name": db_name, "created": [], "existing": [], "bulk_load": bulk_load}
+    
+    pg_conn = get_postgres_connection()
+    try:
+        pg_cursor = pg_conn.cursor()
+        for table in plan:
+            if pg_table_exists(pg_cursor, table['table']):
+                report["existing"].append(table['table'])
+                continue
+            pg_cursor.execute(table['create'])
+            report["created"].append(table['table'])
+        
+        if not bulk_load:
+            for table in plan:
+                if table['table'] in report["created"]:
+                    for index in table['indexes']:
+                        pg_cursor.execute(index['sql'])
+            for table in plan:
+                if table['table'] in report["created"]:
+                    for foreign_key in table['foreign_keys']:
+                        pg_cursor.execute(foreign_key['add'])
+        pg_conn.commit()
+        pg_cursor.close()
+    except Exception:
+        pg_conn.rollback()
+        raise
+    finally:
+        pg_conn.close()
+    
+    # Les métadonnées PostgreSQL (et les convertisseurs qui en dépendent) sont à relire
+    for table_name in report["created"]:
+        schema_cache.invalidate('pg_table', table_name)
+        schema_cache.invalidate('postgres', table_name)
+    if report["created"]:
+        schema_cache.invalidate('pg_sequences')
+        schema_cache.invalidate('converters')
+    print(f"[Schéma {db_name}] {len(report['created'])} table(s) créée(s), {len(report['existing'])} existante(s)")
+    return report
+
+# Exécuter des instructions DDL en parallèle, chaque groupe sur sa propre connexion et dans l'ordre;
+# retourne (noms réussis, {nom: erreur})
+def run_ddl_groups(groups, max_workers):
+    def run_group(statements):
+        done, errors = [], {}
+        pg_conn = get_postgres_connection()
+        try:
+            pg_cursor = pg_conn.cursor()
+            for name, sql in statements:
+                try:
+                    pg_cursor.execute(sql)
+                    pg_conn.commit()
+                    done.append(name)
+                except Exception as e:
+                    pg_conn.rollback()
+                    errors[name] = str(e)
+                    print(f"[Schéma] {name}: {e}")
+            pg_cursor.close()
+        finally:
+            pg_conn.close()
+        return done, errors
+    
+    done, errors = [], {}
+    if not groups:
+        return done, errors
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(groups), PG_POOL_SIZE))) as executor:
+        for group_done, group_errors in executor.map(run_group, groups):
+            done += group_done
+            errors.update(group_errors)
+    return done, errors
+
+# Après le chargement: index secondaires construits en parallèle, puis clés étrangères ajoutées
+# NOT VALID (instantané) et validées table par table en parallèle
+def build_post_load_objects(db_name, tables=None, max_workers=None):
+    max_workers = max_workers or SCHEMA_BUILD_WORKERS
+    started_at = time.time()
+    plan = generate_schema_ddl(db_name, tables)
+    
+    # Un CREATE INDEX ne bloque pas les autres index de la même table: un index par tâche
+    indexes_done, index_errors = run_ddl_groups(
+        [[(index['name'], index['sql'])] for table in plan for index in table['indexes']], max_workers)
+    
+    foreign_keys = [foreign_key for table in plan for foreign_key in table['foreign_keys']]
+    existing = {}
+    pg_conn = get_postgres_connection()
+    try:
+        pg_cursor = pg_conn.cursor()
+        pg_cursor.execute("""
+            SELECT conrelid::regclass::text, conname, convalidated
+            FROM pg_constraint
+            WHERE contype = 'f' AND conname = ANY(%s)
+        """, ([foreign_key['name'] for foreign_key in foreign_keys],))
+        existing = {(table.strip('"'), name): validated for table, name, validated in pg_cursor.fetchall()}
+        pg_cursor.close()
+    finally:
+        pg_conn.close()
+    
+    # ADD CONSTRAINT se sérialise sur chaque table: ajouts dans un seul groupe, sans vérification des lignes
+    added, add_errors = run_ddl_groups(
+        [[(foreign_key['name'], f"{foreign_key['add']} NOT VALID") for foreign_key in foreign_keys
+          if (foreign_key['table'], foreign_key['name']) not in existing]], 1)
+    
+    # VALIDATE CONSTRAINT: une tâche par table (les validations d'une même table s'excluent)
+    validations = {}
+    for foreign_key in foreign_keys:
+        if existing.get((foreign_key['table'], foreign_key['name'])) or foreign_key['name'] in add_errors:
+            continue
+        validations.setdefault(foreign_key['table'], []).append((foreign_key['name'], foreign_key['validate']))
+    validated, validate_errors = run_ddl_groups(list(validations.values()), max_workers)
+    
+    report = {
+        "db_name": db_name,
+        "indexes": {"created": indexes_done, "errors": index_errors},
+        "foreign_keys": {"added": added, "validated": validated, "errors": {**add_errors, **validate_errors}},
+        "success": not index_errors and not add_errors and not validate_errors,
+        "duration_seconds": round(time.time() - started_at, 3)
+    }
+    print(f"[Schéma {db_name}] {len(indexes_done)} index, {len(validated)} clé(s) étrangère(s) validée(s) "
+          f"en {report['duration_seconds']} s")
+    return report
+
+# Script DDL PostgreSQL déduit du schéma MySQL d'une base (aperçu, rien n'est exécuté)
+@app.route('/database/<db_name>/ddl')
+def show_ddl(db_name):
+    if db_name not in ALLOWED_DATABASES:
+        return "Base non autorisée", 403
+    try:
+        return Response(render_ddl_script(generate_schema_ddl(db_name)), mimetype='text/plain')
+    except DatabaseConnectionError:
+        raise
+    except Exception as e:
+        invalidate_schema_cache_on_error(e)
+        traceback.print_exc()
+        return f"Erreur: {str(e)}", 500
+
+# Créer les tables cibles absentes (bulk_load: sans index secondaires ni clés étrangères)
+@app.route('/create-schema', methods=['POST'])
+def create_schema_route():
+    try:
+        payload = request.get_json(silent=True) or request.form.to_dict()
+        db_name = payload.get('db_name')
+        if db_name not in ALLOWED_DATABASES:
+            return jsonify({"error": "Paramètre db_name requis"}), 400
+        bulk_load = str(payload.get('bulk_load', 'true')).lower() in ('1', 'true', 'on')
+        return jsonify({"success": True, **create_target_tables(db_name, payload.get('tables'), bulk_load)})
+    
+    except DatabaseConnectionError:
+        raise
+    except Exception as e:
+        invalidate_schema_cache_on_error(e)
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+# Construire les index et clés étrangères après un chargement en masse
+@app.route('/build-constraints', methods=['POST'])
+def build_constraints_route():
+    try:
+        payload = request.get_json(silent=True) or request.form.to_dict()
+        db_name = payload.get('db_name')
+        if db_name not in ALLOWED_DATABASES:
+            return jsonify({"error": "Paramètre db_name requis"}), 400
+        workers = payload.get('workers')
+        report = build_post_load_objects(db_name, payload.get('tables'), int(workers) if workers else None)
+        return jsonify(report), (200 if report["success"] else 500)
+    
+    except DatabaseConnectionError:
+        raise
+    except Exception as e:
+        invalidate_schema_cache_on_error(e)
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+# Migrer toutes les tables d'une base: les tables indépendantes en parallèle,
+# chaque table dès que ses tables parentes sont terminées
+# create_schema=True: tables absentes créées sans index secondaires ni clés étrangères,
+# construits une seule fois après le chargement (build_post_load_objects)
+def migrate_database(db_name, chunk_size=None, manage_sequences=True, max_workers=None, progress=None,
+                     create_schema=False):
+    started_at = time.time()
+    order, dependencies, deferred_columns = build_dependency_plan(get_foreign_key_graph(db_name))
+    schema = create_target_tables(db_name, bulk_load=True) if create_schema else None
+    
+    results = run_dependency_dag(
+        order, dependencies,
+        lambda table: migrate_table(db_name, table, chunk_size, manage_sequences, deferred_columns[table],
+                                    progress),
+        max_workers or MIGRATION_TABLE_WORKERS
+    )
+    
+    # Une fois toutes les tables chargées, compléter les clés étrangères différées
+    for table in order:
+        if deferred_columns[table] and not results[table].get("error"):
+            try:
+                results[table]["deferred_fk_rows"] = fixup_deferred_foreign_keys(
+                    db_name, table, deferred_columns[table], chunk_size)
+            except Exception as e:
+                traceback.print_exc()
+                results[table]["error"] = f"Correction des clés différées: {e}"
+    
+    tables = [results[table] for table in order if table in results]
+    errors = [f"{summary['table_name']}: {summary['error']}" for summary in tables if summary.get("error")]
+    if schema is not None:
+        schema["post_load"] = build_post_load_objects(db_name, max_workers=max_workers)
+        if not schema["post_load"]["success"]:
+            errors.append("schéma: index ou clés étrangères en échec")
+    result = {"db_name": db_name, "tables": tables, "success": not errors}
+    if schema is not None:
+        result["schema"] = schema
+    if errors:
+        result["error"] = "; ".join(errors)
+    result["duration_seconds"] = round(time.time() - started_at, 3)
+    return result
+
+# Consolider plusieurs bases en parallèle vers central_db (une tâche par base)
+def migrate_all_databases(db_names=None, max_workers=None, chunk_size=None, progress=None, create_schema=False):
+    db_names = [db for db in (db_names or ALLOWED_DATABASES) if db in ALLOWED_DATABASES]
+    max_workers = max(1, min(max_workers or MIGRATION_WORKERS, len(db_names) or 1))
+    # Chaque table migrée tient une connexion de chaque pool (deux PostgreSQL en pipeline): ne pas dépasser leur taille
+    pg_per_table = 2 if MIGRATION_PIPELINE else 1
+    table_workers = max(1, min(MIGRATION_TABLE_WORKERS, MYSQL_POOL_SIZE // max_workers,
+                               PG_POOL_SIZE // (pg_per_table * max_workers)))
+    started_at = time.time()
+    results = {}
+    
+    # Les tables cibles sont communes: créées une fois (première base qui les définit) avant les chargements
+    schema = {db_name: create_target_tables(db_name, bulk_load=True) for db_name in db_names} if create_schema else None
+    
+    # Chaque base a ses propres tables id_mapping_<db>_*; seules les tables cibles et leurs
+    # séquences sont partagées, et les ID y sont réservés par nextval() sans verrou
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(migrate_database, db_name, chunk_size, False, table_workers, progress): db_name
+            for db_name in db_names
+        }
+        for future in as_completed(futures):
+            db_name = futures[future]
+            try:
+                results[db_name] = future.result()
+            except Exception as e:
+                traceback.print_exc()
+                results[db_name] = {"db_name": db_name, "success": False, "error": str(e)}
+    
+    # Réaligner les séquences une seule fois, quand plus aucune écriture concurrente n'a lieu
+    pg_conn = get_postgres_connection()
+    try:
+        pg_cursor = pg_conn.cursor()
+        tables = {summary["table_name"] for result in results.values() for summary in result.get("tables", [])}
+        align_sequences(pg_cursor, tables)
+        pg_conn.commit()
+        pg_cursor.close()
+    finally:
+        pg_conn.close()
+    
+    # Index et clés étrangères une fois toutes les bases chargées (déjà présents: ignorés)
+    if schema is not None:
+        for db_name in db_names:
+            schema[db_name]["post_load"] = build_post_load_objects(db_name)
+    
+    report = {
+        "success": all(result.get("success") for result in results.values())
+                   and all(entry["post_load"]["success"] for entry in (schema or {}).values()),
+        "databases": results,
+        "workers": max_workers,
+        "duration_seconds": round(time.time() - started_at, 3)
+    }
+    if schema is not None:
+        report["schema"] = schema
+    return report
+
+@app.route('/migrate-all', methods=['POST'])
+def migrate_all_route():
+    try:
+        payload = request.get_json(silent=True) or {}
+        db_names = payload.get('databases') or request.form.getlist('databases') or None
+        workers = payload.get('workers') or request.form.get('workers')
+        chunk_size = payload.get('chunk_size') or request.form.get('chunk_size')
+        create_schema = str(payload.get('create_schema') or request.form.get('create_schema') or '').lower()
+        
+        report = migrate_all_databases(db_names,
+                                       int(workers) if workers else None,
+                                       int(chunk_size) if chunk_size else None,
+                                       create_schema=create_schema in ('1', 'true', 'on'))
+        return jsonify(report), (200 if report["success"] else 500)
+    
+    except DatabaseConnectionError:
+        raise
+    except Exception as e:
+        invalidate_schema_cache_on_error(e)
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+# Migrations en arrière-plan: nombre de tâches simultanées et nombre de tâches terminées conservées
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', 2))
+JOB_HISTORY_SIZE = int(os.getenv('JOB_HISTORY_SIZE', 100))
+JOB_EVENTS_KEEPALIVE = 15
+
+# État d'une migration lancée en arrière-plan (modifié uniquement sous le verrou du gestionnaire)
+class MigrationJob:
+    def __init__(self, job_id, kind, params, rows_total):
+        self.id = job_id
+        self.kind = kind
+        self.params = params
+        self.rows_total = rows_total
+        self.rows_done = 0
+        self.current_table = None
+        self.status = 'pending'
+        self.errors = []
+        self.result = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.version = 0
+    
+    @property
+    def finished(self):
+        return self.status in ('succeeded', 'failed')
+    
+    def to_dict(self):
+        elapsed = ((self.finished_at or time.time()) - self.started_at) if self.started_at else 0
+        rows_per_second = self.rows_done / elapsed if elapsed > 0 else 0
+        eta_seconds = None
+        if self.status == 'running' and rows_per_second and self.rows_total > self.rows_done:
+            eta_seconds = round((self.rows_total - self.rows_done) / rows_per_second, 1)
+        
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "params": self.params,
+            "status": self.status,
+            "rows_done": self.rows_done,
+            "rows_total": self.rows_total,
+            "progress": round(min(100.0, 100.0 * self.rows_done / self.rows_total), 1) if self.rows_total else None,
+            "rows_per_second": round(rows_per_second, 1),
+            "eta_seconds": eta_seconds,
+            "elapsed_seconds": round(elapsed, 1),
+            "current_table": self.current_table,
+            "errors": list(self.errors),
+            "result": self.result,
+            "created_at": datetime.fromtimestamp(self.created_at).isoformat(),
+            "version": self.version
+        }
+
+# Erreurs d'un rapport de migration (table, base ou toutes les bases)
+def collect_migration_errors(result):
+    errors = []
+    for db_result in (result.get("databases") or {}).values():
+        errors.extend(collect_migration_errors(db_result))
+    for summary in result.get("tables", []):
+        if summary.get("error"):
+            errors.append(f"{result.get('db_name')}.{summary.get('table_name')}: {summary['error']}")
+    if not errors and result.get("error"):
+        errors.append(result["error"])
+    return errors
+
+# Exécute les migrations dans un pool de threads hors du thread de la requête HTTP
+class MigrationJobManager:
+    def __init__(self, max_workers, history_size):
+        self.history_size = history_size
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix='migration-job')
+        self._jobs = OrderedDict()
+        self._condition = threading.Condition()
+    
+    def submit(self, kind, params, rows_total, run):
+        job = MigrationJob(uuid.uuid4().hex, kind, params, rows_total)
+        with self._condition:
+            self._jobs[job.id] = job
+            self._prune()
+        self._executor.submit(self._run, job, run)
+        return job.to_dict()
+    
+    def _prune(self):
+        # Oublier les tâches terminées les plus anciennes au-delà de l'historique
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(self._jobs) - self.history_size)]:
+            del self._jobs[job_id]
+    
+    def _update(self, job, **changes):
+        with self._condition:
+            for name, value in changes.items():
+                setattr(job, name, value)
+            job.version += 1
+            self._condition.notify_all()
+    
+    def _run(self, job, run):
+        self._update(job, status='running', started_at=time.time())
+        
+        def progress(db_name, table_name, rows):
+            with self._condition:
+                job.rows_done += rows
+                job.current_table = f"{db_name}.{table_name}"
+                job.version += 1
+                self._condition.notify_all()
+        
+        try:
+            result = run(progress)
+            errors = collect_migration_errors(result)
+            self._update(job, status='failed' if errors or result.get("success") is False else 'succeeded',
+                         result=result, errors=errors, finished_at=time.time())
+        except Exception as e:
+            traceback.print_exc()
+            self._update(job, status='failed', errors=job.errors + [str(e)], finished_at=time.time())
+    
+    def get(self, job_id):
+        with self._condition:
+            job = self._jobs.get(job_id)
+            return job.to_dict() if job else None
+    
+    def list(self):
+        with self._condition:
+            return [job.to_dict() for job in reversed(self._jobs.values())]
+    
+    # Attendre une version plus récente que celle déjà envoyée (ou l'expiration du délai)
+    def wait_for_update(self, job_id, version, timeout):
+        with self._condition:
+            self._condition.wait_for(
+                lambda: job_id not in self._jobs or self._jobs[job_id].version != version, timeout)
+            job = self._jobs.get(job_id)
+            return job.to_dict() if job else None
+
+job_manager = MigrationJobManager(JOB_WORKERS, JOB_HISTORY_SIZE)
+
+# Nombre de lignes sources attendu pour une tâche (estimations MySQL, 0 si indisponibles)
+def estimate_job_rows(db_names, table_name=None):
+    try:
+        estimates = get_source_row_estimates()
+    except Exception as e:
+        print(f"Estimation des lignes sources indisponible: {e}")
+        return 0
+    
+    total = 0
+    for db_name in db_names:
+        tables = estimates.get(db_name, {})
+        if table_name:
+            total += tables.get(table_name, 0)
+        else:
+            total += sum(tables.values())
+    return total
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    try:
+        payload = request.get_json(silent=True) or request.form.to_dict()
+        kind = payload.get('kind', 'table')
+        db_name = payload.get('db_name')
+        table_name = payload.get('table_name')
+        chunk_size = int(payload['chunk_size']) if payload.get('chunk_size') else None
+        create_schema = str(payload.get('create_schema', '')).lower() in ('1', 'true', 'on')
+        
+        if kind == 'table':
+            if db_name not in ALLOWED_DATABASES or not table_name:
+                return jsonify({"error": "Paramètres db_name et table_name requis"}), 400
+            rows_total = estimate_job_rows([db_name], table_name)
+            run = lambda progress: migrate_table(db_name, table_name, chunk_size, progress=progress)
+        elif kind == 'database':
+            if db_name not in ALLOWED_DATABASES:
+                return jsonify({"error": "Paramètre db_name requis"}), 400
+            rows_total = estimate_job_rows([db_name])
+            run = lambda progress: migrate_database(db_name, chunk_size, progress=progress,
+                                                    create_schema=create_schema)
+        elif kind == 'all':
+            db_names = [db for db in (payload.get('databases') or ALLOWED_DATABASES) if db in ALLOWED_DATABASES]
+            rows_total = estimate_job_rows(db_names)
+            run = lambda progress: migrate_all_databases(db_names, chunk_size=chunk_size, progress=progress,
+                                                         create_schema=create_schema)
+        else:
+            return jsonify({"error": f"Type de tâche inconnu: {kind}"}), 400
+        
+        params = {key: value for key, value in payload.items() if key != 'kind'}
+        job = job_manager.submit(kind, params, rows_total, run)
+        return jsonify({
+            "success": True,
+            "job": job,
+            "status_url": url_for('job_status', job_id=job["job_id"]),
+            "events_url": url_for('job_events', job_id=job["job_id"])
+        }), 202
+    
+    except DatabaseConnectionError:
+        raise
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/jobs', methods=['GET'])
+def list_jobs():
+    return jsonify({"jobs": job_manager.list()})
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = job_manager.get(job_id)
+    if not job:
+        return jsonify({"error": "Tâche inconnue"}), 404
+    return jsonify(job)
+
+# Flux Server-Sent Events: un événement à chaque progression, jusqu'à la fin de la tâche
+@app.route('/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    job = job_manager.get(job_id)
+    if not job:
+        return jsonify({"error": "Tâche inconnue"}), 404
+    
+    def generate(job):
+        yield f"data: {json.dumps(job, default=str)}\n\n"
+        while job["status"] not in ('succeeded', 'failed'):
+            update = job_manager.wait_for_update(job_id, job["version"], JOB_EVENTS_KEEPALIVE)
+            if update is None:
+                break
+            if update["version"] == job["version"]:
+                # Commentaire SSE: garde la connexion ouverte à travers les proxys
+                yield ": keepalive\n\n"
+                continue
+            job = update
+            yield f"data: {json.dumps(job, default=str)}\n\n"
+    
+    return Response(stream_with_context(generate(job)), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+# Toutes les colonnes serial/identity du schéma public en une seule requête catalogue:
+# [(table, colonne, séquence)], mis en cache avec le reste du schéma
+def get_owned_sequences(pg_cursor):
+    def load():
+        pg_cursor.execute("""
+            SELECT c.relname, a.attname, s.oid::regclass::text
+            FROM pg_class s
+            JOIN pg_depend d ON d.objid = s.oid
+                            AND d.classid = 'pg_class'::regclass
+                            AND d.refclassid = 'pg_class'::regclass
+                            AND d.deptype IN ('a', 'i')
+            JOIN pg_class c ON c.oid = d.refobjid
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            JOIN pg_attribute a ON a.attrelid = c.oid AND a.attnum = d.refobjsubid
+            WHERE s.relkind = 'S' AND n.nspname = 'public' AND c.relkind IN ('r', 'p')
+            ORDER BY c.relname, a.attname
+        """)
+        return pg_cursor.fetchall()
+    
+    return schema_cache.get(('pg_sequences',), load)
+
+# Réaligner les séquences sur le MAX() de leur colonne (toutes les tables si aucune n'est précisée).
+# Un setval par séquence, uniquement si la séquence est en retard: elle n'est jamais reculée,
+# ce qui reste sûr pendant des transferts concurrents (nextval n'est pas transactionnel).
+# Retourne [{table, column, sequence, value}] pour les séquences avancées
+def align_sequences(pg_cursor, table_names=None):
+    wanted = {name.lower() for name in table_names} if table_names is not None else None
+    aligned = []
+    for table_name, column, sequence_name in get_owned_sequences(pg_cursor):
+        if wanted is not None and table_name not in wanted:
+            continue
+        pg_cursor.execute(f"""
+            SELECT setval(%s, m.max_value)
+            FROM (SELECT MAX("{column}")::bigint AS max_value FROM {table_name}) AS m,
+                 {sequence_name} AS s
+            WHERE m.max_value >= s.last_value + CASE WHEN s.is_called THEN 1 ELSE 0 END
+        """, (sequence_name,))
+        row = pg_cursor.fetchone()
+        if row:
+            print(f"Séquence {sequence_name} avancée à {row[0]}")
+            aligned.append({"table": table_name, "column": column, "sequence": sequence_name, "value": row[0]})
+    return aligned
+
+# Mettre à jour en un seul UPDATE ... FROM (VALUES ...) les lignes déjà transférées, via la table de mapping
+# Seules les lignes dont une valeur a réellement changé sont réécrites.
+# Retourne (ID des lignes modifiées, ID des lignes jamais transférées); pas de commit
+def bulk_update_rows(pg_cursor, db_name, table_name, primary_keys, identified_rows, mapping_table):
+    if not identified_rows:
+        return [], []
+    
+    key_columns = get_row_key_columns(table_name, primary_keys)
+    new_ids = get_mapped_ids(pg_cursor, mapping_table, [row_id for row_id, _ in identified_rows])
+    mapped_rows = [(row_id, row) for row_id, row in identified_rows if row_id in new_ids]
+    unmapped_ids = [row_id for row_id, _ in identified_rows if row_id not in new_ids]
+    if not mapped_rows:
+        return [], unmapped_ids
+    
+    update_columns = [col for col in mapped_rows[0][1].keys()
+                      if col not in primary_keys and col not in key_columns]
+    if not update_columns:
+        return [], unmapped_ids
+    
+    # Mapper les clés étrangères colonne par colonne (une requête par colonne)
+    fk_maps = {}
+    for col_name in update_columns:
+        if resolve_referenced_table(table_name, col_name, db_name)[0]:
+            fk_maps[col_name] = map_foreign_keys_bulk(
+                pg_cursor, db_name, table_name, col_name, [row[col_name] for _, row in mapped_rows])
+    
+    values = []
+    for row_id, row in mapped_rows:
+        row_values = new_ids[row_id].split('_', len(key_columns) - 1)
+        for col_name in update_columns:
+            value = row[col_name]
+            if col_name in fk_maps and value is not None:
+                value = fk_maps[col_name].get(str(value), value)
+            row_values.append(value)
+        values.append(tuple(row_values))
+    
+    pg_types = get_pg_table_metadata(pg_cursor, table_name)['full_types']
+    keys = [col.lower() for col in key_columns]
+    targets = [col.lower() for col in update_columns]
+    cast = lambda col: f'v."{col}"::{pg_types.get(col, "text")}'
+    
+    changed = execute_values(pg_cursor, f"""
+        UPDATE {table_name.lower()} AS t
+        SET {', '.join(f'"{col}" = {cast(col)}' for col in targets)}
+        FROM (VALUES %s) AS v({', '.join(f'"{col}"' for col in keys + targets)})
+        WHERE {' AND '.join(f't."{col}" = {cast(col)}' for col in keys)}
+          AND ({', '.join(f't."{col}"' for col in targets)}) IS DISTINCT FROM ({', '.join(cast(col) for col in targets)})
+        RETURNING {', '.join(f't."{col}"' for col in keys)}
+    """, values, page_size=len(values), fetch=True)
+    
+    changed_new_ids = {'_'.join(str(part) for part in key) for key in changed}
+    old_by_new = {new_ids[row_id]: row_id for row_id, _ in mapped_rows}
+    return [old_by_new[new_id] for new_id in changed_new_ids if new_id in old_by_new], unmapped_ids
+
+# Taille des lots (et des plages de clés pour les checksums) de la synchronisation incrémentale
+SYNC_CHUNK_SIZE = int(os.getenv('SYNC_CHUNK_SIZE', 1000))
+# Nombre de plages de clés dont les checksums sont calculés par requête
+SYNC_CHECKSUM_WINDOW = int(os.getenv('SYNC_CHECKSUM_WINDOW', 100))
+# Noms usuels des colonnes de date de modification
+TIMESTAMP_COLUMN_NAMES = ('updated_at', 'date_modification', 'modified_at', 'last_update', 'date_maj')
+
+# Tables d'état de la synchronisation (dernier passage, checksums par plage de clés)
+def ensure_sync_state_tables(pg_cursor):
+    if pg_table_exists(pg_cursor, 'sync_chunk_checksums'):
+        return
+    pg_cursor.execute("""
+        CREATE TABLE IF NOT EXISTS sync_state (
+            db_name VARCHAR(255) NOT NULL,
+            table_name VARCHAR(255) NOT NULL,
+            mode VARCHAR(20) NOT NULL,
+            last_sync_at TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (db_name, table_name)
+        )
+    """)
+    pg_cursor.execute("""
+        CREATE TABLE IF NOT EXISTS sync_chunk_checksums (
+            db_name VARCHAR(255) NOT NULL,
+            table_name VARCHAR(255) NOT NULL,
+            bucket BIGINT NOT NULL,
+            checksum VARCHAR(64) NOT NULL,
+            PRIMARY KEY (db_name, table_name, bucket)
+        )
+    """)
+
+# Colonne de date de modification: ON UPDATE CURRENT_TIMESTAMP en priorité, puis noms usuels
+def find_timestamp_column(table_meta):
+    candidates = [column for column in table_meta['column_info']
+                  if column['Type'].startswith(('timestamp', 'datetime'))]
+    for column in candidates:
+        if 'on update' in (column.get('Extra') or '').lower():
+            return column['Field']
+    for column in candidates:
+        if column['Field'].lower() in TIMESTAMP_COLUMN_NAMES:
+            return column['Field']
+    return None
+
+# Appliquer un lot de lignes modifiées: UPDATE groupé pour les lignes transférées, INSERT pour les autres
+def apply_changed_rows(pg_cursor, db_name, table_name, primary_keys, rows, mapping_table):
+    key_columns = get_row_key_columns(table_name, primary_keys)
+    identified_rows = [(build_row_id(row, key_columns), row) for row in rows]
+    updated, unmapped_ids = bulk_update_rows(pg_cursor, db_name, table_name, primary_keys,
+                                             identified_rows, mapping_table)
+    unmapped = set(unmapped_ids)
+    inserted = insert_rows_with_mapping(pg_cursor, db_name, table_name, primary_keys,
+                                        [(row_id, row) for row_id, row in identified_rows if row_id in unmapped],
+                                        mapping_table)
+    return updated, inserted
+
+# Checksums des plages [bucket * largeur, (bucket + 1) * largeur) d'une fenêtre de clés: nombre de lignes et
+# somme des empreintes MD5 tronquées. Contrairement à un XOR de CRC32, l'échange de valeurs entre deux
+# lignes d'une même plage change la somme. Paramètres: largeur, première clé, clé de fin (exclue)
+def build_sync_checksum_query(table_name, columns, bucket_column):
+    checksum_parts = ', '.join(f"COALESCE(CAST(`{col}` AS CHAR), '~')" for col in columns)
+    return f"""
+        SELECT FLOOR(`{bucket_column}` / %s) AS bucket,
+               CONCAT(COUNT(*), ':', SUM(CAST(CONV(SUBSTRING(
+                   MD5(CONCAT_WS('#', {checksum_parts})), 1, 8), 16, 10) AS UNSIGNED))) AS checksum
+        FROM `{table_name}`
+        WHERE `{bucket_column}` >= %s AND `{bucket_column}` < %s
+        GROUP BY bucket
+    """
+
+# Fenêtres (première plage, plage de fin exclue) couvrant les clés low_key..high_key, SYNC_CHECKSUM_WINDOW
+# plages à la fois: chaque requête de checksum lit une plage de l'index de clé, jamais toute la table
+def iter_checksum_windows(low_key, high_key, width, window=None):
+    window = window or SYNC_CHECKSUM_WINDOW
+    first_bucket = int(low_key) // width
+    last_bucket = int(high_key) // width
+    for start in range(first_bucket, last_bucket + 1, window):
+        yield start, min(start + window, last_bucket + 1)
+
+# Synchroniser une table de façon incrémentale (mode 'timestamp', 'checksum' ou 'auto')
+def sync_table(db_name, table_name, mode='auto', chunk_size=None):
+    chunk_size = chunk_size or SYNC_CHUNK_SIZE
+    started_at = time.time()
+    summary = {"db_name": db_name, "table_name": table_name, "rows_examined": 0,
+               "rows_updated": 0, "rows_inserted": 0, "rows_rejected": 0, "chunks_changed": 0}
+    
+    mysql_conn = None
+    pg_conn = None
+    mysql_cursor = None
+    pg_cursor = None
+    
+    try:
+        mysql_conn = get_mysql_connection()
+        mysql_conn.database = db_name
+        pg_conn = get_postgres_connection()
+        pg_cursor = pg_conn.cursor()
+        
+        mysql_cursor = mysql_conn.cursor(dictionary=True)
+        table_meta = get_mysql_table_metadata(mysql_cursor, db_name, table_name)
+        primary_keys = table_meta['primary_keys']
+        key_columns = get_row_key_columns(table_name, primary_keys)
+        if not key_columns:
+            raise ValueError(f"Aucune clé primaire trouvée pour {table_name}")
+        
+        # Convertisseurs construits avant d'ouvrir un curseur non bufferisé sur la connexion
+        converters = get_value_converters(mysql_cursor, pg_cursor, db_name, table_name)
+        timestamp_column = find_timestamp_column(table_meta)
+        if mode == 'auto':
+            mode = 'timestamp' if timestamp_column else 'checksum'
+        if mode == 'timestamp' and not timestamp_column:
+            raise ValueError(f"Aucune colonne de date de modification trouvée pour {table_name}")
+        summary["mode"] = mode
+        
+        ensure_sync_state_tables(pg_cursor)
+        mapping_table = ensure_mapping_table_exists(pg_cursor, db_name, table_name)
+        pg_conn.commit()
+        
+        def apply_chunk(rows):
+            summary["rows_examined"] += len(rows)
+            rejected = convert_records(converters, rows)
+            if rejected:
+                record_rejected_rows(summary, [(build_row_id(rows[position], key_columns), error)
+                                               for position, error in rejected])
+                rejected_positions = {position for position, _ in rejected}
+                rows = [row for position, row in enumerate(rows) if position not in rejected_positions]
+            updated, inserted = apply_changed_rows(pg_cursor, db_name, table_name, primary_keys,
+                                                   rows, mapping_table)
+            summary["rows_updated"] += len(updated)
+            summary["rows_inserted"] += len(inserted)
+            return inserted
         
-        # Gestion de l'enregistrement du mapping selon le type de table
-        if table_name.upper() == 'LIGNE_COMMANDE':
-            # Pour LIGNE_COMMANDE, créer un ID composite pour le mapping
-            old_composite_id = f"{row_data['id_commande']}_{row_data['id_produit']}"
+        if mode == 'timestamp':
+            pg_cursor.execute("SELECT last_sync_at FROM sync_state WHERE db_name = %s AND table_name = %s",
+                              (db_name, table_name))
+            state = pg_cursor.fetchone()
+            last_sync_at = state[0] if state else None
             
-            # Trouver les indices des colonnes id_commande et id_produit dans le résultat
-            try:
-                pg_cursor.execute(f"SELECT column_name FROM information_schema.columns WHERE table_name = '{table_name.lower()}'")
-                pg_columns = [col[0] for col in pg_cursor.fetchall()]
-                id_commande_idx = pg_columns.index('id_commande')
-                id_produit_idx = pg_columns.index('id_produit')
-                new_composite_id = f"{new_row[id_commande_idx]}_{new_row[id_produit_idx]}"
-            except (ValueError, IndexError):
-                # Fallback si on ne peut pas déterminer les indices
-                new_composite_id = f"{new_row[0]}_{new_row[1]}"
+            # Le nouveau repère est pris avant la lecture: une ligne modifiée pendant le passage
+            # sera relue la prochaine fois plutôt que perdue
+            mysql_cursor.execute("SELECT NOW() AS now")
+            watermark = mysql_cursor.fetchall()[0]['now']
+            mysql_cursor.close()
+            
+            mysql_cursor = mysql_conn.cursor(dictionary=True, buffered=False)
+            if last_sync_at:
+                mysql_cursor.execute(f"SELECT * FROM `{table_name}` WHERE `{timestamp_column}` >= %s",
+                                     (last_sync_at,))
+            else:
+                mysql_cursor.execute(f"SELECT * FROM `{table_name}`")
+            
+            for rows in iter_row_chunks(mysql_cursor, chunk_size, f"sync {db_name}.{table_name}"):
+                inserted = apply_chunk(rows)
+                summary["chunks_changed"] += 1
+                pg_conn.commit()
+                fk_mapping_cache.put_many(db_name, table_name, inserted.items())
             
-            pg_cursor.execute(f"""
-                INSERT INTO {mapping_table} (table_name, old_id, new_id)
-                VALUES (%s, %s, %s)
-                ON CONFLICT (table_name, old_id) DO UPDATE SET new_id = EXCLUDED.new_id
-            """, (table_name.lower(), old_composite_id, new_composite_id))
+            pg_cursor.execute("""
+                INSERT INTO sync_state (db_name, table_name, mode, last_sync_at)
+                VALUES (%s, %s, %s, %s)
+                ON CONFLICT (db_name, table_name)
+                DO UPDATE SET mode = EXCLUDED.mode, last_sync_at = EXCLUDED.last_sync_at,
+                              updated_at = CURRENT_TIMESTAMP
+            """, (db_name, table_name, mode, watermark))
+            pg_conn.commit()
+        
         else:
-            # Déterminer l'index de la colonne clé primaire dans le résultat
-            pg_cursor.execute(f"SELECT column_name FROM information_schema.columns WHERE table_name = '{table_name.lower()}'")
-            pg_columns = [col[0] for col in pg_cursor.fetchall()]
+            # Checksums par plage de clés: seules les plages modifiées sont relues et appliquées
+            bucket_column = key_columns[0]
+            if 'int' not in table_meta['types'].get(bucket_column, ''):
+                raise ValueError(f"Le mode checksum nécessite une clé entière ({table_name}.{bucket_column})")
             
-            # Si la clé primaire est id_client, chercher sa position dans le résultat
-            pk_column = primary_keys[0].lower()
-            pk_index = pg_columns.index(pk_column) if pk_column in pg_columns else 0
+            checksum_sql = build_sync_checksum_query(table_name, table_meta['columns'], bucket_column)
+            pg_cursor.execute("""
+                SELECT bucket, checksum FROM sync_chunk_checksums
+                WHERE db_name = %s AND table_name = %s
+            """, (db_name, table_name))
+            stored_checksums = dict(pg_cursor.fetchall())
             
-            pg_cursor.execute(f"""
-                INSERT INTO {mapping_table} (table_name, old_id, new_id)
-                VALUES (%s, %s, %s)
-                ON CONFLICT (table_name, old_id) DO UPDATE SET new_id = EXCLUDED.new_id
-            """, (table_name.lower(), str(row_id), str(new_row[pk_index])))
+            mysql_cursor.execute(f"SELECT MIN(`{bucket_column}`) AS low, MAX(`{bucket_column}`) AS high "
+                                 f"FROM `{table_name}`")
+            key_bounds = mysql_cursor.fetchall()[0]
+            source_buckets = set()
+            windows = (iter_checksum_windows(key_bounds['low'], key_bounds['high'], chunk_size)
+                       if key_bounds['low'] is not None else ())
+            for first_bucket, end_bucket in windows:
+                mysql_cursor.execute(checksum_sql, (chunk_size, first_bucket * chunk_size, end_bucket * chunk_size))
+                source_checksums = {int(row['bucket']): row['checksum'] for row in mysql_cursor.fetchall()}
+                source_buckets.update(source_checksums)
+                
+                changed_buckets = sorted(bucket for bucket, checksum in source_checksums.items()
+                                         if stored_checksums.get(bucket) != checksum)
+                for bucket in changed_buckets:
+                    mysql_cursor.execute(f"""
+                        SELECT * FROM `{table_name}`
+                        WHERE `{bucket_column}` >= %s AND `{bucket_column}` < %s
+                    """, (bucket * chunk_size, (bucket + 1) * chunk_size))
+                    inserted = apply_chunk(mysql_cursor.fetchall())
+                    pg_cursor.execute("""
+                        INSERT INTO sync_chunk_checksums (db_name, table_name, bucket, checksum)
+                        VALUES (%s, %s, %s, %s)
+                        ON CONFLICT (db_name, table_name, bucket) DO UPDATE SET checksum = EXCLUDED.checksum
+                    """, (db_name, table_name, bucket, source_checksums[bucket]))
+                    summary["chunks_changed"] += 1
+                    pg_conn.commit()
+                    fk_mapping_cache.put_many(db_name, table_name, inserted.items())
             
-        # S'assurer que la séquence est correctement mise à jour
-        check_and_fix_sequence(pg_cursor, table_name)
-        pg_conn.commit()
-
-        return jsonify({"success": True, "message": "Données transférées avec succès"})
-
+            # Plages vidées côté MySQL: on oublie leur checksum
+            removed_buckets = [bucket for bucket in stored_checksums if bucket not in source_buckets]
+            if removed_buckets:
+                pg_cursor.execute("""
+                    DELETE FROM sync_chunk_checksums
+                    WHERE db_name = %s AND table_name = %s AND bucket = ANY(%s)
+                """, (db_name, table_name, removed_buckets))
+            pg_cursor.execute("""
+                INSERT INTO sync_state (db_name, table_name, mode, last_sync_at)
+                VALUES (%s, %s, %s, CURRENT_TIMESTAMP)
+                ON CONFLICT (db_name, table_name)
+                DO UPDATE SET mode = EXCLUDED.mode, last_sync_at = EXCLUDED.last_sync_at,
+                              updated_at = CURRENT_TIMESTAMP
+            """, (db_name, table_name, mode))
+            pg_conn.commit()
+        
+        summary["duration_seconds"] = round(time.time() - started_at, 3)
+        return summary
+    
     except Exception as e:
         if pg_conn:
             try:
                 pg_conn.rollback()
             except:
                 pass
-        traceback.print_exc()
-        return jsonify({"error": str(e)}), 500
-
+        invalidate_schema_cache_on_error(e)
+        raise
+    
     finally:
-        if mysql_cursor: mysql_cursor.close()
+        if mysql_cursor:
+            try:
+                mysql_cursor.close()
+            except:
+                pass
         if mysql_conn: mysql_conn.close()
         if pg_cursor: pg_cursor.close()
         if pg_conn: pg_conn.close()
-def check_and_fix_sequence(pg_cursor, table_name):
+
+@app.route('/sync-table', methods=['POST'])
+def sync_table_route():
     try:
-        # Récupérer la colonne clé primaire
-        pg_cursor.execute(f"""
-            SELECT a.attname
-            FROM pg_index i
-            JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
-            WHERE i.indrelid = '{table_name.lower()}'::regclass AND i.indisprimary;
-        """)
-        result = pg_cursor.fetchone()
+        payload = request.get_json(silent=True) or request.form
+        db_name = payload.get('db_name')
+        table_name = payload.get('table_name')
+        mode = payload.get('mode', 'auto')
         
-        if not result:
-            return False
+        if not db_name:
+            return jsonify({"error": "Paramètre db_name requis"}), 400
+        if mode not in ('auto', 'timestamp', 'checksum'):
+            return jsonify({"error": f"Mode de synchronisation inconnu: {mode}"}), 400
+        
+        if table_name:
+            summaries = [sync_table(db_name, table_name, mode)]
+        else:
+            # Toutes les tables de la base dans l'ordre de dépendance: les tables absentes de PostgreSQL
+            # sont ignorées et l'échec d'une table n'empêche pas la synchronisation des suivantes
+            pg_conn = get_postgres_connection()
+            try:
+                pg_cursor = pg_conn.cursor()
+                tables = [table for table in get_table_dependency_order(db_name)
+                          if pg_table_exists(pg_cursor, table.lower())]
+                pg_cursor.close()
+            finally:
+                pg_conn.close()
             
-        primary_key_column = result[0]
+            summaries = []
+            for table in tables:
+                try:
+                    summaries.append(sync_table(db_name, table, mode))
+                except DatabaseConnectionError:
+                    raise
+                except Exception as e:
+                    traceback.print_exc()
+                    summaries.append({"db_name": db_name, "table_name": table, "error": str(e)})
+        
+        synced = [summary for summary in summaries if not summary.get("error")]
+        updated = sum(summary["rows_updated"] for summary in synced)
+        inserted = sum(summary["rows_inserted"] for summary in synced)
+        failed = len(summaries) - len(synced)
+        message = f"{updated} ligne(s) mise(s) à jour, {inserted} ligne(s) ajoutée(s)"
+        if failed:
+            message += f", {failed} table(s) en échec"
+        return jsonify({
+            "success": not failed,
+            "message": message,
+            "tables": summaries
+        })
+    
+    except DatabaseConnectionError:
+        raise
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+# Vérification par checksums: largeur initiale des plages de clés, seuil de comparaison ligne à ligne,
+# et nombre maximal de lignes différentes rapportées par table
+VERIFY_CHUNK_SIZE = int(os.getenv('VERIFY_CHUNK_SIZE', 10000))
+VERIFY_ROW_LEVEL_SIZE = int(os.getenv('VERIFY_ROW_LEVEL_SIZE', 100))
+VERIFY_MAX_REPORTED_ROWS = int(os.getenv('VERIFY_MAX_REPORTED_ROWS', 1000))
+VERIFY_WORKERS = int(os.getenv('VERIFY_WORKERS', 4))
+
+# Expressions SQL qui donnent le même texte pour une colonne des deux côtés
+# (None pour les colonnes non comparables de façon fiable, comme les flottants)
+def build_verification_expressions(mysql_type, pg_type, mysql_column, pg_column):
+    mysql_type = mysql_type.lower()
+    
+    if mysql_type.startswith(('float', 'double', 'real')):
+        return None
+    if mysql_type.startswith(('decimal', 'numeric')) and ',' in mysql_type and not mysql_type.endswith(',0)'):
+        # Échelles différentes possibles: on retire les zéros non significatifs des deux côtés
+        mysql_expr = f"TRIM(TRAILING '.' FROM TRIM(TRAILING '0' FROM CAST({mysql_column} AS CHAR)))"
+        pg_expr = f"trim_scale({pg_column})::text"
+    elif mysql_type.startswith(('datetime', 'timestamp')):
+        mysql_expr = f"DATE_FORMAT({mysql_column}, '%Y-%m-%d %H:%i:%s')"
+        pg_expr = f"to_char({pg_column}, 'YYYY-MM-DD HH24:MI:SS')"
+    elif mysql_type.startswith(('binary', 'varbinary', 'blob', 'tinyblob', 'mediumblob', 'longblob')):
+        mysql_expr = f"HEX({mysql_column})"
+        pg_expr = f"upper(encode({pg_column}, 'hex'))"
+    elif pg_type == 'boolean':
+        mysql_expr = f"CAST({mysql_column} AS CHAR)"
+        pg_expr = f"({pg_column})::int::text"
+    else:
+        mysql_expr = f"CAST({mysql_column} AS CHAR)"
+        pg_expr = f"({pg_column})::text"
+    
+    return f"COALESCE({mysql_expr}, '~')", f"COALESCE({pg_expr}, '~')"
+
+# Préparer les requêtes de checksum d'une table (côté MySQL et côté PostgreSQL via les tables de mapping)
+def build_verification_plan(mysql_cursor, pg_cursor, db_name, table_name):
+    table_meta = get_mysql_table_metadata(mysql_cursor, db_name, table_name)
+    pg_meta = get_pg_table_metadata(pg_cursor, table_name)
+    if not pg_meta:
+        raise ValueError(f"Table {table_name.lower()} absente de PostgreSQL")
+    
+    primary_keys = table_meta['primary_keys']
+    key_columns = get_row_key_columns(table_name, primary_keys)
+    if not key_columns or 'int' not in table_meta['types'].get(key_columns[0], ''):
+        raise ValueError(f"La vérification nécessite une clé entière ({table_name})")
+    
+    mapping_table = get_mapping_table_name(db_name, table_name)
+    if not pg_table_exists(pg_cursor, mapping_table):
+        raise ValueError(f"Aucune ligne transférée pour {db_name}.{table_name}")
+    
+    # Jointure typée sur l'index new_* de la table de mapping, anciennes valeurs relues dans old_*
+    layout = get_mapping_layout(pg_cursor, mapping_table)
+    join_condition = mapping_join_condition(layout, 'm', [f't."{col.lower()}"' for col in key_columns])
+    old_values = mapping_old_values(layout, 'm', len(key_columns))
+    if layout['types'][layout['old'][0]] in ('bigint', 'integer', 'smallint'):
+        pg_old_key = f"m.{layout['old'][0]}"
+    else:
+        pg_old_key = f"({old_values[0]})::bigint"
+    
+    joins = []
+    mysql_exprs = []
+    pg_exprs = []
+    skipped_columns = []
+    for column in table_meta['columns']:
+        pg_column = column.lower()
+        if pg_column not in pg_meta['types']:
+            skipped_columns.append(column)
+            continue
         
-        # Récupérer le nom de la séquence
-        pg_cursor.execute(f"SELECT pg_get_serial_sequence('{table_name.lower()}', '{primary_key_column}')")
-        sequence_name = pg_cursor.fetchone()[0]
+        if column in key_columns:
+            # Valeur source d'origine, relue dans la table de mapping
+            pg_value = old_values[key_columns.index(column)]
+            mysql_value = f"CAST(`{column}` AS CHAR)"
+            mysql_exprs.append(f"COALESCE({mysql_value}, '~')")
+            pg_exprs.append(f"COALESCE({pg_value}, '~')")
+            continue
         
-        if not sequence_name:
-            return False
-            
-        # Récupérer la valeur actuelle de la séquence
-        pg_cursor.execute(f"SELECT last_value FROM {sequence_name}")
-        seq_value = pg_cursor.fetchone()[0]
+        referenced_table, _ = resolve_referenced_table(table_name, column, db_name)
+        referenced_mapping = get_mapping_table_name(db_name, referenced_table) if referenced_table else None
+        if referenced_mapping and column not in primary_keys and pg_table_exists(pg_cursor, referenced_mapping):
+            # Clé étrangère: on revient à l'ancien ID via la table de mapping référencée
+            alias = f"f{len(joins)}"
+            referenced_layout = get_mapping_layout(pg_cursor, referenced_mapping)
+            condition = mapping_join_condition(referenced_layout, alias, [f't."{pg_column}"'])
+            joins.append(f"LEFT JOIN {referenced_mapping} {alias} ON {condition}")
+            mysql_exprs.append(f"COALESCE(CAST(`{column}` AS CHAR), '~')")
+            pg_exprs.append(f"""CASE WHEN t."{pg_column}" IS NULL THEN '~'
+                                ELSE COALESCE({mapping_key_expr(referenced_layout['old'], alias)},
+                                              '?' || t."{pg_column}"::text) END""")
+            continue
+        
+        expressions = build_verification_expressions(table_meta['types'][column], pg_meta['types'][pg_column],
+                                                     f"`{column}`", f't."{pg_column}"')
+        if expressions is None:
+            skipped_columns.append(column)
+            continue
+        mysql_exprs.append(expressions[0])
+        pg_exprs.append(expressions[1])
+    
+    return {
+        'table_name': table_name,
+        'key_column': key_columns[0],
+        'mysql_row_id': f"CONCAT_WS('_', {', '.join(f'`{col}`' for col in key_columns)})",
+        'mysql_row_text': f"CONCAT_WS('#', {', '.join(mysql_exprs)})",
+        'pg_row_text': f"concat_ws('#', {', '.join(pg_exprs)})",
+        'pg_from': f"""{table_name.lower()} t
+                       JOIN {mapping_table} m ON {join_condition}
+                       {' '.join(joins)}""",
+        'pg_old_key': pg_old_key,
+        'pg_row_id': mapping_key_expr(layout['old'], 'm'),
+        'skipped_columns': skipped_columns
+    }
+
+# Checksums (nombre de lignes, somme des empreintes) par plage de clés [bucket * width, (bucket + 1) * width)
+def compute_bucket_checksums(mysql_cursor, pg_cursor, plan, width, low=None, high=None):
+    key = f"`{plan['key_column']}`"
+    mysql_where, pg_where, params = '', '', []
+    if low is not None:
+        mysql_where = f"WHERE {key} >= %s AND {key} < %s"
+        pg_where = f"WHERE {plan['pg_old_key']} >= %s AND {plan['pg_old_key']} < %s"
+        params = [low, high]
+    
+    mysql_cursor.execute(f"""
+        SELECT FLOOR({key} / %s) AS bucket, COUNT(*) AS row_count,
+               SUM(CAST(CONV(SUBSTRING(MD5({plan['mysql_row_text']}), 1, 8), 16, 10) AS UNSIGNED)) AS row_hash
+        FROM `{plan['table_name']}`
+        {mysql_where}
+        GROUP BY bucket
+    """, [width] + params)
+    source = {int(row[0]): (int(row[1]), int(row[2] or 0)) for row in mysql_cursor.fetchall()}
+    
+    pg_cursor.execute(f"""
+        SELECT floor({plan['pg_old_key']}::numeric / %s)::bigint AS bucket, count(*),
+               sum(('x' || substr(md5({plan['pg_row_text']}), 1, 8))::bit(32)::bigint)
+        FROM {plan['pg_from']}
+        {pg_where}
+        GROUP BY bucket
+    """, [width] + params)
+    target = {int(row[0]): (int(row[1]), int(row[2] or 0)) for row in pg_cursor.fetchall()}
+    
+    return source, target
+
+# Comparaison ligne à ligne d'une petite plage de clés
+def compare_rows_in_range(mysql_cursor, pg_cursor, plan, low, high, report):
+    key = f"`{plan['key_column']}`"
+    mysql_cursor.execute(f"""
+        SELECT {plan['mysql_row_id']}, MD5({plan['mysql_row_text']})
+        FROM `{plan['table_name']}`
+        WHERE {key} >= %s AND {key} < %s
+    """, (low, high))
+    source = {str(row[0]): row[1] for row in mysql_cursor.fetchall()}
+    
+    pg_cursor.execute(f"""
+        SELECT {plan['pg_row_id']}, md5({plan['pg_row_text']})
+        FROM {plan['pg_from']}
+        WHERE {plan['pg_old_key']} >= %s AND {plan['pg_old_key']} < %s
+    """, (low, high))
+    target = {row[0]: row[1] for row in pg_cursor.fetchall()}
+    
+    for row_id in sorted(source.keys() | target.keys()):
+        if row_id not in target:
+            category = "missing_in_target"
+        elif row_id not in source:
+            category = "extra_in_target"
+        elif source[row_id] != target[row_id]:
+            category = "different_rows"
+        else:
+            continue
+        report["differences"] += 1
+        if len(report[category]) < VERIFY_MAX_REPORTED_ROWS:
+            report[category].append(row_id)
+
+# Descendre uniquement dans les plages dont les checksums diffèrent
+def drill_down(mysql_cursor, pg_cursor, plan, low, high, width, report):
+    if width <= VERIFY_ROW_LEVEL_SIZE:
+        compare_rows_in_range(mysql_cursor, pg_cursor, plan, low, high, report)
+        return
+    
+    sub_width = max(VERIFY_ROW_LEVEL_SIZE, width // 16)
+    source, target = compute_bucket_checksums(mysql_cursor, pg_cursor, plan, sub_width, low, high)
+    for bucket in sorted(source.keys() | target.keys()):
+        if source.get(bucket) != target.get(bucket):
+            drill_down(mysql_cursor, pg_cursor, plan, bucket * sub_width, (bucket + 1) * sub_width,
+                       sub_width, report)
+
+# Vérifier qu'une table transférée correspond à sa source
+def verify_table(db_name, table_name, chunk_size=None):
+    chunk_size = chunk_size or VERIFY_CHUNK_SIZE
+    started_at = time.time()
+    report = {"db_name": db_name, "table_name": table_name, "chunks": 0, "chunks_different": 0,
+              "differences": 0, "missing_in_target": [], "extra_in_target": [], "different_rows": []}
+    
+    mysql_conn = None
+    pg_conn = None
+    mysql_cursor = None
+    pg_cursor = None
+    
+    try:
+        mysql_conn = get_mysql_connection()
+        mysql_conn.database = db_name
+        mysql_cursor = mysql_conn.cursor(buffered=True)
+        pg_conn = get_postgres_connection()
+        pg_cursor = pg_conn.cursor()
         
-        # Récupérer la valeur maximale dans la table
-        pg_cursor.execute(f"SELECT COALESCE(MAX(\"{primary_key_column}\"), 0) FROM {table_name.lower()}")
-        max_value = pg_cursor.fetchone()[0]
+        plan = build_verification_plan(mysql_cursor, pg_cursor, db_name, table_name)
+        report["skipped_columns"] = plan['skipped_columns']
         
-        # Si la séquence est en retard par rapport à la valeur max, la mettre à jour
-        if seq_value <= max_value:
-            pg_cursor.execute(f"ALTER SEQUENCE {sequence_name} RESTART WITH {max_value + 1}")
-            print(f"Séquence {sequence_name} réinitialisée à {max_value + 1}")
-            
-        return True
+        # Un seul GROUP BY de chaque côté pour toute la table, puis descente dans les plages différentes
+        source, target = compute_bucket_checksums(mysql_cursor, pg_cursor, plan, chunk_size)
+        report["chunks"] = len(source.keys() | target.keys())
+        for bucket in sorted(source.keys() | target.keys()):
+            if source.get(bucket) != target.get(bucket):
+                report["chunks_different"] += 1
+                drill_down(mysql_cursor, pg_cursor, plan, bucket * chunk_size, (bucket + 1) * chunk_size,
+                           chunk_size, report)
+        
+        report["success"] = report["differences"] == 0
+        report["duration_seconds"] = round(time.time() - started_at, 3)
+        return report
+    
     except Exception as e:
-        print(f"Erreur dans check_and_fix_sequence: {e}")
-        return False
+        invalidate_schema_cache_on_error(e)
+        raise
+    
+    finally:
+        if mysql_cursor: mysql_cursor.close()
+        if mysql_conn: mysql_conn.close()
+        if pg_cursor: pg_cursor.close()
+        if pg_conn: pg_conn.close()
+
+# Vérifier plusieurs tables en parallèle
+def verify_database(db_name, tables=None, max_workers=None):
+    tables = tables or get_table_dependency_order(db_name)
+    reports = {}
+    
+    with ThreadPoolExecutor(max_workers=max(1, max_workers or VERIFY_WORKERS)) as executor:
+        futures = {executor.submit(verify_table, db_name, table): table for table in tables}
+        for future in as_completed(futures):
+            table = futures[future]
+            try:
+                reports[table] = future.result()
+            except Exception as e:
+                traceback.print_exc()
+                reports[table] = {"table_name": table, "success": False, "error": str(e)}
+    
+    return {
+        "db_name": db_name,
+        "success": all(report.get("success") for report in reports.values()),
+        "tables": [reports[table] for table in tables if table in reports]
+    }
+
+@app.route('/verify', methods=['POST'])
+def verify_route():
+    try:
+        payload = request.get_json(silent=True) or {}
+        db_name = payload.get('db_name') or request.form.get('db_name')
+        tables = payload.get('tables') or request.form.getlist('tables') or None
+        workers = payload.get('workers') or request.form.get('workers')
+        
+        if not db_name:
+            return jsonify({"error": "Paramètre db_name requis"}), 400
+        
+        return jsonify(verify_database(db_name, tables, int(workers) if workers else None))
+    
+    except DatabaseConnectionError:
+        raise
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
 
 @app.route('/update-in-postgres', methods=['POST'])
 def update_in_postgres():
@@ -766,29 +4650,22 @@ def update_in_postgres():
         row_data = mysql_cursor.fetchone()
         if not row_data:
             return jsonify({"error": "Ligne non trouvée dans MySQL"}), 404
+        
+        # Adapter les valeurs MySQL aux types PostgreSQL avant l'UPDATE
+        rejected = convert_records(get_value_converters(mysql_cursor, pg_cursor, db_name, table_name), [row_data])
+        if rejected:
+            return jsonify({"error": f"Valeur non convertible: {rejected[0][1]}"}), 400
             
         # Récupérer le mapping pour trouver l'ID dans PostgreSQL
         mapping_table = f"id_mapping_{db_name.lower()}_{table_name.lower()}"
         
-        if table_name.upper() == 'LIGNE_COMMANDE' and '_' in row_id:
-            # Pour LIGNE_COMMANDE, chercher avec l'ID composite
-            pg_cursor.execute(f"""
-                SELECT new_id FROM {mapping_table}
-                WHERE old_id = %s
-            """, (row_id,))
-        else:
-            # Cas standard
-            pg_cursor.execute(f"""
-                SELECT new_id FROM {mapping_table}
-                WHERE old_id = %s
-            """, (str(row_id),))
-            
-        mapping_result = pg_cursor.fetchone()
-        if not mapping_result:
+        # ID simple ou composite ("a_b" pour LIGNE_COMMANDE), résolu par l'index de la table de mapping
+        new_id = None
+        if pg_table_exists(pg_cursor, mapping_table):
+            new_id = get_mapped_ids(pg_cursor, mapping_table, [row_id]).get(str(row_id))
+        if not new_id:
             return jsonify({"error": "Mapping non trouvé, cette ligne n'a pas été transférée auparavant."}), 404
             
-        new_id = mapping_result[0]
-            
         # Préparer les données pour la mise à jour
         columns = []
         update_values = []
@@ -822,7 +4699,7 @@ def update_in_postgres():
             update_values.extend(new_id_parts)
         else:
             # Pour les tables avec clé simple
-            primary_keys = get_primary_keys(mysql_cursor, table_name)
+            primary_keys = get_mysql_table_metadata(mysql_cursor, db_name, table_name)['primary_keys']
             pk_column = primary_keys[0].lower()
             
             update_sql = f"""
@@ -838,15 +4715,113 @@ def update_in_postgres():
         
         return jsonify({"success": True, "message": "Données mises à jour avec succès"})
             
+    except DatabaseConnectionError:
+        raise
     except Exception as e:
         if pg_conn:
             try:
                 pg_conn.rollback()
             except:
                 pass
+        invalidate_schema_cache_on_error(e)
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
         
+    finally:
+        if mysql_cursor: mysql_cursor.close()
+        if mysql_conn: mysql_conn.close()
+        if pg_cursor: pg_cursor.close()
+        if pg_conn: pg_conn.close()
+# Synchroniser un lot de lignes déjà transférées: une lecture MySQL et un seul UPDATE ... FROM (VALUES ...)
+@app.route('/update-batch', methods=['POST'])
+def update_batch():
+    mysql_conn = None
+    pg_conn = None
+    mysql_cursor = None
+    pg_cursor = None
+
+    try:
+        payload = request.get_json(silent=True) or {}
+        db_name = payload.get('db_name') or request.form.get('db_name')
+        table_name = payload.get('table_name') or request.form.get('table_name')
+        row_ids = payload.get('row_ids') or request.form.getlist('row_ids')
+        row_ids = list(dict.fromkeys(str(row_id) for row_id in row_ids))
+
+        if not db_name or not table_name or not row_ids:
+            return jsonify({"error": "Paramètres db_name, table_name et row_ids requis"}), 400
+
+        # Connexions
+        mysql_conn = get_mysql_connection()
+        mysql_conn.database = db_name
+        mysql_cursor = mysql_conn.cursor(dictionary=True)
+
+        pg_conn = get_postgres_connection()
+        pg_cursor = pg_conn.cursor()
+
+        primary_keys = get_mysql_table_metadata(mysql_cursor, db_name, table_name)['primary_keys']
+        key_columns = get_row_key_columns(table_name, primary_keys)
+        if not key_columns:
+            return jsonify({"error": f"Aucune clé primaire trouvée pour {table_name}"}), 400
+
+        results = {}
+        valid_ids = []
+        for row_id in row_ids:
+            if len(key_columns) > 1 and row_id.count('_') < len(key_columns) - 1:
+                results[row_id] = {"success": False, "status": "invalid", "error": "ID composite invalide"}
+            else:
+                valid_ids.append(row_id)
+
+        mapping_table = get_mapping_table_name(db_name, table_name)
+        if not pg_table_exists(pg_cursor, mapping_table):
+            for row_id in valid_ids:
+                results[row_id] = {"success": False, "status": "not_transferred",
+                                   "error": "Mapping non trouvé, cette ligne n'a pas été transférée auparavant."}
+            valid_ids = []
+
+        # Une seule requête MySQL pour tout le lot
+        rows = fetch_rows_by_ids(mysql_cursor, table_name, key_columns, valid_ids) if valid_ids else []
+        rows_by_id = reject_unconvertible_rows(mysql_cursor, pg_cursor, db_name, table_name,
+                                               key_columns, rows, results)
+        for row_id in valid_ids:
+            if row_id not in rows_by_id and row_id not in results:
+                results[row_id] = {"success": False, "status": "not_found", "error": "Ligne non trouvée dans MySQL"}
+
+        identified_rows = [(row_id, rows_by_id[row_id]) for row_id in valid_ids if row_id in rows_by_id]
+        updated, unmapped_ids = bulk_update_rows(pg_cursor, db_name, table_name, primary_keys,
+                                                 identified_rows, mapping_table)
+        pg_conn.commit()
+
+        updated, unmapped = set(updated), set(unmapped_ids)
+        for row_id, _ in identified_rows:
+            if row_id in unmapped:
+                results[row_id] = {"success": False, "status": "not_transferred",
+                                   "error": "Mapping non trouvé, cette ligne n'a pas été transférée auparavant."}
+            else:
+                results[row_id] = {"success": True, "status": "updated" if row_id in updated else "unchanged"}
+
+        unchanged = sum(1 for r in results.values() if r["status"] == "unchanged")
+        failed = sum(1 for r in results.values() if not r["success"])
+        return jsonify({
+            "success": True,
+            "message": f"{len(updated)} ligne(s) mise(s) à jour, {unchanged} inchangée(s), {failed} échec(s)",
+            "updated": len(updated),
+            "unchanged": unchanged,
+            "failed": failed,
+            "results": results
+        })
+
+    except DatabaseConnectionError:
+        raise
+    except Exception as e:
+        if pg_conn:
+            try:
+                pg_conn.rollback()
+            except:
+                pass
+        invalidate_schema_cache_on_error(e)
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
     finally:
         if mysql_cursor: mysql_cursor.close()
         if mysql_conn: mysql_conn.close()
@@ -867,8 +4842,9 @@ def edit_row(db_name, table_name, row_id):
             mysql_conn.database = db_name
             mysql_cursor = mysql_conn.cursor(dictionary=True)
             
-            # Récupérer les clés primaires
-            primary_keys = get_primary_keys(mysql_cursor, table_name)
+            # Récupérer les clés primaires (cache de schéma)
+            table_meta = get_mysql_table_metadata(mysql_cursor, db_name, table_name)
+            primary_keys = table_meta['primary_keys']
             
             # Récupérer les données originales
             if table_name.upper() == 'LIGNE_COMMANDE' and '_' in row_id:
@@ -887,8 +4863,7 @@ def edit_row(db_name, table_name, row_id):
                 return "Ligne non trouvée", 404
             
             # Obtenir la structure de la table
-            mysql_cursor.execute(f"SHOW COLUMNS FROM `{table_name}`")
-            columns_info = mysql_cursor.fetchall()
+            columns_info = table_meta['column_info']
             
             return render_template('edit_row.html',
                                   db_name=db_name,
@@ -898,7 +4873,10 @@ def edit_row(db_name, table_name, row_id):
                                   columns_info=columns_info,
                                   primary_keys=primary_keys)
             
+        except DatabaseConnectionError:
+            raise
         except Exception as e:
+            invalidate_schema_cache_on_error(e)
             traceback.print_exc()
             return f"Erreur: {str(e)}", 500
             
@@ -926,19 +4904,17 @@ def edit_row(db_name, table_name, row_id):
             pg_conn = get_postgres_connection()
             pg_cursor = pg_conn.cursor()
             
-            # Récupérer les clés primaires
-            primary_keys = get_primary_keys(mysql_cursor, table_name)
+            # Récupérer les clés primaires (cache de schéma)
+            primary_keys = get_mysql_table_metadata(mysql_cursor, db_name, table_name)['primary_keys']
             
             # Récupérer le mapping de l'ID
             mapping_table = f"id_mapping_{db_name.lower()}_{table_name.lower()}"
             
+            new_id = None
+            if pg_table_exists(pg_cursor, mapping_table):
+                new_id = get_mapped_ids(pg_cursor, mapping_table, [row_id]).get(str(row_id))
+            
             if table_name.upper() == 'LIGNE_COMMANDE' and '_' in row_id:
-                # Cas spécial pour LIGNE_COMMANDE avec clé composite
-                pg_cursor.execute(f"""
-                    SELECT new_id FROM {mapping_table}
-                    WHERE old_id = %s
-                """, (row_id,))
-                
                 # Mise à jour dans MySQL également pour LIGNE_COMMANDE
                 parts = row_id.split('_')
                 id_commande = parts[0]
@@ -963,12 +4939,6 @@ def edit_row(db_name, table_name, row_id):
                     mysql_cursor.execute(mysql_update_sql, mysql_update_values)
                     mysql_conn.commit()
             else:
-                # Cas standard
-                pg_cursor.execute(f"""
-                    SELECT new_id FROM {mapping_table}
-                    WHERE old_id = %s
-                """, (row_id,))
-                
                 # Mise à jour dans MySQL également
                 mysql_set_clauses = []
                 mysql_update_values = []
@@ -988,27 +4958,30 @@ def edit_row(db_name, table_name, row_id):
                     mysql_cursor.execute(mysql_update_sql, mysql_update_values)
                     mysql_conn.commit()
                 
-            mapping_result = pg_cursor.fetchone()
-            if not mapping_result:
+            if not new_id:
                 return "Mapping non trouvé", 404
-                
-            new_id = mapping_result[0]
             
             # Préparer la requête de mise à jour pour PostgreSQL
             set_clauses = []
             update_values = []
             
-            # Exclure les clés primaires de la mise à jour
-            for key, value in form_data.items():
-                if key not in primary_keys and key != 'csrf_token':
-                    # Mapper les clés étrangères si nécessaire
-                    if key.startswith('id_') and key != 'id_column':
-                        mapped_value = map_foreign_key(pg_cursor, db_name, table_name, key, value)
-                        if mapped_value is not None:
-                            value = mapped_value
-                    
-                    set_clauses.append(f'"{key.lower()}" = %s')
-                    update_values.append(value)
+            # Exclure les clés primaires de la mise à jour et adapter les valeurs saisies aux types PostgreSQL
+            pg_values = {key: value for key, value in form_data.items()
+                         if key not in primary_keys and key != 'csrf_token'}
+            rejected = convert_records(get_value_converters(mysql_cursor, pg_cursor, db_name, table_name),
+                                       [pg_values])
+            if rejected:
+                return f"Valeur non convertible: {rejected[0][1]}", 400
+            
+            for key, value in pg_values.items():
+                # Mapper les clés étrangères si nécessaire
+                if key.startswith('id_') and key != 'id_column':
+                    mapped_value = map_foreign_key(pg_cursor, db_name, table_name, key, value)
+                    if mapped_value is not None:
+                        value = mapped_value
+                
+                set_clauses.append(f'"{key.lower()}" = %s')
+                update_values.append(value)
             
             if not set_clauses:
                 return "Aucune donnée à mettre à jour", 400
@@ -1038,6 +5011,8 @@ def edit_row(db_name, table_name, row_id):
             # Rediriger vers la page de la table
             return redirect(url_for('show_table', db_name=db_name, table_name=table_name))
             
+        except DatabaseConnectionError:
+            raise
         except Exception as e:
             if pg_conn:
                 try:
@@ -1049,6 +5024,7 @@ def edit_row(db_name, table_name, row_id):
                     mysql_conn.rollback()
                 except:
                     pass
+            invalidate_schema_cache_on_error(e)
             traceback.print_exc()
             return f"Erreur: {str(e)}", 500
             
@@ -1079,57 +5055,190 @@ def delete_from_postgres():
         db_name = request.form.get('db_name')
         table_name = request.form.get('table_name')
         row_id = request.form.get('row_id')
-        id_column = request.form.get('id_column')
 
         # Connexion à PostgreSQL
         pg_conn = get_postgres_connection()
         pg_cursor = pg_conn.cursor()
 
-        # Récupérer le mapping pour trouver l'ID dans PostgreSQL
-        mapping_table = f"id_mapping_{db_name.lower()}_{table_name.lower()}"
-        pg_cursor.execute(f"""
-            SELECT new_id FROM {mapping_table}
-            WHERE old_id = %s
-        """, (str(row_id),))
-        mapping_result = pg_cursor.fetchone()
-        if not mapping_result:
+        # Supprimer la ligne cible et sa correspondance d'ID (compteur décrémenté) en une requête
+        mapping_table = get_mapping_table_name(db_name, table_name)
+        deleted, stale = [], []
+        if pg_table_exists(pg_cursor, mapping_table):
+            deleted, stale = delete_rows_with_mapping(pg_cursor, table_name, mapping_table, [row_id])
+        if not deleted and not stale:
             return jsonify({"error": "Mapping non trouvé, cette ligne n'a pas été transférée auparavant."}), 404
-        new_id = mapping_result[0]
 
-        # Construire et exécuter la requête de suppression
-        if table_name.upper() == 'LIGNE_COMMANDE' and '_' in new_id:
-            # Pour LIGNE_COMMANDE avec clé composite
-            new_id_parts = new_id.split('_')
-            delete_sql = f"""
-                DELETE FROM {table_name.lower()}
-                WHERE id_commande = %s AND id_produit = %s
-            """
-            pg_cursor.execute(delete_sql, new_id_parts)
-        else:
-            # Pour les tables avec clé simple
-            primary_keys = get_primary_keys(pg_cursor, table_name)
-            pk_column = primary_keys[0].lower()
-            delete_sql = f"""
-                DELETE FROM {table_name.lower()}
-                WHERE "{pk_column}" = %s
-            """
-            pg_cursor.execute(delete_sql, (new_id,))
+        pg_conn.commit()
+        
+        # La ligne supprimée ne doit plus être résolue depuis le cache des correspondances
+        fk_mapping_cache.invalidate_keys(db_name, table_name, [row_id])
+        message = "Ligne supprimée avec succès." if deleted else "Ligne absente de PostgreSQL, correspondance supprimée."
+        return jsonify({"success": True, "message": message, "deleted_row_id": row_id})  # Renvoyer l'ID de la ligne supprimée
+
+    except DatabaseConnectionError:
+        raise
+    except Exception as e:
+        if pg_conn:
+            try:
+                pg_conn.rollback()
+            except:
+                pass
+        invalidate_schema_cache_on_error(e)
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+    finally:
+        if pg_cursor: pg_cursor.close()
+        if pg_conn: pg_conn.close()
+# Supprimer en une seule requête des lignes transférées et leurs correspondances d'ID (sans commit);
+# retourne (anciens ID supprimés, anciens ID dont seule la correspondance restait)
+def delete_rows_with_mapping(pg_cursor, table_name, mapping_table, old_ids):
+    layout = get_mapping_layout(pg_cursor, mapping_table)
+    keys = {}
+    for old_id in old_ids:
+        key = split_mapping_key(layout, layout['old'], old_id)
+        if key is not None:
+            keys[key] = str(old_id)
+    if not keys:
+        return [], []
+    
+    primary_keys = get_pg_table_metadata(pg_cursor, table_name)['primary_keys']
+    key_columns = [f't."{col.lower()}"' for col in get_row_key_columns(table_name, primary_keys)]
+    condition, params = mapping_key_condition(layout, layout['old'], list(keys), alias='m')
+    old_key = mapping_key_expr(layout['old'], 'm')
+    
+    # La suppression des lignes cibles (CTE) et celle des correspondances partagent le même instantané
+    pg_cursor.execute(f"""
+        WITH deleted AS (
+            DELETE FROM {table_name.lower()} AS t
+            USING {mapping_table} AS m
+            WHERE {mapping_join_condition(layout, 'm', key_columns)} AND {condition}
+            RETURNING {old_key} AS old_key
+        )
+        DELETE FROM {mapping_table} AS m
+        WHERE {condition}
+        RETURNING {old_key}, {old_key} IN (SELECT old_key FROM deleted)
+    """, params + params)
+    removed = pg_cursor.fetchall()
+    increment_mapping_counter(pg_cursor, mapping_table, -len(removed))
+    
+    deleted = [old_id for old_id, had_row in removed if had_row]
+    stale = [old_id for old_id, had_row in removed if not had_row]
+    return deleted, stale
+
+# Supprimer de PostgreSQL un lot de lignes transférées (lignes cibles et correspondances d'ID)
+@app.route('/delete-batch', methods=['POST'])
+def delete_batch():
+    pg_conn = None
+    pg_cursor = None
+    try:
+        payload = request.get_json(silent=True) or {}
+        db_name = payload.get('db_name') or request.form.get('db_name')
+        table_name = payload.get('table_name') or request.form.get('table_name')
+        row_ids = payload.get('row_ids') or request.form.getlist('row_ids')
+        row_ids = list(dict.fromkeys(str(row_id) for row_id in row_ids))
+
+        if not db_name or not table_name or not row_ids:
+            return jsonify({"error": "Paramètres db_name, table_name et row_ids requis"}), 400
 
+        # Connexion à PostgreSQL
+        pg_conn = get_postgres_connection()
+        pg_cursor = pg_conn.cursor()
+
+        mapping_table = get_mapping_table_name(db_name, table_name)
+        deleted, stale = [], []
+        if pg_table_exists(pg_cursor, mapping_table):
+            deleted, stale = delete_rows_with_mapping(pg_cursor, table_name, mapping_table, row_ids)
         pg_conn.commit()
-        return jsonify({"success": True, "message": "Ligne supprimée avec succès.", "deleted_row_id": row_id})  # Renvoyer l'ID de la ligne supprimée
 
+        # Les lignes supprimées ne doivent plus être résolues depuis le cache des correspondances
+        fk_mapping_cache.invalidate_keys(db_name, table_name, deleted + stale)
+
+        results = {row_id: {"success": False, "status": "not_transferred",
+                            "error": "Mapping non trouvé, cette ligne n'a pas été transférée auparavant."}
+                   for row_id in row_ids}
+        for row_id in deleted:
+            results[row_id] = {"success": True, "status": "deleted"}
+        for row_id in stale:
+            results[row_id] = {"success": True, "status": "mapping_removed",
+                               "message": "Ligne absente de PostgreSQL, correspondance supprimée"}
+
+        failed = sum(1 for r in results.values() if not r["success"])
+        return jsonify({
+            "success": True,
+            "message": f"{len(deleted)} ligne(s) supprimée(s), {len(stale)} correspondance(s) orpheline(s) "
+                       f"supprimée(s), {failed} non transférée(s)",
+            "deleted": len(deleted),
+            "mappings_removed": len(stale),
+            "failed": failed,
+            "results": results
+        })
+
+    except DatabaseConnectionError:
+        raise
     except Exception as e:
         if pg_conn:
             try:
                 pg_conn.rollback()
             except:
                 pass
+        invalidate_schema_cache_on_error(e)
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
 
     finally:
         if pg_cursor: pg_cursor.close()
         if pg_conn: pg_conn.close()
+# Estimation du nombre de lignes des tables sources (information_schema.TABLES, sans COUNT(*))
+def get_source_row_estimates():
+    def load():
+        connection = get_mysql_connection()
+        cursor = connection.cursor()
+        try:
+            placeholders = ', '.join(['%s'] * len(ALLOWED_DATABASES))
+            cursor.execute(f"""
+                SELECT TABLE_SCHEMA, TABLE_NAME, TABLE_ROWS
+                FROM information_schema.TABLES
+                WHERE TABLE_SCHEMA IN ({placeholders}) AND TABLE_TYPE = 'BASE TABLE'
+            """, ALLOWED_DATABASES)
+            estimates = {}
+            for db_name, table_name, table_rows in cursor.fetchall():
+                estimates.setdefault(db_name, {})[table_name] = int(table_rows or 0)
+            return estimates
+        finally:
+            cursor.close()
+            connection.close()
+    
+    return schema_cache.get(('mysql_table_rows',), load)
+
+# Nombre de correspondances par table de mapping: compteur maintenu, sinon statistiques PostgreSQL
+def get_mapping_row_counts(pg_cursor, exact=False):
+    counter_column = "m.row_count" if pg_table_exists(pg_cursor, 'mapping_counters') else "NULL::bigint"
+    counter_join = ("LEFT JOIN mapping_counters m ON m.mapping_table = c.relname"
+                    if counter_column == "m.row_count" else "")
+    pg_cursor.execute(f"""
+        SELECT c.relname, {counter_column}, c.reltuples::bigint, s.n_live_tup
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace AND n.nspname = 'public'
+        LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid
+        {counter_join}
+        WHERE c.relkind = 'r' AND c.relname LIKE 'id\\_mapping\\_%'
+    """)
+    
+    counts = {}
+    for mapping_table, counter, reltuples, live_tuples in pg_cursor.fetchall():
+        if exact:
+            pg_cursor.execute(f"SELECT COUNT(*) FROM {mapping_table}")
+            counts[mapping_table] = (pg_cursor.fetchone()[0], 'exact')
+        elif counter is not None:
+            counts[mapping_table] = (counter, 'counter')
+        elif reltuples is not None and reltuples >= 0:
+            # reltuples vaut -1 tant que la table n'a jamais été analysée
+            counts[mapping_table] = (reltuples, 'estimate')
+        else:
+            counts[mapping_table] = (live_tuples or 0, 'estimate')
+    return counts
+
 # Nouvelle route pour voir l'état des transferts
 @app.route('/transfer-status')
 def transfer_status():
@@ -1137,40 +5246,51 @@ def transfer_status():
     pg_cursor = None
 
     try:
+        started_at = time.time()
+        exact = request.args.get('exact', '').lower() in ('1', 'true', 'on')
+        
         pg_conn = get_postgres_connection()
         pg_cursor = pg_conn.cursor()
         
-        # Récupérer la liste des tables de mapping
-        pg_cursor.execute("""
-            SELECT table_name 
-            FROM information_schema.tables 
-            WHERE table_name LIKE 'id_mapping_%'
-        """)
-        
-        mapping_tables = [table[0] for table in pg_cursor.fetchall()]
+        mapping_counts = get_mapping_row_counts(pg_cursor, exact)
+        source_estimates = get_source_row_estimates()
         
-        # Organiser les données par base de données et table
+        # Organiser les données par base de données et table (toutes les tables sources, même non transférées)
         status = {}
+        for db_name in ALLOWED_DATABASES:
+            for table_name, source_rows in sorted(source_estimates.get(db_name, {}).items()):
+                status.setdefault(db_name, {})[table_name] = {
+                    "transferred": 0, "source_rows": source_rows, "count_source": None, "progress": 0.0
+                }
         
-        for table in mapping_tables:
-            # Extraire le db_name et table_name du nom de la table de mapping
-            parts = table.split('_', 2)  # id_mapping_db_table
-            if len(parts) >= 3:
-                db_name = parts[2].split('_')[0]
-                table_name = '_'.join(parts[2].split('_')[1:])
-                
-                if db_name not in status:
-                    status[db_name] = {}
-                
-                # Compter les entrées dans la table de mapping
-                pg_cursor.execute(f"SELECT COUNT(*) FROM {table}")
-                count = pg_cursor.fetchone()[0]
-                
-                status[db_name][table_name] = count
+        for mapping_table, (transferred, count_source) in mapping_counts.items():
+            db_name, mapping_suffix = parse_mapping_table_name(mapping_table)
+            if not db_name:
+                continue
+            tables = status.setdefault(db_name, {})
+            table_name = next((name for name in tables if name.lower() == mapping_suffix), mapping_suffix)
+            entry = tables.setdefault(table_name, {"source_rows": 0, "progress": 0.0})
+            entry["transferred"] = transferred
+            entry["count_source"] = count_source
+        
+        for tables in status.values():
+            for entry in tables.values():
+                if entry["source_rows"]:
+                    # TABLE_ROWS est une estimation (InnoDB): la progression est plafonnée à 100 %
+                    entry["progress"] = round(min(100.0, 100.0 * entry["transferred"] / entry["source_rows"]), 1)
+                elif entry["transferred"]:
+                    entry["progress"] = 100.0
+        
+        duration_ms = round((time.time() - started_at) * 1000, 1)
+        if request.args.get('format') == 'json':
+            return jsonify({"status": status, "exact": exact, "duration_ms": duration_ms})
         
-        return render_template('transfer_status.html', status=status)
+        return render_template('transfer_status.html', status=status, exact=exact, duration_ms=duration_ms)
         
+    except DatabaseConnectionError:
+        raise
     except Exception as e:
+        invalidate_schema_cache_on_error(e)
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
         
@@ -1186,33 +5306,27 @@ def fix_all_sequences():
         pg_conn = get_postgres_connection()
         pg_cursor = pg_conn.cursor()
         
-        # Récupérer toutes les tables
-        pg_cursor.execute("""
-            SELECT table_name 
-            FROM information_schema.tables 
-            WHERE table_schema = 'public' AND table_type = 'BASE TABLE'
-        """)
-        tables = [table[0] for table in pg_cursor.fetchall()]
-        
-        fixed_tables = []
-        for table in tables:
-            if check_and_fix_sequence(pg_cursor, table):
-                fixed_tables.append(table)
-        
+        # Relire le catalogue (tables créées depuis) puis un setval par séquence en retard
+        schema_cache.invalidate('pg_sequences')
+        aligned = align_sequences(pg_cursor)
         pg_conn.commit()
         
         return jsonify({
             "success": True, 
-            "message": f"Séquences corrigées pour {len(fixed_tables)} tables",
-            "fixed_tables": fixed_tables
+            "message": f"Séquences corrigées pour {len(aligned)} tables",
+            "fixed_tables": sorted({entry["table"] for entry in aligned}),
+            "sequences": aligned
         })
     
+    except DatabaseConnectionError:
+        raise
     except Exception as e:
         if pg_conn:
             try:
                 pg_conn.rollback()
             except:
                 pass
+        invalidate_schema_cache_on_error(e)
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
     
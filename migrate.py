@@ -0,0 +1,230 @@
+"""Migration MySQL -> PostgreSQL (central_db) en ligne de commande, sans passer par Flask.
+
+Exemples:
+    python migrate.py all --workers 3
+    python migrate.py database THIERNO --chunk-size 10000 --table-workers 4
+    python migrate.py table THIERNO CLIENT --from 1 --to 50000
+    python migrate.py database THIERNO --dry-run
+    python migrate.py all --create-schema
+    python migrate.py ddl THIERNO > schema.sql
+
+Codes de sortie: 0 succès, 1 migration en échec (au moins une table), 2 arguments invalides (argparse),
+3 base de données injoignable.
+"""
+import argparse
+import json
+import sys
+import time
+
+import app as migration
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_CONNECTION = 3
+
+
+def parse_args(argv):
+    # Options communes, acceptées après chaque sous-commande
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--chunk-size', type=int, default=None,
+                        help=f"lignes par lot (défaut: {migration.MIGRATION_CHUNK_SIZE})")
+    common.add_argument('--dry-run', action='store_true',
+                        help="afficher le plan (ordre, clés différées, volumes) sans rien écrire")
+    common.add_argument('--json', action='store_true', help="rapport final au format JSON")
+    common.add_argument('--no-pipeline', action='store_true',
+                        help="lecture, préparation et écriture séquentielles (pas de recouvrement)")
+
+    parser = argparse.ArgumentParser(description="Migration MySQL vers PostgreSQL (central_db)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    all_parser = subparsers.add_parser('all', parents=[common], help="toutes les bases autorisées")
+    all_parser.add_argument('--databases', nargs='+', default=None, help="sous-ensemble des bases autorisées")
+    all_parser.add_argument('--workers', type=int, default=None,
+                            help=f"bases migrées en parallèle (défaut: {migration.MIGRATION_WORKERS})")
+    all_parser.add_argument('--create-schema', action='store_true',
+                            help="créer les tables absentes, index et clés étrangères après le chargement")
+
+    database_parser = subparsers.add_parser('database', parents=[common], help="toutes les tables d'une base")
+    database_parser.add_argument('db_name')
+    database_parser.add_argument('--table-workers', type=int, default=None,
+                                 help=f"tables migrées en parallèle (défaut: {migration.MIGRATION_TABLE_WORKERS})")
+    database_parser.add_argument('--create-schema', action='store_true',
+                                 help="créer les tables absentes, index et clés étrangères après le chargement")
+
+    table_parser = subparsers.add_parser('table', parents=[common], help="une table, éventuellement une plage de clés")
+    table_parser.add_argument('db_name')
+    table_parser.add_argument('table_name')
+    table_parser.add_argument('--from', dest='key_from', type=int, default=None, help="première clé (incluse)")
+    table_parser.add_argument('--to', dest='key_to', type=int, default=None, help="dernière clé (incluse)")
+    table_parser.add_argument('--restart', action='store_true', help="ignorer le point de reprise de la table")
+
+    ddl_parser = subparsers.add_parser('ddl', help="afficher le DDL PostgreSQL déduit du schéma MySQL")
+    ddl_parser.add_argument('db_name')
+
+    args = parser.parse_args(argv)
+
+    db_names = args.databases if args.command == 'all' else [args.db_name]
+    for db_name in db_names or []:
+        if db_name not in migration.ALLOWED_DATABASES:
+            parser.error(f"base non autorisée: {db_name} (bases: {', '.join(migration.ALLOWED_DATABASES)})")
+    if args.command != 'ddl' and args.chunk_size is not None and args.chunk_size <= 0:
+        parser.error("--chunk-size doit être positif")
+    if args.command == 'table' and args.restart and (args.key_from is not None or args.key_to is not None):
+        parser.error("--restart ne s'applique pas à une plage de clés")
+    return args
+
+
+# Nombre exact de lignes sources d'une plage de clés
+def count_source_rows(db_name, table_name, key_range):
+    connection = migration.get_mysql_connection()
+    try:
+        connection.database = db_name
+        cursor = connection.cursor(dictionary=True)
+        primary_keys = migration.get_mysql_table_metadata(cursor, db_name, table_name)['primary_keys']
+        key_column = migration.get_row_key_columns(table_name, primary_keys)[0]
+        conditions, params = [], []
+        if key_range[0] is not None:
+            conditions.append(f"`{key_column}` >= %s")
+            params.append(key_range[0])
+        if key_range[1] is not None:
+            conditions.append(f"`{key_column}` <= %s")
+            params.append(key_range[1])
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        cursor.execute(f"SELECT COUNT(*) AS total FROM `{table_name}`{where}", params)
+        total = cursor.fetchall()[0]['total']
+        cursor.close()
+        return total
+    finally:
+        connection.close()
+
+
+# Plan de migration sans écriture: ordre des tables, clés différées et volumes estimés
+def build_dry_run_report(args):
+    estimates = migration.get_source_row_estimates()
+    if args.command == 'all':
+        db_names = args.databases or migration.ALLOWED_DATABASES
+    else:
+        db_names = [args.db_name]
+
+    report = {"dry_run": True, "databases": {}}
+    for db_name in db_names:
+        order, dependencies, deferred_columns = migration.build_dependency_plan(
+            migration.get_foreign_key_graph(db_name))
+        if args.command == 'table':
+            if args.table_name not in order:
+                raise ValueError(f"Table inconnue dans {db_name}: {args.table_name}")
+            order = [args.table_name]
+
+        tables = []
+        for table in order:
+            entry = {
+                "table_name": table,
+                "depends_on": sorted(dependencies.get(table, ())),
+                "deferred_columns": sorted(deferred_columns.get(table, ())),
+                "estimated_rows": estimates.get(db_name, {}).get(table, 0)
+            }
+            if args.command == 'table' and (args.key_from is not None or args.key_to is not None):
+                entry["key_range"] = [args.key_from, args.key_to]
+                entry["rows_in_range"] = count_source_rows(db_name, table, (args.key_from, args.key_to))
+            tables.append(entry)
+        report["databases"][db_name] = {"tables": tables}
+    return report
+
+
+def run(args):
+    if args.dry_run:
+        return build_dry_run_report(args)
+    if args.no_pipeline:
+        migration.MIGRATION_PIPELINE = False
+
+    if args.command == 'all':
+        return migration.migrate_all_databases(args.databases, args.workers, args.chunk_size,
+                                               create_schema=args.create_schema)
+
+    if args.command == 'database':
+        return migration.migrate_database(args.db_name, args.chunk_size, max_workers=args.table_workers,
+                                          create_schema=args.create_schema)
+
+    key_range = None
+    if args.key_from is not None or args.key_to is not None:
+        key_range = (args.key_from, args.key_to)
+    summary = migration.migrate_table(args.db_name, args.table_name, args.chunk_size,
+                                      resume=not args.restart, key_range=key_range)
+    return {"success": True, "tables": [summary], "db_name": args.db_name}
+
+
+def print_report(report):
+    if report.get("dry_run"):
+        for db_name, plan in report["databases"].items():
+            print(f"\n[Plan] {db_name}")
+            for entry in plan["tables"]:
+                line = f"  {entry['table_name']}: ~{entry['estimated_rows']} ligne(s)"
+                if "rows_in_range" in entry:
+                    line += f", {entry['rows_in_range']} dans la plage {entry['key_range']}"
+                if entry["depends_on"]:
+                    line += f", après {', '.join(entry['depends_on'])}"
+                if entry["deferred_columns"]:
+                    line += f", clés différées: {', '.join(entry['deferred_columns'])}"
+                print(line)
+        return
+
+    results = report.get("databases") or {report.get("db_name"): report}
+    for db_name, result in results.items():
+        print(f"\n[Résultat] {db_name}: {'succès' if result.get('success') else 'échec'}")
+        for summary in result.get("tables", []):
+            if summary.get("error"):
+                print(f"  {summary['table_name']}: ERREUR {summary['error']}")
+            else:
+                line = (f"  {summary['table_name']}: {summary.get('rows_transferred', 0)} transférée(s), "
+                        f"{summary.get('rows_skipped', 0)} ignorée(s)")
+                if summary.get("rows_rejected"):
+                    line += f", {summary['rows_rejected']} rejetée(s) (valeurs non convertibles)"
+                print(f"{line} en {summary.get('duration_seconds', 0)} s")
+        if result.get("error") and not result.get("tables"):
+            print(f"  ERREUR {result['error']}")
+
+    schemas = report.get("schema") or ({report["db_name"]: report["schema"]} if report.get("schema") else {})
+    for db_name, schema in schemas.items():
+        post_load = schema.get("post_load", {})
+        print(f"\n[Schéma] {db_name}: {len(schema.get('created', []))} table(s) créée(s), "
+              f"{len(post_load.get('indexes', {}).get('created', []))} index, "
+              f"{len(post_load.get('foreign_keys', {}).get('validated', []))} clé(s) étrangère(s) validée(s)")
+        for name, error in {**post_load.get('indexes', {}).get('errors', {}),
+                            **post_load.get('foreign_keys', {}).get('errors', {})}.items():
+            print(f"  {name}: ERREUR {error}")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    started_at = time.time()
+
+    if args.command == 'ddl':
+        try:
+            print(migration.render_ddl_script(migration.generate_schema_ddl(args.db_name)), end='')
+        except migration.DatabaseConnectionError as e:
+            print(f"Connexion impossible: {e}", file=sys.stderr)
+            return EXIT_CONNECTION
+        return EXIT_OK
+
+    try:
+        report = run(args)
+    except migration.DatabaseConnectionError as e:
+        print(f"Connexion impossible: {e}", file=sys.stderr)
+        return EXIT_CONNECTION
+    except Exception as e:
+        print(f"Migration interrompue: {e}", file=sys.stderr)
+        return EXIT_FAILED
+
+    if args.json:
+        print(json.dumps(report, default=str, indent=2))
+    else:
+        print_report(report)
+        print(f"\nDurée totale: {round(time.time() - started_at, 1)} s")
+
+    if report.get("dry_run"):
+        return EXIT_OK
+    return EXIT_OK if report.get("success") else EXIT_FAILED
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,102 @@
+import pytest
+
+import app
+
+SOURCE_ROWS = [(1, 'Ada'), (2, 'Alan'), (3, 'Grace'), (4, 'Edsger')]
+
+
+class FakeMySQLCursor:
+    column_names = ('id_client', 'nom')
+    
+    def __init__(self, connection):
+        self.connection = connection
+        self.rows = []
+    
+    def execute(self, sql, params=()):
+        self.connection.queries.append((sql, tuple(params)))
+        # Reprise: seules les clés au-delà du point de reprise sont relues
+        low = params[0] if params else None
+        self.rows = [row for row in SOURCE_ROWS if low is None or row[0] > low]
+    
+    def fetchmany(self, size):
+        batch, self.rows = self.rows[:size], self.rows[size:]
+        return batch
+    
+    def close(self):
+        pass
+
+
+class FakeMySQLConnection:
+    def __init__(self):
+        self.queries = []
+        self.database = None
+    
+    def cursor(self, **kwargs):
+        return FakeMySQLCursor(self)
+    
+    def close(self):
+        pass
+
+
+class FakePostgresConnection:
+    def cursor(self):
+        return self
+    
+    def execute(self, sql, params=None):
+        pass
+    
+    def commit(self):
+        pass
+    
+    def rollback(self):
+        pass
+    
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def migration(monkeypatch):
+    state = {"mysql": FakeMySQLConnection(), "checkpoint": None, "saved": [], "copied": []}
+    
+    monkeypatch.setattr(app, 'get_mysql_connection', lambda: state["mysql"])
+    monkeypatch.setattr(app, 'get_postgres_connection', FakePostgresConnection)
+    monkeypatch.setattr(app, 'get_mysql_table_metadata',
+                        lambda cursor, db, table: {'primary_keys': ['id_client'], 'columns': ['id_client', 'nom']})
+    monkeypatch.setattr(app, 'get_pg_table_metadata',
+                        lambda cursor, table: {'sequences': {'id_client': 'client_id_client_seq'}})
+    monkeypatch.setattr(app, 'get_value_converters', lambda mysql_cursor, pg_cursor, db, table: {})
+    monkeypatch.setattr(app, 'ensure_mapping_table_exists', lambda cursor, db, table: 'id_mapping_test_client')
+    monkeypatch.setattr(app, 'ensure_migration_checkpoints_table', lambda cursor: None)
+    monkeypatch.setattr(app, 'get_migration_checkpoint', lambda cursor, db, table: state["checkpoint"])
+    monkeypatch.setattr(app, 'save_migration_checkpoint',
+                        lambda cursor, db, table, last_key, chunk_seq, rows, status='running':
+                        state["saved"].append((last_key, chunk_seq, rows, status)))
+    monkeypatch.setattr(app, 'resolve_referenced_table', lambda table, column, db=None: (None, None))
+    monkeypatch.setattr(app, 'get_mapped_ids', lambda cursor, mapping_table, row_ids: {})
+    monkeypatch.setattr(app, 'reserve_sequence_ids', lambda cursor, sequence, count: list(range(100, 100 + count)))
+    monkeypatch.setattr(app, 'copy_rows',
+                        lambda cursor, table, columns, rows: state["copied"].extend(list(rows)))
+    monkeypatch.setattr(app, 'copy_id_mappings', lambda cursor, mapping_table, id_pairs: None)
+    return state
+
+
+def test_migration_checkpoints_every_committed_chunk(migration):
+    summary = app.migrate_table('TEST', 'CLIENT', chunk_size=2, manage_sequences=False)
+    
+    assert summary["rows_transferred"] == 4
+    assert migration["saved"][:2] == [([2], 1, 2, 'running'), ([4], 2, 4, 'running')]
+    assert migration["saved"][-1][3] == 'completed'
+
+
+def test_migration_resumes_after_the_checkpointed_key(migration):
+    migration["checkpoint"] = {"last_key": [2], "chunk_seq": 1, "rows_transferred": 2, "status": 'running'}
+    
+    summary = app.migrate_table('TEST', 'CLIENT', chunk_size=2, manage_sequences=False)
+    
+    select_sql, params = migration["mysql"].queries[-1]
+    assert '(`id_client`) > (%s)' in select_sql and params == (2,)
+    assert summary["resumed_after"] == [2]
+    assert [row[1] for row in migration["copied"]] == ['Grace', 'Edsger']
+    # Numéro de lot et total repartent des valeurs du point de reprise
+    assert migration["saved"][0] == ([4], 2, 4, 'running')
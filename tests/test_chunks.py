@@ -0,0 +1,33 @@
+import app
+
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = list(rows)
+        self.fetch_sizes = []
+    
+    def fetchmany(self, size):
+        self.fetch_sizes.append(size)
+        batch, self.rows = self.rows[:size], self.rows[size:]
+        return batch
+
+
+def test_iter_row_chunks_respects_chunk_size():
+    cursor = FakeCursor([(i,) for i in range(250)])
+    chunks = list(app.iter_row_chunks(cursor, 100))
+    assert [len(chunk) for chunk in chunks] == [100, 100, 50]
+    assert [row for chunk in chunks for row in chunk] == [(i,) for i in range(250)]
+
+
+def test_iter_row_chunks_caps_chunks_to_the_memory_budget(monkeypatch):
+    monkeypatch.setattr(app, 'WORKER_MEMORY_LIMIT_MB', 1)
+    wide_rows = [(i, 'x' * 20000) for i in range(300)]
+    cursor = FakeCursor(wide_rows)
+    
+    chunks = list(app.iter_row_chunks(cursor, 1000))
+    
+    # Le premier lot est l'échantillon de mesure, les suivants tiennent dans le budget
+    limit = 1024 * 1024 // (app.estimate_row_bytes(wide_rows) * app.ROW_MEMORY_COPIES)
+    assert len(chunks[0]) == app.ROW_MEMORY_SAMPLE_SIZE
+    assert all(len(chunk) <= limit for chunk in chunks[1:])
+    assert sum(len(chunk) for chunk in chunks) == 300
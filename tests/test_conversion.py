@@ -0,0 +1,66 @@
+from datetime import timedelta, time
+
+import pytest
+
+import app
+
+
+def test_integer_converter_only_when_the_target_is_narrower():
+    assert app.build_value_converter('id', 'int(11)', None, 'integer') is None
+    assert app.build_value_converter('id', 'int(10) unsigned', None, 'bigint') is None
+    
+    convert = app.build_value_converter('id', 'int(10) unsigned', None, 'integer')
+    assert convert(2 ** 31 - 1) == 2 ** 31 - 1
+    with pytest.raises(app.ValueConversionError):
+        convert(2 ** 31)
+
+
+def test_boolean_converters():
+    assert app.build_value_converter('actif', 'bit(1)', None, 'boolean')(b'\x01') is True
+    convert = app.build_value_converter('actif', 'tinyint(1)', None, 'boolean')
+    assert convert(0) is False
+    assert convert('oui') is True
+    assert convert(None) is None
+
+
+def test_zero_dates_become_null():
+    convert = app.build_value_converter('cree_le', 'datetime', None, 'timestamp without time zone')
+    assert convert('0000-00-00 00:00:00') is None
+    assert convert('2021-04-00') is None
+    assert convert('2021-04-15 10:00:00') == '2021-04-15 10:00:00'
+
+
+def test_time_converter_rejects_durations_outside_a_day():
+    convert = app.build_value_converter('duree', 'time', None, 'time without time zone')
+    assert convert(timedelta(hours=1, minutes=2, seconds=3)) == time(1, 2, 3)
+    with pytest.raises(app.ValueConversionError):
+        convert(timedelta(hours=25))
+
+
+def test_text_converter_decodes_binary_collation_and_strips_nul():
+    convert = app.build_value_converter('nom', 'varchar(50)', 'utf8mb4_bin', 'character varying')
+    assert convert('é\x00'.encode('utf-8')) == 'é'
+
+
+def test_set_and_enum_converters():
+    assert app.build_value_converter('tags', "set('a','b')", None, 'text')('b,a') == 'a,b'
+    assert app.build_value_converter('tags', "set('a','b')", None, 'text[]')('b,a') == ['a', 'b']
+    assert app.build_value_converter('statut', "enum('x')", None, 'statut_enum')('') is None
+
+
+def test_convert_rows_rejects_only_invalid_rows():
+    converters = {'id': app.build_value_converter('id', 'int(10) unsigned', None, 'integer')}
+    rows = [(1, 'a'), (2 ** 32 - 1, 'b'), (3, 'c')]
+    
+    converted, rejected = app.convert_rows(converters, ['id', 'nom'], rows)
+    
+    assert converted == [(1, 'a'), (3, 'c')]
+    assert [position for position, _ in rejected] == [1]
+
+
+def test_convert_records_converts_in_place():
+    converters = {'actif': app.build_value_converter('actif', 'tinyint(1)', None, 'boolean')}
+    records = [{'id': 1, 'actif': 1}, {'id': 2, 'actif': 0}]
+    
+    assert app.convert_records(converters, records) == []
+    assert records == [{'id': 1, 'actif': True}, {'id': 2, 'actif': False}]
@@ -0,0 +1,45 @@
+from datetime import timedelta
+
+import app
+
+
+def test_format_copy_value_null_and_booleans():
+    assert app.format_copy_value(None) == '\\N'
+    assert app.format_copy_value(True) == 't'
+    assert app.format_copy_value(False) == 'f'
+
+
+def test_format_copy_value_escapes_separators():
+    assert app.format_copy_value('a\tb') == 'a\\tb'
+    assert app.format_copy_value('ligne 1\nligne 2\r') == 'ligne 1\\nligne 2\\r'
+    assert app.format_copy_value('C:\\temp') == 'C:\\\\temp'
+    # Le texte "\N" n'est pas confondu avec NULL
+    assert app.format_copy_value('\\N') == '\\\\N'
+
+
+def test_format_copy_value_bytes_time_and_set():
+    assert app.format_copy_value(b'\x00\xff') == '\\\\x00ff'
+    assert app.format_copy_value(timedelta(hours=26, minutes=5, seconds=3)) == '26:05:03'
+    assert app.format_copy_value(timedelta(seconds=-90)) == '-00:01:30'
+    assert app.format_copy_value({'b', 'a'}) == 'a,b'
+
+
+def test_copy_row_reader_formats_rows():
+    reader = app.CopyRowReader([(1, 'a\tb', None), (2, 'x\ny', True)])
+    assert reader.read() == '1\ta\\tb\t\\N\n2\tx\\ny\tt\n'
+    assert reader.read() == ''
+
+
+def test_copy_row_reader_small_reads_return_the_same_stream():
+    rows = [(i, f"valeur {i}\t{i}") for i in range(50)]
+    expected = app.CopyRowReader(rows).read()
+    
+    reader = app.CopyRowReader(iter(rows))
+    parts = []
+    while True:
+        part = reader.read(7)
+        if not part:
+            break
+        assert len(part) <= 7
+        parts.append(part)
+    assert ''.join(parts) == expected
@@ -0,0 +1,17 @@
+import app
+
+
+def column(data_type, column_type, **extra):
+    return {'DATA_TYPE': data_type, 'COLUMN_TYPE': column_type, **extra}
+
+
+def test_translate_mysql_type():
+    assert app.translate_mysql_type(column('tinyint', 'tinyint(1)')) == 'boolean'
+    assert app.translate_mysql_type(column('int', 'int(10) unsigned')) == 'bigint'
+    assert app.translate_mysql_type(column('bigint', 'bigint(20) unsigned')) == 'numeric(20)'
+    assert app.translate_mysql_type(column('decimal', 'decimal(10,2)',
+                                           NUMERIC_PRECISION=10, NUMERIC_SCALE=2)) == 'numeric(10,2)'
+    assert app.translate_mysql_type(column('varchar', 'varchar(50)', CHARACTER_MAXIMUM_LENGTH=50)) == 'varchar(50)'
+    assert app.translate_mysql_type(column('datetime', 'datetime(3)', DATETIME_PRECISION=3)) == 'timestamp(3)'
+    assert app.translate_mysql_type(column('longblob', 'longblob')) == 'bytea'
+    assert app.translate_mysql_type(column(b'json', b'json')) == 'jsonb'
@@ -0,0 +1,87 @@
+import app
+
+
+def graph(tables, foreign_keys):
+    return {'tables': tables, 'foreign_keys': {
+        table: {column: {'table': parent, 'pk': 'id'} for column, parent in columns.items()}
+        for table, columns in foreign_keys.items()
+    }}
+
+
+def test_dependency_plan_orders_parents_first():
+    order, dependencies, deferred = app.build_dependency_plan(graph(
+        ['COMMANDE', 'CLIENT'], {'COMMANDE': {'id_client': 'CLIENT'}}))
+    assert order == ['CLIENT', 'COMMANDE']
+    assert dependencies['COMMANDE'] == {'CLIENT'}
+    assert not deferred['COMMANDE']
+
+
+def test_dependency_plan_defers_self_references_and_breaks_cycles():
+    order, dependencies, deferred = app.build_dependency_plan(graph(
+        ['A', 'B', 'EMPLOYE'],
+        {'A': {'id_b': 'B'}, 'B': {'id_a': 'A'}, 'EMPLOYE': {'id_manager': 'EMPLOYE'}}))
+    
+    assert sorted(order) == ['A', 'B', 'EMPLOYE']
+    assert deferred['EMPLOYE'] == {'id_manager'}
+    # Un seul côté du cycle est différé, l'autre attend sa table parente
+    assert deferred['A'] == {'id_b'} and not deferred['B']
+    assert order.index('A') < order.index('B')
+    assert dependencies['A'] == set()
+
+
+class FakeCursor:
+    def __init__(self, results):
+        self.results = list(results)
+    
+    def execute(self, sql, params=None):
+        self.rows = self.results.pop(0)
+    
+    def fetchall(self):
+        return self.rows
+    
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, results):
+        self.results = results
+    
+    def cursor(self, **kwargs):
+        return FakeCursor(self.results)
+    
+    def close(self):
+        pass
+
+
+def test_foreign_key_graph_completes_partly_constrained_tables(monkeypatch):
+    tables = [{'TABLE_NAME': name} for name in ('CLIENT', 'VENDEUR', 'COMMANDE')]
+    declared = [{'TABLE_NAME': 'COMMANDE', 'COLUMN_NAME': 'id_client',
+                 'REFERENCED_TABLE_NAME': 'CLIENT', 'REFERENCED_COLUMN_NAME': 'id_client'}]
+    id_columns = [
+        {'TABLE_NAME': 'CLIENT', 'COLUMN_NAME': 'id_client', 'COLUMN_KEY': 'PRI'},
+        {'TABLE_NAME': 'VENDEUR', 'COLUMN_NAME': 'id_vendeur', 'COLUMN_KEY': 'PRI'},
+        {'TABLE_NAME': 'COMMANDE', 'COLUMN_NAME': 'id_commande', 'COLUMN_KEY': 'PRI'},
+        {'TABLE_NAME': 'COMMANDE', 'COLUMN_NAME': 'id_client', 'COLUMN_KEY': 'MUL'},
+        {'TABLE_NAME': 'COMMANDE', 'COLUMN_NAME': 'id_vendeur', 'COLUMN_KEY': 'MUL'},
+    ]
+    monkeypatch.setattr(app, 'get_mysql_connection',
+                        lambda: FakeConnection([tables, declared, id_columns]))
+    app.schema_cache.invalidate()
+    
+    foreign_keys = app.get_foreign_key_graph('TEST_PARTIEL')['foreign_keys']
+    
+    # La contrainte déclarée n'empêche pas de retrouver la colonne non déclarée de la même table
+    assert foreign_keys['COMMANDE'] == {
+        'id_client': {'table': 'CLIENT', 'pk': 'id_client'},
+        'id_vendeur': {'table': 'VENDEUR', 'pk': 'id_vendeur'},
+    }
+    assert foreign_keys['CLIENT'] == {}
+
+
+def test_resolve_referenced_table_falls_back_to_known_relations(monkeypatch):
+    monkeypatch.setattr(app, 'get_foreign_key_graph',
+                        lambda db_name: {'tables': ['COMMANDE'], 'foreign_keys': {'COMMANDE': {}}})
+    
+    assert app.resolve_referenced_table('COMMANDE', 'id_vendeur', 'TEST') == ('VENDEUR', 'id_vendeur')
+    assert app.resolve_referenced_table('COMMANDE', 'id_inconnu', 'TEST') == (None, None)
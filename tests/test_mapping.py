@@ -0,0 +1,137 @@
+import app
+
+SIMPLE_LAYOUT = {
+    'old': ['old_id'],
+    'new': ['new_id'],
+    'types': {'old_id': 'bigint', 'new_id': 'bigint'},
+    'legacy': False
+}
+
+LAYOUT = {
+    'old': ['old_id_commande', 'old_id_produit'],
+    'new': ['new_id_commande', 'new_id_produit'],
+    'types': {'old_id_commande': 'bigint', 'old_id_produit': 'bigint',
+              'new_id_commande': 'bigint', 'new_id_produit': 'bigint', 'old_code': 'text'},
+    'legacy': False
+}
+
+
+def test_split_mapping_key_composite():
+    assert app.split_mapping_key(LAYOUT, LAYOUT['old'], '12_7') == (12, 7)
+    assert app.split_mapping_key(LAYOUT, LAYOUT['old'], 12) is None
+    assert app.split_mapping_key(LAYOUT, LAYOUT['old'], '12_x') is None
+
+
+def test_split_mapping_key_text_column_keeps_underscores():
+    assert app.split_mapping_key(LAYOUT, ['old_code'], 'AB_12') == ('AB_12',)
+
+
+def test_mapping_key_condition_single_column():
+    condition, params = app.mapping_key_condition(LAYOUT, ['old_code'], [('a',), ('b',)])
+    assert condition == 'old_code = ANY(%s::text[])'
+    assert params == [['a', 'b']]
+
+
+def test_mapping_key_condition_with_alias():
+    condition, params = app.mapping_key_condition(LAYOUT, ['old_code'], [('a',)], alias='m')
+    assert condition == 'm.old_code = ANY(%s::text[])'
+    assert params == [['a']]
+
+
+def test_mapping_key_condition_composite_columns():
+    condition, params = app.mapping_key_condition(LAYOUT, LAYOUT['old'], [(12, 7), (13, 1)])
+    assert condition == ('(old_id_commande, old_id_produit) IN '
+                         '(SELECT * FROM unnest(%s::bigint[], %s::bigint[]))')
+    assert params == [[12, 13], [7, 1]]
+
+
+def test_mapping_key_expr_rebuilds_application_id():
+    assert app.mapping_key_expr(LAYOUT['old'], 'm') == "m.old_id_commande::text || '_' || m.old_id_produit::text"
+
+
+class FakeCursor:
+    def __init__(self, removed):
+        self.removed = removed
+        self.queries = []
+    
+    def execute(self, sql, params=None):
+        self.queries.append((' '.join(sql.split()), params))
+    
+    def fetchall(self):
+        return self.removed
+    
+    def close(self):
+        pass
+
+
+def test_delete_rows_with_mapping_removes_rows_mappings_and_counter(monkeypatch):
+    monkeypatch.setattr(app, 'get_mapping_layout', lambda cursor, mapping_table: SIMPLE_LAYOUT)
+    monkeypatch.setattr(app, 'get_pg_table_metadata', lambda cursor, table: {'primary_keys': ['id_client']})
+    # 1 et 2 avaient une ligne cible, 3 n'avait plus qu'une correspondance; "x" n'est pas une clé valide
+    cursor = FakeCursor([('1', True), ('2', True), ('3', False)])
+    
+    deleted, stale = app.delete_rows_with_mapping(cursor, 'CLIENT', 'id_mapping_test_client', ['1', '2', '3', 'x'])
+    
+    assert deleted == ['1', '2'] and stale == ['3']
+    delete_sql, params = cursor.queries[0]
+    assert 'DELETE FROM client AS t USING id_mapping_test_client AS m' in delete_sql
+    assert 'DELETE FROM id_mapping_test_client AS m WHERE m.old_id = ANY(%s::bigint[])' in delete_sql
+    assert params == [[1, 2, 3], [1, 2, 3]]
+    counter_sql, counter_params = cursor.queries[1]
+    assert counter_sql.startswith('UPDATE mapping_counters')
+    assert counter_params == (-3, 'id_mapping_test_client')
+
+
+def test_delete_rows_with_mapping_ignores_invalid_keys(monkeypatch):
+    monkeypatch.setattr(app, 'get_mapping_layout', lambda cursor, mapping_table: SIMPLE_LAYOUT)
+    cursor = FakeCursor([])
+    
+    assert app.delete_rows_with_mapping(cursor, 'CLIENT', 'id_mapping_test_client', ['x']) == ([], [])
+    assert cursor.queries == []
+
+
+class FakeConnection:
+    def __init__(self):
+        self.committed = False
+    
+    def cursor(self):
+        return FakeCursor([])
+    
+    def commit(self):
+        self.committed = True
+    
+    def rollback(self):
+        pass
+    
+    def close(self):
+        pass
+
+
+def test_delete_from_postgres_removes_row_and_mapping(monkeypatch):
+    connection = FakeConnection()
+    calls = []
+    monkeypatch.setattr(app, 'get_postgres_connection', lambda: connection)
+    monkeypatch.setattr(app, 'pg_table_exists', lambda cursor, table: True)
+    monkeypatch.setattr(app, 'delete_rows_with_mapping',
+                        lambda cursor, table, mapping_table, old_ids: calls.append((table, mapping_table, old_ids))
+                        or (old_ids, []))
+    app.fk_mapping_cache.put_many('TEST', 'CLIENT', [('7', '107')])
+    
+    response = app.app.test_client().post('/delete-from-postgres',
+                                          data={'db_name': 'TEST', 'table_name': 'CLIENT', 'row_id': '7'})
+    
+    assert response.status_code == 200 and response.get_json()["deleted_row_id"] == '7'
+    assert calls == [('CLIENT', 'id_mapping_test_client', ['7'])]
+    assert connection.committed
+    assert app.fk_mapping_cache.get_many('TEST', 'CLIENT', ['7']) == ({}, ['7'])
+
+
+def test_delete_from_postgres_without_mapping_is_not_found(monkeypatch):
+    monkeypatch.setattr(app, 'get_postgres_connection', FakeConnection)
+    monkeypatch.setattr(app, 'pg_table_exists', lambda cursor, table: True)
+    monkeypatch.setattr(app, 'delete_rows_with_mapping', lambda cursor, table, mapping_table, old_ids: ([], []))
+    
+    response = app.app.test_client().post('/delete-from-postgres',
+                                          data={'db_name': 'TEST', 'table_name': 'CLIENT', 'row_id': '7'})
+    
+    assert response.status_code == 404
@@ -0,0 +1,13 @@
+import app
+
+
+def test_build_keyset_condition_single_key():
+    condition, params = app.build_keyset_condition(['id_client'], [42])
+    assert condition == '((`id_client` > %s))'
+    assert params == [42]
+
+
+def test_build_keyset_condition_composite_key():
+    condition, params = app.build_keyset_condition(['a', 'b'], [1, 2])
+    assert condition == '((`a` > %s) OR (`a` = %s AND `b` > %s))'
+    assert params == [1, 1, 2]
@@ -0,0 +1,50 @@
+import app
+
+
+def test_checksum_windows_cover_every_bucket_once():
+    windows = list(app.iter_checksum_windows(5, 2_499, 100, window=10))
+    
+    assert windows == [(0, 10), (10, 20), (20, 25)]
+    covered = [bucket for start, end in windows for bucket in range(start, end)]
+    assert covered == list(range(0, 25))
+
+
+def test_checksum_windows_single_bucket():
+    assert list(app.iter_checksum_windows(42, 42, 1000, window=100)) == [(0, 1)]
+
+
+def test_checksum_query_sums_md5_prefixes_within_a_key_window():
+    sql = app.build_sync_checksum_query('CLIENT', ['id_client', 'nom'], 'id_client')
+    
+    assert 'MD5(CONCAT_WS' in sql and 'SUM(' in sql
+    assert 'BIT_XOR' not in sql and 'CRC32' not in sql
+    assert '`id_client` >= %s AND `id_client` < %s' in sql
+
+
+class FakeConnection:
+    def cursor(self):
+        return self
+    
+    def close(self):
+        pass
+
+
+def test_sync_route_skips_missing_tables_and_reports_failures(monkeypatch):
+    def fake_sync(db_name, table_name, mode):
+        if table_name == 'COMMANDE':
+            raise ValueError("Le mode checksum nécessite une clé entière")
+        return {"db_name": db_name, "table_name": table_name, "rows_updated": 2, "rows_inserted": 1}
+    
+    monkeypatch.setattr(app, 'get_table_dependency_order', lambda db_name: ['CLIENT', 'COMMANDE', 'AUDIT'])
+    monkeypatch.setattr(app, 'get_postgres_connection', FakeConnection)
+    monkeypatch.setattr(app, 'pg_table_exists', lambda cursor, table: table != 'audit')
+    monkeypatch.setattr(app, 'sync_table', fake_sync)
+    
+    response = app.app.test_client().post('/sync-table', json={"db_name": "TEST"})
+    
+    assert response.status_code == 200
+    payload = response.get_json()
+    assert payload["success"] is False
+    assert [summary["table_name"] for summary in payload["tables"]] == ['CLIENT', 'COMMANDE']
+    assert payload["tables"][0]["rows_updated"] == 2
+    assert "clé entière" in payload["tables"][1]["error"]